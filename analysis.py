@@ -0,0 +1,641 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["bokeh>=3.8", "numpy", "pandas", "pyarrow"]
+# ///
+
+"""
+Build the plots/ HTML fragments from the usage rollup.
+Every plot is computed from data/rollups.db (15-minute usage counts per
+location and machine type, kept current by bulk_scraper.py --rollups, see rollups.py)
+and the location mapping, never from raw records, so the work grows with the
+number of buckets rather than with every poll ever stored:
+
+  plots/citywide_usage_timeseries.html      weekly usage profile, all of SF
+  plots/neighborhood_usage_timeseries.html  the same for the busiest neighborhoods
+  plots/machine_distribution_histogram.html locations by machine count
+  plots/neighborhood_map.html               neighborhoods and locations on a map
+
+The weekly profiles are binned to at most --max-points slots per series
+(672 = one point per 15 minutes), so the embedded ColumnDataSources, the HTML
+size and the render time stay the same however much history is rolled up.
+Outputs are embeddable <div> + <script> fragments (bokeh.embed.components).
+
+Usage:
+  uv run analysis.py                                  # From data/rollups.db
+  uv run analysis.py --rebuild-rollups --storage parquet
+  uv run analysis.py --since 2025-09-01 --max-points 336
+"""
+
+import argparse
+import calendar
+import importlib.util
+import logging
+import math
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from bokeh.embed import components
+from bokeh.layouts import column
+from bokeh.models import (
+    ColumnDataSource,
+    CustomJS,
+    DataRange1d,
+    FixedTicker,
+    HoverTool,
+    Legend,
+    LegendItem,
+    Range1d,
+    RadioButtonGroup,
+    WMTSTileSource,
+)
+from bokeh.plotting import figure
+
+# Import storage, neighborhoods and rollups modules at global scope
+storage_path = Path(__file__).parent / "storage.py"
+if not storage_path.exists():
+    raise ImportError(f"storage.py not found at {storage_path}")
+
+spec = importlib.util.spec_from_file_location("storage", storage_path)
+storage = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(storage)
+
+neighborhoods_path = Path(__file__).parent / "neighborhoods.py"
+if not neighborhoods_path.exists():
+    raise ImportError(f"neighborhoods.py not found at {neighborhoods_path}")
+
+spec = importlib.util.spec_from_file_location("neighborhoods", neighborhoods_path)
+neighborhoods = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(neighborhoods)
+
+rollups_path = Path(__file__).parent / "rollups.py"
+if not rollups_path.exists():
+    raise ImportError(f"rollups.py not found at {rollups_path}")
+
+spec = importlib.util.spec_from_file_location("rollups", rollups_path)
+rollups = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(rollups)
+
+TIMEZONE = "America/Los_Angeles"
+SLOTS_PER_DAY = 96
+SLOTS_PER_WEEK = 7 * SLOTS_PER_DAY
+
+# (line, band) colors per machine type
+TYPE_COLORS = {"washer": ("#2980B9", "#3498DB"), "dryer": ("#C0392B", "#E74C3C")}
+MACHINE_TYPES = list(TYPE_COLORS)
+
+MACHINE_BUCKETS = [
+    (1, 2, "1-2 machines"),
+    (3, 4, "3-4 machines"),
+    (5, 6, "5-6 machines"),
+    (7, 8, "7-8 machines"),
+    (9, 10, "9-10 machines"),
+    (11, 20, "11-20 machines"),
+    (21, 40, "21-40 machines"),
+    (41, math.inf, "40+ machines"),
+]
+
+NEIGHBORHOOD_COLORS = ["#7fc97f", "#beaed4", "#fdc086", "#ffff99"]
+EMPTY_NEIGHBORHOOD_COLOR = "#d3d3d3"
+MARKER_URL = "/assets/images/posts/san-francisco-laundry-analysis/washing-machine.png"
+
+TILE_URL = "https://a.basemaps.cartocdn.com/light_all/{z}/{x}/{y}.png"
+TILE_ATTRIBUTION = (
+    '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> '
+    'contributors &copy; <a href="https://carto.com/attributions">CARTO</a>'
+)
+
+# Web Mercator radius, for placing coordinates on map tiles
+EARTH_RADIUS = 6378137.0
+
+TOGGLE_CODE = """
+    const show = {
+        washer: {mean: active !== 1, band: active === 0},
+        dryer: {mean: active !== 0, band: active === 1},
+    };
+    for (const type of Object.keys(renderers)) {
+        for (const part of ["mean", "band"]) {
+            for (const renderer of renderers[type][part]) {
+                renderer.visible = show[type][part];
+            }
+        }
+    }
+"""
+
+
+def setup_logging() -> logging.Logger:
+    """Setup logging configuration."""
+    logger = logging.getLogger("analysis")
+    logger.setLevel(logging.INFO)
+
+    # Remove existing handlers to avoid duplicates
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+
+    # Console handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+
+    # Formatter
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    console_handler.setFormatter(formatter)
+
+    logger.addHandler(console_handler)
+
+    return logger
+
+
+def load_mapping(data_dir: Path, mapping_file: str, storage_name: str) -> pd.DataFrame:
+    """Location mapping with a neighborhood column, keyed by location_id as text."""
+    if storage_name == "sqlite":
+        store = storage.SqliteStore(data_dir / storage.SQLITE_FILENAME)
+        mapping = store.read_mappings()
+        store.close()
+    else:
+        mapping_path = data_dir / mapping_file
+        if not mapping_path.exists():
+            return pd.DataFrame(
+                columns=["location_id", "original_name", "latitude", "longitude", "neighborhood"]
+            )
+        mapping = pd.read_csv(mapping_path, dtype={"location_id": "string"})
+
+    if "neighborhood" not in mapping.columns:
+        mapping = neighborhoods.add_neighborhood_column(mapping)
+    mapping["location_id"] = mapping["location_id"].astype(str)
+    return mapping.drop_duplicates("location_id", keep="last")
+
+
+def machine_counts(rollup: pd.DataFrame) -> pd.DataFrame:
+    """Machines per location and type: the most seen in one poll, any bucket."""
+    counts = rollup.groupby(["location_id", "type"])["machines"].max()
+    return counts.unstack("type", fill_value=0).reindex(columns=MACHINE_TYPES, fill_value=0)
+
+
+def weekly_profile(
+    rollup: pd.DataFrame, by: Optional[List[str]] = None, max_points: int = SLOTS_PER_WEEK
+) -> pd.DataFrame:
+    """
+    Usage by local weekday and time of day, across all weeks in the rollup.
+
+    For every bucket, in_use_pct is the share of observed machines in use
+    (summed over the locations in each group). Buckets are binned into slots
+    of a whole number of 15-minute steps, at most max_points per week, and
+    each slot gets the mean, min, max and std over its buckets. pct_of_peak
+    scales a series by its highest slot maximum.
+    """
+    keys = (by or []) + ["type"]
+    totals = rollup.groupby(keys + ["bucket_start"])[rollups.STATUS_COUNTS].sum()
+    observed = totals.sum(axis=1)
+    usage = (totals["in_use"] / observed.where(observed > 0)).dropna()
+    usage = usage.rename("in_use_pct").reset_index()
+
+    local = usage["bucket_start"].dt.tz_convert(TIMEZONE)
+    # The smallest slot width that divides a day and keeps to max_points
+    slot_width = next(
+        width
+        for width in range(1, SLOTS_PER_DAY + 1)
+        if SLOTS_PER_DAY % width == 0 and SLOTS_PER_WEEK / width <= max(1, max_points)
+        or width == SLOTS_PER_DAY
+    )
+    usage["weekday"] = local.dt.weekday
+    usage["slot"] = (local.dt.hour * 4 + local.dt.minute // 15) // slot_width * slot_width
+
+    stats = usage.groupby(keys + ["weekday", "slot"])["in_use_pct"].agg(
+        ["mean", "min", "max", "std"]
+    )
+    profile = stats.add_prefix("in_use_pct_").reset_index()
+    profile["in_use_pct_std"] = profile["in_use_pct_std"].fillna(0)
+
+    peak = profile.groupby(keys)["in_use_pct_max"].transform("max")
+    for stat in ("mean", "min", "max"):
+        profile[f"pct_of_peak_{stat}"] = profile[f"in_use_pct_{stat}"] / peak.where(peak > 0)
+    profile["peak_value"] = peak
+
+    profile["hour_num"] = profile["weekday"] * 24 + profile["slot"] / 4
+    profile["weekday_name"] = profile["weekday"].map(dict(enumerate(calendar.day_name)))
+    minutes = pd.to_timedelta(profile["slot"] * 15, unit="min")
+    profile["time_str"] = (pd.Timestamp(0) + minutes).dt.strftime("%I:%M %p")
+    return profile.sort_values(keys + ["hour_num"]).reset_index(drop=True)
+
+
+def profile_source(profile: pd.DataFrame) -> ColumnDataSource:
+    """Only the columns the glyphs and hover tool read."""
+    return ColumnDataSource(
+        profile[
+            [
+                "hour_num",
+                "weekday_name",
+                "time_str",
+                "in_use_pct_mean",
+                "in_use_pct_min",
+                "in_use_pct_max",
+                "pct_of_peak_mean",
+                "pct_of_peak_min",
+                "pct_of_peak_max",
+            ]
+        ]
+    )
+
+
+def usage_figure(
+    profile: pd.DataFrame, label: str, x_range: Range1d, renderers: Dict
+) -> figure:
+    """One weekly profile plot (washer and dryer), adding its renderers to renderers."""
+    plot = figure(
+        height=300,
+        sizing_mode="stretch_width",
+        x_range=x_range,
+        y_range=DataRange1d(start=0),
+        tools="pan,wheel_zoom,reset,fullscreen",
+        min_border=0,
+        outline_line_alpha=0,
+    )
+    for machine_type, (line_color, band_color) in TYPE_COLORS.items():
+        source = profile_source(profile[profile["type"] == machine_type])
+        band = plot.varea(
+            x="hour_num",
+            y1="in_use_pct_min",
+            y2="in_use_pct_max",
+            source=source,
+            fill_color=band_color,
+            fill_alpha=0.2,
+            visible=machine_type == "washer",
+        )
+        mean = plot.line(
+            x="hour_num",
+            y="in_use_pct_mean",
+            source=source,
+            line_color=line_color,
+            line_width=2,
+            visible=machine_type == "washer",
+        )
+        renderers[machine_type]["band"].append(band)
+        renderers[machine_type]["mean"].append(mean)
+        if machine_type == "washer":
+            hover_renderer = mean
+
+    plot.add_tools(
+        HoverTool(
+            renderers=[hover_renderer],
+            tooltips=[
+                ("Day", "@weekday_name"),
+                ("Time", "@time_str"),
+                ("Avg Usage (% of Peak)", "@pct_of_peak_mean{0.0%}"),
+                ("Min Usage (% of Peak)", "@pct_of_peak_min{0.0%}"),
+                ("Max Usage (% of Peak)", "@pct_of_peak_max{0.0%}"),
+            ],
+            mode="vline",
+        )
+    )
+
+    # Label each day at noon; the y values only matter relative to each other
+    plot.xaxis.ticker = FixedTicker(ticks=[day * 24 + 12 for day in range(7)])
+    plot.xaxis.major_label_overrides = {
+        day * 24 + 12: name for day, name in enumerate(calendar.day_name)
+    }
+    plot.yaxis.axis_label = label
+    plot.yaxis.axis_label_text_font_style = "bold"
+    plot.yaxis.major_label_text_font_size = "0pt"
+    return plot
+
+
+def legend_figure() -> figure:
+    """A thin figure holding only the shared washer/dryer legend."""
+    plot = figure(
+        height=40,
+        sizing_mode="stretch_width",
+        toolbar_location=None,
+        min_border=0,
+        outline_line_alpha=0,
+        x_range=Range1d(0, 1),
+        y_range=Range1d(0, 1),
+    )
+    plot.axis.visible = False
+    plot.grid.visible = False
+
+    items = []
+    for machine_type, (line_color, band_color) in TYPE_COLORS.items():
+        name = machine_type.capitalize()
+        line = plot.line(x=[], y=[], line_color=line_color, line_width=2)
+        band = plot.varea(x=[], y1=[], y2=[], fill_color=band_color, fill_alpha=0.2)
+        items.append(LegendItem(label=f"{name} Average", renderers=[line]))
+        items.append(LegendItem(label=f"{name} Min-Max Range", renderers=[band]))
+
+    legend = Legend(
+        items=items,
+        location="center",
+        orientation="horizontal",
+        border_line_alpha=0,
+        background_fill_alpha=0,
+    )
+    plot.add_layout(legend, "center")
+    return plot
+
+
+def usage_layout(panels: List[tuple]):
+    """Washer/Dryer toggle, legend and one usage figure per (profile, label)."""
+    x_range = Range1d(0, 168)
+    renderers = {
+        machine_type: {"mean": [], "band": []} for machine_type in MACHINE_TYPES
+    }
+    figures = [
+        usage_figure(profile, label, x_range, renderers) for profile, label in panels
+    ]
+
+    toggle = RadioButtonGroup(labels=["Washer", "Dryer", "Washer+Dryer"], active=0)
+    toggle.js_on_change(
+        "active",
+        CustomJS(args={"renderers": renderers}, code="const active = cb_obj.active;" + TOGGLE_CODE),
+    )
+    return column(toggle, legend_figure(), *figures, sizing_mode="stretch_width")
+
+
+def count_label(name: str, counts: pd.Series) -> str:
+    return f"{name} (W:{int(counts['washer'])}, D:{int(counts['dryer'])})"
+
+
+def citywide_plot(rollup: pd.DataFrame, counts: pd.DataFrame, max_points: int):
+    profile = weekly_profile(rollup, max_points=max_points)
+    return usage_layout([(profile, count_label("San Francisco", counts.sum()))])
+
+
+def neighborhood_plot(
+    rollup: pd.DataFrame,
+    counts: pd.DataFrame,
+    mapping: pd.DataFrame,
+    top: int,
+    max_points: int,
+):
+    """Weekly profiles of the top neighborhoods by machine count, alphabetically."""
+    location_neighborhood = mapping.set_index("location_id")["neighborhood"]
+    rollup = rollup.assign(neighborhood=rollup["location_id"].map(location_neighborhood))
+    rollup = rollup.dropna(subset=["neighborhood"])
+
+    neighborhood_counts = counts.groupby(
+        counts.index.map(location_neighborhood)
+    ).sum()
+    busiest = neighborhood_counts.sum(axis=1).nlargest(top).index
+    rollup = rollup[rollup["neighborhood"].isin(busiest)]
+
+    profile = weekly_profile(rollup, by=["neighborhood"], max_points=max_points)
+    panels = [
+        (
+            profile[profile["neighborhood"] == name],
+            count_label(name, neighborhood_counts.loc[name]),
+        )
+        for name in sorted(busiest)
+    ]
+    return usage_layout(panels)
+
+
+def machine_histogram(counts: pd.DataFrame):
+    """Number of locations per machine-count bucket."""
+    totals = counts.sum(axis=1)
+    labels = [label for _, _, label in MACHINE_BUCKETS]
+    bucket_counts = [
+        int(((totals >= low) & (totals <= high)).sum()) for low, high, _ in MACHINE_BUCKETS
+    ]
+    total = max(1, sum(bucket_counts))
+    source = ColumnDataSource(
+        {
+            "bucket": labels,
+            "count": bucket_counts,
+            "percentage": [100 * count / total for count in bucket_counts],
+        }
+    )
+
+    plot = figure(
+        x_range=labels,
+        y_range=Range1d(0, max(bucket_counts + [1]) * 1.15),
+        height=400,
+        sizing_mode="stretch_width",
+        tools="pan,wheel_zoom,reset,fullscreen",
+        min_border=0,
+    )
+    plot.vbar(
+        x="bucket",
+        top="count",
+        width=0.8,
+        source=source,
+        fill_color="#3498DB",
+        line_color="#2980B9",
+        line_width=1.2,
+    )
+    plot.add_tools(
+        HoverTool(tooltips=[("Locations", "@count"), ("Share", "@percentage{0.0}%")])
+    )
+    plot.xgrid.grid_line_color = None
+    plot.yaxis.axis_label = "Number of Locations"
+    plot.yaxis.axis_label_text_font_style = "bold"
+    return plot
+
+
+def to_mercator(longitude, latitude):
+    """Web Mercator x, y in meters for arrays of coordinates."""
+    longitude = np.asarray(longitude, dtype=float)
+    latitude = np.asarray(latitude, dtype=float)
+    x = np.radians(longitude) * EARTH_RADIUS
+    y = np.log(np.tan(np.pi / 4 + np.radians(latitude) / 2)) * EARTH_RADIUS
+    return x, y
+
+
+def neighborhood_map(
+    counts: pd.DataFrame, mapping: pd.DataFrame, marker_url: Optional[str]
+):
+    """Neighborhood polygons shaded by whether they have locations, plus pins."""
+    names, polygons = neighborhoods.load_neighborhoods()
+
+    mapped = mapping.dropna(subset=["latitude", "longitude"])
+    location_counts = mapped.groupby("neighborhood").size()
+    machines = (
+        counts.groupby(counts.index.map(mapping.set_index("location_id")["neighborhood"]))
+        .sum()
+        .reindex(names, fill_value=0)
+    )
+
+    xs, ys, colors = [], [], []
+    colored = 0
+    for name, rings in zip(names, polygons):
+        # Rings of a multi-part neighborhood are drawn as one NaN-separated patch
+        x, y = to_mercator(
+            np.concatenate([np.append(ring[:, 0], np.nan) for ring in rings])[:-1],
+            np.concatenate([np.append(ring[:, 1], np.nan) for ring in rings])[:-1],
+        )
+        xs.append(x)
+        ys.append(y)
+        if location_counts.get(name, 0):
+            colors.append(NEIGHBORHOOD_COLORS[colored % len(NEIGHBORHOOD_COLORS)])
+            colored += 1
+        else:
+            colors.append(EMPTY_NEIGHBORHOOD_COLOR)
+
+    patches_source = ColumnDataSource(
+        {
+            "xs": xs,
+            "ys": ys,
+            "name": names,
+            "fill_color": colors,
+            "location_count": [int(location_counts.get(name, 0)) for name in names],
+            "washer_count": machines["washer"].to_numpy(),
+            "dryer_count": machines["dryer"].to_numpy(),
+            "total_machines": machines.sum(axis=1).to_numpy(),
+        }
+    )
+
+    x, y = to_mercator(mapped["longitude"], mapped["latitude"])
+    locations_source = ColumnDataSource(
+        {
+            "x": x,
+            "y": y,
+            "name": mapped["original_name"].astype(str).tolist(),
+            "neighborhood": mapped["neighborhood"].fillna("").tolist(),
+            "url": [marker_url] * len(mapped),
+        }
+    )
+
+    all_x = np.concatenate(xs)
+    all_y = np.concatenate(ys)
+    plot = figure(
+        width=1000,
+        height=800,
+        sizing_mode="scale_both",
+        x_range=Range1d(np.nanmin(all_x), np.nanmax(all_x)),
+        y_range=Range1d(np.nanmin(all_y), np.nanmax(all_y)),
+        x_axis_type="mercator",
+        y_axis_type="mercator",
+        tools="pan,wheel_zoom,reset,fullscreen",
+    )
+    plot.add_tile(WMTSTileSource(url=TILE_URL, attribution=TILE_ATTRIBUTION, max_zoom=20))
+    patches = plot.patches(
+        "xs", "ys", source=patches_source, fill_color="fill_color",
+        fill_alpha=0.6, line_color="white",
+    )  # fmt: skip
+    if marker_url:
+        plot.image_url(
+            url="url", x="x", y="y", w=24, h=24, w_units="screen", h_units="screen",
+            anchor="center", source=locations_source,
+        )  # fmt: skip
+    else:
+        plot.scatter(
+            x="x", y="y", size=8, source=locations_source, fill_color="#2980B9",
+            line_color="white",
+        )  # fmt: skip
+
+    plot.add_tools(
+        HoverTool(
+            renderers=[patches],
+            tooltips=[
+                ("Neighborhood", "@name"),
+                ("Locations", "@location_count"),
+                ("Washers", "@washer_count"),
+                ("Dryers", "@dryer_count"),
+                ("Total Machines", "@total_machines"),
+            ],
+        )
+    )
+    plot.axis.visible = False
+    plot.grid.visible = False
+    return plot
+
+
+def write_fragment(model, output_file: Path) -> int:
+    """Write an embeddable <div> + <script> fragment; returns its size in bytes."""
+    script, div = components(model)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    output_file.write_text(f"{div}\n{script}\n", encoding="utf-8")
+    return output_file.stat().st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the plots/ HTML fragments")
+    parser.add_argument(
+        "--data-dir", default="data", help="Directory containing data files"
+    )
+    parser.add_argument(
+        "--output-dir", default="plots", help="Directory to write the HTML fragments to"
+    )
+    parser.add_argument(
+        "--mapping-file",
+        default="location_code_mapping.csv",
+        help="Location mapping CSV in --data-dir",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=["csv", "parquet", "sqlite"],
+        default="csv",
+        help="Where records (for --rebuild-rollups) and, with sqlite, the mapping are stored",
+    )
+    parser.add_argument(
+        "--rebuild-rollups",
+        action="store_true",
+        help="Recompute data/rollups.db from all stored records first",
+    )
+    parser.add_argument("--since", default=None, help="Only use buckets from YYYY-MM-DD")
+    parser.add_argument("--until", default=None, help="Only use buckets before YYYY-MM-DD")
+    parser.add_argument(
+        "--max-points",
+        type=int,
+        default=SLOTS_PER_WEEK,
+        help=f"Points per weekly usage series (default: {SLOTS_PER_WEEK}, one per 15 minutes)",
+    )
+    parser.add_argument(
+        "--top-neighborhoods",
+        type=int,
+        default=10,
+        help="Neighborhoods in the neighborhood usage plot (default: 10)",
+    )
+    parser.add_argument(
+        "--marker-url",
+        default=MARKER_URL,
+        help="Image used for location pins on the map, empty for plain markers",
+    )
+
+    args = parser.parse_args()
+
+    # Setup logging
+    logger = setup_logging()
+
+    data_dir = Path(args.data_dir)
+    output_dir = Path(args.output_dir)
+
+    if args.rebuild_rollups:
+        rollups.rebuild_rollups(data_dir, args.storage, logger)
+
+    store = rollups.RollupStore(data_dir / rollups.ROLLUP_FILENAME)
+    rollup = store.read(args.since, args.until)
+    store.close()
+    if rollup.empty:
+        logger.error(
+            f"No rollup data in {store.path}. Run with --rebuild-rollups to build it "
+            f"from stored records"
+        )
+        sys.exit(1)
+    logger.info(
+        f"Loaded {len(rollup)} rollup rows from {rollup['bucket_start'].min()} "
+        f"to {rollup['bucket_start'].max()}"
+    )
+
+    mapping = load_mapping(data_dir, args.mapping_file, args.storage)
+    counts = machine_counts(rollup)
+
+    plots = {
+        "citywide_usage_timeseries.html": citywide_plot(rollup, counts, args.max_points),
+        "neighborhood_usage_timeseries.html": neighborhood_plot(
+            rollup, counts, mapping, args.top_neighborhoods, args.max_points
+        ),
+        "machine_distribution_histogram.html": machine_histogram(counts),
+        "neighborhood_map.html": neighborhood_map(counts, mapping, args.marker_url),
+    }
+    for filename, model in plots.items():
+        size = write_fragment(model, output_dir / filename)
+        logger.info(f"Wrote {output_dir / filename} ({size / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["aiohttp", "pandas", "requests", "python-dotenv"]
+# ///
+
+"""
+Benchmark: location_code_mapper.py geocoding throughput against the mock
+Geocoding API in mock_server.py (run on a background thread with realistic
+latency). Seeds location files where part of the locations share a chain name,
+then geocodes them:
+  - sequential: process_location() per location with no session or cache,
+                the previous loop (without its fixed 0.1s delay)
+  - pooled:     --workers threads over one keep-alive session, deduplicated
+                by normalized query and cached in geocode_cache.jsonl
+  - rerun:      the pooled run again with the cache it wrote
+and reports wall time and how many requests reached the API.
+
+Usage:
+  uv run benchmarks/bench_geocode.py --locations 500 --workers 1 8 32
+  uv run benchmarks/bench_geocode.py --locations 2000 --chain-ratio 0.5 --qps 50
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import mock_server  # noqa: E402
+import synthetic  # noqa: E402
+
+mapper_path = Path(__file__).parent.parent / "location_code_mapper.py"
+spec = importlib.util.spec_from_file_location("location_code_mapper", mapper_path)
+location_code_mapper = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(location_code_mapper)
+
+CHAIN_NAMES = ("Spin Cycle", "Clean Rinse Laundromat", "Bubbles Wash & Fold", "Suds City")
+
+
+def seed_locations(data_dir: Path, locations: int, chain_ratio: float) -> list:
+    """Write location files; every 1/chain_ratio-th location is a chain branch."""
+    codes = []
+    chain_every = round(1 / chain_ratio) if chain_ratio > 0 else 0
+    for index in range(locations):
+        location = synthetic.make_location(index)
+        if chain_every and index % chain_every == 0:
+            chain = CHAIN_NAMES[(index // chain_every) % len(CHAIN_NAMES)]
+            location["location"]["location_name"] = chain
+        code = synthetic.location_code(index)
+        location_dir = data_dir / code
+        location_dir.mkdir(parents=True, exist_ok=True)
+        with open(location_dir / f"{code}.json", "w", encoding="utf-8") as f:
+            json.dump(location, f)
+        codes.append(code)
+    return codes
+
+
+def start_server_thread(app, port: int) -> tuple:
+    """Run the mock server on its own event loop; returns (loop, runner)."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    runner = asyncio.run_coroutine_threadsafe(
+        mock_server.start_mock_server(app, "127.0.0.1", port), loop
+    ).result()
+    return loop, runner
+
+
+def run_sequential(codes, data_dir: Path, url, stats):
+    logger = logging.getLogger("bench_geocode")
+    before = stats["geocode_requests"]
+    start = time.perf_counter()
+    records = [
+        location_code_mapper.process_location(code, data_dir, "mock-key", logger, url=url)
+        for code in codes
+    ]
+    wall = time.perf_counter() - start
+    geocoded = sum(1 for record in records if record and record["geocoding_success"])
+    return wall, stats["geocode_requests"] - before, geocoded
+
+
+def run(codes, data_dir: Path, workers: int, qps: float, cache_file: Path, url, stats):
+    logger = logging.getLogger("bench_geocode")
+    cache = location_code_mapper.GeocodeCache(cache_file, logger)
+    cache.load()
+    rate_limiter = location_code_mapper.RateLimiter(qps) if qps > 0 else None
+
+    before = stats["geocode_requests"]
+    start = time.perf_counter()
+    with location_code_mapper.create_geocode_session(workers) as session:
+        records, failed = location_code_mapper.geocode_locations(
+            codes, data_dir, "mock-key", logger, 30, workers, session, cache,
+            rate_limiter, url,
+        )  # fmt: skip
+    wall = time.perf_counter() - start
+    geocoded = sum(1 for record in records if record["geocoding_success"])
+    return wall, stats["geocode_requests"] - before, geocoded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark location geocoding")
+    parser.add_argument("--locations", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument(
+        "--chain-ratio", type=float, default=0.25, help="Share of chain locations"
+    )
+    parser.add_argument("--qps", type=float, default=0, help="Rate limit, 0 for none")
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--latency-jitter-ms", type=float, default=40)
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    app = mock_server.create_app(args.latency_ms, args.latency_jitter_ms)
+    loop, runner = start_server_thread(app, args.port)
+    stats = app[mock_server.STATS_KEY]
+    url = f"http://127.0.0.1:{args.port}/maps/api/geocode/json"
+
+    print(
+        f"{args.locations} locations, {args.chain_ratio:.0%} chain branches, "
+        f"mock latency {args.latency_ms}±{args.latency_jitter_ms} ms, "
+        f"rate limit {args.qps or 'none'}"
+    )
+    print(f"{'run':>16} {'wall s':>8} {'loc/s':>8} {'requests':>9} {'geocoded':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        codes = seed_locations(data_dir, args.locations, args.chain_ratio)
+
+        def report(name, wall, requests, geocoded):
+            print(
+                f"{name:>16} {wall:>8.2f} {len(codes) / wall:>8.1f} "
+                f"{requests:>9} {geocoded:>9}"
+            )
+
+        report("sequential", *run_sequential(codes, data_dir, url, stats))
+        for workers in args.workers:
+            cache_file = data_dir / f"cache_{workers}.jsonl"
+            report(
+                f"pooled x{workers}",
+                *run(codes, data_dir, workers, args.qps, cache_file, url, stats),
+            )
+        report(
+            "rerun (cached)",
+            *run(codes, data_dir, args.workers[-1], args.qps, cache_file, url, stats),
+        )
+
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["aiohttp", "pandas", "pyarrow"]
+# ///
+
+"""
+Benchmark: end-to-end load test of bulk_scraper.py against mock_server.py.
+For each location count, seeds a data directory with location files (so
+Phase 1 is skipped), starts the mock API in this process and runs
+bulk_scraper.py as a subprocess for a fixed number of cycles, sampling its
+/metrics endpoint and /proc counters. Reports, per run:
+  - machine status requests/sec, against the scheduled rate
+  - cycle overrun (how far behind its slot the latest dispatch ran), skipped
+    slots and event loop lag
+  - CPU seconds and peak RSS of the scraper process
+  - bytes written (write syscalls, and growth of the data directory)
+
+Usage:
+  uv run benchmarks/bench_load.py --locations 500 5000 50000 --interval 1 --cycles 2
+  uv run benchmarks/bench_load.py --locations 5000 --latency-ms 200 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import aiohttp
+
+sys.path.insert(0, str(Path(__file__).parent))
+import mock_server  # noqa: E402
+import synthetic  # noqa: E402
+
+SCRAPER_PATH = Path(__file__).parent.parent / "bulk_scraper.py"
+METRIC_LINE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (\S+)$")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_data_dir(data_dir: Path, locations: int, not_found_ratio: float) -> Path:
+    """Write location files for the first valid codes and return a codes file."""
+    codes = []
+    index = 0
+    while len(codes) < locations:
+        if mock_server.is_valid_code(index, not_found_ratio):
+            code = synthetic.location_code(index)
+            location_dir = data_dir / code
+            location_dir.mkdir(parents=True, exist_ok=True)
+            with open(location_dir / f"{code}.json", "w", encoding="utf-8") as f:
+                json.dump(synthetic.make_location(index), f)
+            codes.append(code)
+        index += 1
+
+    codes_file = data_dir.parent / "codes.txt"
+    codes_file.write_text("\n".join(codes) + "\n")
+    return codes_file
+
+
+def directory_bytes(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def read_proc(pid: int) -> Dict[str, int]:
+    """I/O counters and peak RSS (kB) of a process, where /proc is available."""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            for line in f:
+                key, value = line.split(": ")
+                values[key] = int(value)
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    values["peak_rss_kb"] = int(line.split()[1])
+    except OSError:
+        pass
+    return values
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Sum Prometheus samples by metric name and labels."""
+    samples = {}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            samples[name + (labels or "")] = float(value)
+    return samples
+
+
+async def scrape_metrics(
+    session: aiohttp.ClientSession, url: str
+) -> Optional[Dict[str, float]]:
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=2)) as response:
+            return parse_metrics(await response.text())
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return None
+
+
+async def run_load(locations: int, args) -> Dict[str, float]:
+    """Run bulk_scraper.py against the mock API for one location count."""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "data"
+        codes_file = seed_data_dir(data_dir, locations, args.not_found_ratio)
+        seeded_bytes = directory_bytes(data_dir)
+
+        app = mock_server.create_app(
+            args.latency_ms, args.latency_jitter_ms, args.error_rate, args.not_found_ratio
+        )
+        api_port = free_port()
+        runner = await mock_server.start_mock_server(app, "127.0.0.1", api_port)
+        metrics_port = free_port()
+        metrics_url = f"http://127.0.0.1:{metrics_port}/metrics"
+
+        cpu_before = os.times()
+        started = time.monotonic()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            str(SCRAPER_PATH),
+            "--file", str(codes_file),
+            "--interval", str(args.interval),
+            "--cycles", str(args.cycles),
+            "--max-concurrent", str(args.max_concurrent),
+            "--data-dir", str(data_dir),
+            "--log-dir", str(Path(tmp) / "logs"),
+            "--api-base-url", f"http://127.0.0.1:{api_port}",
+            "--metrics-port", str(metrics_port),
+            "--storage", args.storage,
+            "--log-summary",
+            stdout=asyncio.subprocess.DEVNULL,
+        )  # fmt: skip
+
+        proc = {}
+        overrun = lag = 0.0
+        samples = {}
+        async with aiohttp.ClientSession() as session:
+            while process.returncode is None:
+                proc = read_proc(process.pid) or proc
+                latest = await scrape_metrics(session, metrics_url)
+                if latest:
+                    samples = latest
+                    overrun = max(overrun, latest.get("washconnect_cycle_overrun_seconds", 0))
+                    lag = max(lag, latest.get("washconnect_event_loop_lag_last_seconds", 0))
+                try:
+                    await asyncio.wait_for(process.wait(), args.sample_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+        wall = time.monotonic() - started
+        cpu_after = os.times()
+        status_requests = app[mock_server.STATS_KEY]["machine_status_requests"]
+        await runner.cleanup()
+
+        return {
+            "locations": locations,
+            "returncode": process.returncode,
+            "wall": wall,
+            "requests_per_second": status_requests / (args.cycles * args.interval * 60),
+            "scheduled_per_second": locations / (args.interval * 60),
+            "overrun": overrun,
+            "skipped": samples.get("washconnect_skipped_slots_total", 0),
+            "lag": lag,
+            "cpu": (cpu_after.children_user - cpu_before.children_user)
+            + (cpu_after.children_system - cpu_before.children_system),
+            "peak_rss_mb": proc.get("peak_rss_kb", 0) / 1024,
+            "write_bytes": proc.get("wchar", 0),
+            "data_bytes": directory_bytes(data_dir) - seeded_bytes,
+        }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test bulk_scraper.py")
+    parser.add_argument("--locations", type=int, nargs="+", default=[500, 5000, 50000])
+    parser.add_argument("--interval", type=float, default=1, help="Minutes per cycle")
+    parser.add_argument("--cycles", type=int, default=2)
+    parser.add_argument("--max-concurrent", type=int, default=100)
+    parser.add_argument("--storage", choices=["csv", "parquet", "sqlite"], default="csv")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--latency-jitter-ms", type=float, default=25)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--not-found-ratio", type=float, default=0.2)
+    parser.add_argument("--sample-seconds", type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(
+        f"{args.cycles} cycles of {args.interval} min, {args.storage} storage, "
+        f"mock latency {args.latency_ms}±{args.latency_jitter_ms} ms, "
+        f"error rate {args.error_rate}"
+    )
+    print(
+        f"{'locations':>9} {'req/s':>8} {'target':>8} {'overrun':>8} {'skipped':>7} "
+        f"{'loop lag':>8} {'CPU s':>7} {'RSS MB':>7} {'written':>9} {'data':>9}"
+    )
+    for locations in args.locations:
+        result = await run_load(locations, args)
+        if result["returncode"]:
+            print(f"{locations:>9} bulk_scraper.py exited with {result['returncode']}")
+            continue
+        print(
+            f"{result['locations']:>9} {result['requests_per_second']:>8.1f} "
+            f"{result['scheduled_per_second']:>8.1f} {result['overrun']:>7.2f}s "
+            f"{result['skipped']:>7.0f} {result['lag'] * 1000:>6.1f}ms "
+            f"{result['cpu']:>7.1f} {result['peak_rss_mb']:>7.0f} "
+            f"{result['write_bytes'] / 1e6:>7.1f}MB {result['data_bytes'] / 1e6:>7.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
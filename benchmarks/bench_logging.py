@@ -0,0 +1,153 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["aiohttp", "pandas", "pyarrow"]
+# ///
+
+"""
+Benchmark: logging overhead per 1,000 machine status requests.
+Emits the log lines one successful poll produces (request, queue and write
+lines, plus an HTTP error for every tenth request) and measures the time spent
+in the calling thread, which in bulk_scraper is the event loop:
+  - sync:    the previous setup, f-string messages and FileHandler/stdout
+             handlers writing on the calling thread
+  - queue:   setup_logging (QueueHandler/QueueListener) with lazy messages
+  - summary: queue plus the --log-summary filter, which counts per-request
+             lines instead of logging them
+
+With fast local I/O the queue mostly moves the writes to another thread;
+--stdout-delay-us simulates a console that blocks on every write (a paused
+terminal, screen, a full pipe), which is where writing on the event loop hurts.
+
+Usage:
+  uv run benchmarks/bench_logging.py --requests 20000
+  uv run benchmarks/bench_logging.py --requests 5000 --stdout-delay-us 200
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+scraper_path = Path(__file__).parent.parent / "bulk_scraper.py"
+spec = importlib.util.spec_from_file_location("bulk_scraper", scraper_path)
+bulk_scraper = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bulk_scraper)
+
+PER_REQUEST = bulk_scraper.PER_REQUEST
+URL = f"{bulk_scraper.API_BASE_URL}/get_machine_status_v1?uln=CA0000001"
+
+
+def emit_eager(logger: logging.Logger, i: int, output_file: Path):
+    """Log one request the way the scraper did before lazy formatting."""
+    code = f"W{i:06d}"
+    logger.debug(f"Request successful for: {URL}")
+    if i % 10 == 0:
+        logger.warning(f"HTTP 503 error for URL: {URL}")
+    logger.debug(f"Queued machine status for {code}")
+    logger.info(f"Parsed and saved {20} records to {output_file}")
+
+
+def emit_lazy(logger: logging.Logger, i: int, output_file: Path):
+    """Log one request the way the scraper does now."""
+    code = f"W{i:06d}"
+    logger.debug("Request successful for: %s", URL, extra=PER_REQUEST)
+    if i % 10 == 0:
+        logger.warning("HTTP %s error for URL: %s", 503, URL, extra=PER_REQUEST)
+    logger.debug("Queued machine status for %s", code, extra=PER_REQUEST)
+    logger.info(
+        "Parsed and saved %d records to %s", 20, output_file, extra=PER_REQUEST
+    )
+
+
+class SlowStream:
+    """A text stream that blocks for a fixed time on every write."""
+
+    def __init__(self, stream, delay_seconds: float):
+        self.stream = stream
+        self.delay_seconds = delay_seconds
+
+    def write(self, text: str) -> int:
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def sync_logger(log_dir: Path, stdout) -> logging.Logger:
+    """The handlers setup_logging attached before the queue listener."""
+    logger = logging.getLogger("bench_logging_sync")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    for handler in (
+        logging.FileHandler(log_dir / "sync.log"),
+        logging.StreamHandler(stdout),
+    ):
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    return logger
+
+
+def measure(
+    logger: logging.Logger, emit, requests: int, output_file: Path
+) -> tuple[float, float]:
+    """Return seconds in the calling thread and until every line is written."""
+    start = time.perf_counter()
+    for i in range(requests):
+        emit(logger, i, output_file)
+    calling = time.perf_counter() - start
+
+    for handler in logger.handlers:
+        listener = getattr(handler, "listener", None)
+        if listener is not None:
+            # Wait for the listener thread to write out the queue
+            listener.stop()
+            listener.start()
+    return calling, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark logging overhead")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--stdout-delay-us", type=float, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        log_dir = Path(tmp)
+        output_file = log_dir / "W000001" / "parsed.csv"
+        stdout = SlowStream(devnull, args.stdout_delay_us / 1e6)
+
+        results = {}
+        results["sync"] = measure(
+            sync_logger(log_dir, stdout), emit_eager, args.requests, output_file
+        )
+
+        # setup_logging's console handler writes to whatever sys.stdout is
+        with contextlib.redirect_stdout(stdout):
+            logger = bulk_scraper.setup_logging(log_dir)
+        results["queue"] = measure(logger, emit_lazy, args.requests, output_file)
+
+        request_log = bulk_scraper.RequestLogSummary()
+        logger.addFilter(request_log)
+        results["summary"] = measure(logger, emit_lazy, args.requests, output_file)
+        logger.removeFilter(request_log)
+
+    print(f"{args.requests} requests, milliseconds per 1,000 requests:")
+    for mode, (calling, total) in results.items():
+        per_1000 = 1000 * 1000 / args.requests
+        print(
+            f"{mode:>8}: {calling * per_1000:.2f} in the calling thread, "
+            f"{total * per_1000:.2f} until written"
+        )
+
+
+if __name__ == "__main__":
+    main()
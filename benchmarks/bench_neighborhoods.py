@@ -0,0 +1,95 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["numpy", "pandas"]
+# ///
+
+"""
+Benchmark: neighborhood spatial join, grid index vs polygon-by-polygon scan.
+Draws random points over San Francisco, joins them with
+NeighborhoodIndex.lookup_many and with a per-point pure Python scan over every
+neighborhood, checks that both agree, and reports index build and join times.
+
+Usage:
+  uv run benchmarks/bench_neighborhoods.py --points 10000
+"""
+
+import argparse
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+neighborhoods_path = Path(__file__).parent.parent / "neighborhoods.py"
+spec = importlib.util.spec_from_file_location("neighborhoods", neighborhoods_path)
+neighborhoods = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(neighborhoods)
+
+
+def scan_lookup(index, latitude: float, longitude: float):
+    """Reference join: even-odd test against every neighborhood in turn."""
+    for name, (x1, y1, x2, y2) in zip(index.names, index.edges):
+        inside = False
+        for ax, ay, bx, by in zip(x1.tolist(), y1.tolist(), x2.tolist(), y2.tolist()):
+            if (ay > latitude) != (by > latitude) and longitude < ax + (
+                latitude - ay
+            ) * (bx - ax) / (by - ay):
+                inside = not inside
+        if inside:
+            return name
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the neighborhood join")
+    parser.add_argument("--points", type=int, default=10000)
+    parser.add_argument(
+        "--scan-points", type=int, default=1000, help="Points checked by the slow scan"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = neighborhoods.NeighborhoodIndex.from_geojson()
+    build = time.perf_counter() - start
+
+    rng = np.random.default_rng(args.seed)
+    latitudes = rng.uniform(37.70, 37.82, args.points)
+    longitudes = rng.uniform(-122.52, -122.35, args.points)
+
+    index.lookup_many(latitudes[:10], longitudes[:10])
+    start = time.perf_counter()
+    joined = index.lookup_many(latitudes, longitudes)
+    grid = time.perf_counter() - start
+
+    checked = min(args.scan_points, args.points)
+    start = time.perf_counter()
+    expected = [
+        scan_lookup(index, latitudes[i], longitudes[i]) for i in range(checked)
+    ]
+    scan = time.perf_counter() - start
+
+    mismatches = [i for i in range(checked) if joined[i] != expected[i]]
+    if mismatches:
+        i = mismatches[0]
+        print(
+            f"{len(mismatches)} mismatches, first at ({latitudes[i]}, {longitudes[i]}): "
+            f"grid {joined[i]!r}, scan {expected[i]!r}"
+        )
+        sys.exit(1)
+
+    matched = sum(1 for name in joined if name is not None)
+    print(f"Parity OK for {checked} points; {matched}/{args.points} in a neighborhood")
+    print(f"Index build ({len(index.names)} neighborhoods): {build * 1000:.1f} ms")
+    print(f"Grid join of {args.points} points: {grid * 1000:.1f} ms")
+    print(
+        f"Scan join: {scan / checked * args.points * 1000:.0f} ms "
+        f"(extrapolated from {checked} points)"
+    )
+
+
+if __name__ == "__main__":
+    main()
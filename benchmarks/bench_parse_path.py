@@ -0,0 +1,145 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["aiohttp", "pandas"]
+# ///
+
+"""
+Benchmark: disk round-trip parse vs in-memory parse in bulk_scraper.
+Compares CPU time and read/write syscalls per poll cycle for:
+  - disk:   save_json -> parse_and_cleanup_location_data (glob, load, unlink)
+  - memory: parse_and_cleanup_location_data(status_data=...) with the location
+            registry warmed at startup, as run_bulk_scraper does
+
+Usage:
+  uv run benchmarks/bench_parse_path.py --locations 470 --cycles 3
+
+Syscall counts come from /proc/self/io (Linux only). For a full breakdown run
+the script under `strace -c -f`.
+"""
+
+import argparse
+import datetime
+import importlib.util
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+import synthetic  # noqa: E402
+
+scraper_path = Path(__file__).parent.parent / "bulk_scraper.py"
+spec = importlib.util.spec_from_file_location("bulk_scraper", scraper_path)
+bulk_scraper = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bulk_scraper)
+
+
+def read_proc_io() -> Optional[Dict[str, int]]:
+    """Read syscall counters for this process, if available."""
+    try:
+        with open("/proc/self/io", "r") as f:
+            return {
+                key: int(value)
+                for key, value in (line.split(": ") for line in f.read().splitlines())
+            }
+    except OSError:
+        return None
+
+
+def setup_data_dir(data_dir: Path, locations: int):
+    """Write cached location files the way Phase 1 would."""
+    for index in range(locations):
+        code = synthetic.location_code(index)
+        location_dir = data_dir / code
+        location_dir.mkdir(parents=True, exist_ok=True)
+        with open(location_dir / f"{code}.json", "w", encoding="utf-8") as f:
+            json.dump(synthetic.make_location(index), f, indent=2)
+
+
+def run_cycle(
+    mode: str,
+    data_dir: Path,
+    locations: int,
+    logger: logging.Logger,
+    registry=None,
+):
+    """Run one poll cycle worth of parsing in the given mode."""
+    now = datetime.datetime.now(datetime.UTC)
+    request_time = synthetic.format_time(now)
+
+    for index in range(locations):
+        code = synthetic.location_code(index)
+        status = synthetic.make_status(index, now)
+
+        if mode == "disk":
+            status_file = data_dir / code / f"{synthetic.uln_for(index)}-{request_time}.json"
+            bulk_scraper.save_json(status, status_file, logger)
+            bulk_scraper.parse_and_cleanup_location_data(code, data_dir, logger)
+        else:
+            bulk_scraper.parse_and_cleanup_location_data(
+                code,
+                data_dir,
+                logger,
+                status_data=status,
+                request_time=request_time,
+                registry=registry,
+            )
+
+
+def benchmark(mode: str, locations: int, cycles: int, logger: logging.Logger):
+    """Benchmark a parse mode and print per-cycle averages."""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        setup_data_dir(data_dir, locations)
+
+        registry = None
+        if mode == "memory":
+            registry = bulk_scraper.parser.LocationRegistry(data_dir, logger)
+            codes = [synthetic.location_code(index) for index in range(locations)]
+            bulk_scraper.get_existing_locations(data_dir, codes, registry)
+
+        io_before = read_proc_io()
+        cpu_before = time.process_time()
+        wall_before = time.perf_counter()
+
+        for _ in range(cycles):
+            run_cycle(mode, data_dir, locations, logger, registry)
+            # Ensure distinct request_time values between cycles
+            time.sleep(0.001)
+
+        wall = (time.perf_counter() - wall_before) / cycles
+        cpu = (time.process_time() - cpu_before) / cycles
+        io_after = read_proc_io()
+
+    print(f"{mode:>6}: cpu {cpu:.3f}s/cycle, wall {wall:.3f}s/cycle", end="")
+    if io_before and io_after:
+        reads = (io_after["syscr"] - io_before["syscr"]) / cycles
+        writes = (io_after["syscw"] - io_before["syscw"]) / cycles
+        print(f", read syscalls {reads:.0f}/cycle, write syscalls {writes:.0f}/cycle")
+    else:
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk_scraper parse paths")
+    parser.add_argument("--locations", type=int, default=470)
+    parser.add_argument("--cycles", type=int, default=3)
+    args = parser.parse_args()
+
+    # Silence per-location logging so it doesn't dominate the measurement
+    logger = logging.getLogger("bench_parse_path")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    print(f"{args.locations} locations, {args.cycles} cycles")
+    for mode in ("disk", "memory"):
+        benchmark(mode, args.locations, args.cycles, logger)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["aiohttp", "pandas", "pyarrow"]
+# ///
+
+"""
+Benchmark: usage questions answered from raw records vs scrape-time rollups.
+Parses synthetic polls with parse_and_cleanup_location_data, as the writer
+thread does, once without and once with a RollupWriter flushed every cycle,
+and reports the ingest cost of keeping the rollups. Then answers three
+questions (busiest hour of day, utilization by location, washers vs dryers)
+by scanning every parsed.csv and by reading the hourly rollup, checks that
+both agree, and reports the rows read and query times.
+
+Usage:
+  uv run benchmarks/bench_rollups.py --locations 100 --cycles 48
+  uv run benchmarks/bench_rollups.py --locations 300 --cycles 96 --poll-minutes 15
+"""
+
+import argparse
+import datetime
+import importlib.util
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+import synthetic  # noqa: E402
+
+scraper_path = Path(__file__).parent.parent / "bulk_scraper.py"
+spec = importlib.util.spec_from_file_location("bulk_scraper", scraper_path)
+bulk_scraper = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bulk_scraper)
+rollups = bulk_scraper.rollups
+
+START = datetime.datetime(2025, 9, 1, tzinfo=datetime.UTC)
+
+
+def setup_data_dir(data_dir: Path, locations: int, logger: logging.Logger):
+    """Write cached location files and return a warmed location registry."""
+    for index in range(locations):
+        code = synthetic.location_code(index)
+        location_dir = data_dir / code
+        location_dir.mkdir(parents=True, exist_ok=True)
+        with open(location_dir / f"{code}.json", "w", encoding="utf-8") as f:
+            json.dump(synthetic.make_location(index), f)
+
+    registry = bulk_scraper.parser.LocationRegistry(data_dir, logger)
+    codes = [synthetic.location_code(index) for index in range(locations)]
+    bulk_scraper.get_existing_locations(data_dir, codes, registry)
+    return registry
+
+
+def ingest(data_dir: Path, args, logger: logging.Logger, with_rollups: bool) -> float:
+    """Parse every poll of every cycle; returns CPU seconds per cycle."""
+    registry = setup_data_dir(data_dir, args.locations, logger)
+    writer = bulk_scraper.storage.CsvWriter(data_dir)
+    rollup_writer = None
+    if with_rollups:
+        rollup_writer = rollups.RollupWriter(
+            rollups.RollupStore(data_dir / rollups.ROLLUP_FILENAME)
+        )
+
+    cpu_before = time.process_time()
+    for cycle in range(args.cycles):
+        now = START + datetime.timedelta(minutes=cycle * args.poll_minutes)
+        request_time = synthetic.format_time(now)
+        for index in range(args.locations):
+            status = synthetic.make_status(
+                index, now, rng=random.Random(cycle * args.locations + index)
+            )
+            bulk_scraper.parse_and_cleanup_location_data(
+                synthetic.location_code(index),
+                data_dir,
+                logger,
+                status_data=status,
+                request_time=request_time,
+                writer=writer,
+                registry=registry,
+                rollup_writer=rollup_writer,
+            )
+        writer.flush()
+        if rollup_writer is not None:
+            rollup_writer.flush()
+    cpu = (time.process_time() - cpu_before) / args.cycles
+
+    if rollup_writer is not None:
+        rollup_writer.close()
+    return cpu
+
+
+def answer(usage: pd.DataFrame) -> dict:
+    """The three questions, from rows with bucket_start, location_id, type and counts."""
+    usage = usage.assign(
+        observed=usage[rollups.STATUS_COUNTS].sum(axis=1),
+        hour=usage["bucket_start"].dt.hour,
+    )
+
+    def share(by):
+        totals = usage.groupby(by)[["in_use", "observed"]].sum()
+        return (totals["in_use"] / totals["observed"]).round(9)
+
+    by_hour = share("hour")
+    return {
+        "busiest_hour": int(by_hour.idxmax()),
+        "by_location": share("location_id"),
+        "by_type": share("type"),
+    }
+
+
+def raw_query(data_dir: Path, logger: logging.Logger) -> tuple:
+    """Scan every parsed.csv and count statuses per record."""
+    records = pd.concat(
+        rollups.iter_stored_records(data_dir, "csv", logger), ignore_index=True
+    )
+    status = records["status"].astype(str)
+    usage = pd.DataFrame(
+        {
+            "bucket_start": pd.to_datetime(records["request_time"], utc=True, format="ISO8601"),
+            "location_id": records["location_id"].astype(str),
+            "type": records["type"].astype(str),
+            **{name: (status == name).astype("int64") for name in rollups.STATUS_COUNTS},
+        }
+    )
+    return answer(usage), len(records)
+
+
+def rollup_query(data_dir: Path) -> tuple:
+    """Read the hourly rollup."""
+    store = rollups.RollupStore(data_dir / rollups.ROLLUP_FILENAME)
+    usage = store.read(granularity="1h")
+    store.close()
+    return answer(usage), len(usage)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark usage rollups")
+    parser.add_argument("--locations", type=int, default=100)
+    parser.add_argument("--cycles", type=int, default=48)
+    parser.add_argument(
+        "--poll-minutes", type=float, default=5, help="Minutes between polls"
+    )
+    args = parser.parse_args()
+
+    # Silence per-location logging so it doesn't dominate the measurement
+    logger = logging.getLogger("bench_rollups")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    print(
+        f"{args.locations} locations x 20 machines, {args.cycles} polls "
+        f"{args.poll_minutes:g} minutes apart"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = ingest(Path(tmp), args, logger, with_rollups=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        with_rollups = ingest(data_dir, args, logger, with_rollups=True)
+        print(
+            f"Ingest CPU: {plain * 1000:.0f} ms/cycle without rollups, "
+            f"{with_rollups * 1000:.0f} ms/cycle with ({with_rollups / plain - 1:+.1%})"
+        )
+
+        raw_seconds, (raw, raw_rows) = timed(raw_query, data_dir, logger)
+        rollup_seconds, (rolled, rollup_rows) = timed(rollup_query, data_dir)
+
+    for key in raw:
+        expected, actual = raw[key], rolled[key]
+        same = (
+            expected.equals(actual) if isinstance(expected, pd.Series) else expected == actual
+        )
+        if not same:
+            print(f"Mismatch in {key}: raw {expected!r}, rollup {actual!r}")
+            sys.exit(1)
+
+    print(f"Answers agree (busiest hour {raw['busiest_hour']:02d}:00 UTC)")
+    print(f"Raw scan:      {raw_rows:>9} rows read, {raw_seconds * 1000:8.1f} ms")
+    print(f"Hourly rollup: {rollup_rows:>9} rows read, {rollup_seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["numpy", "pandas", "pyarrow"]
+# ///
+
+"""
+Benchmark: per-machine calculate_status vs calculate_status_vectorized.
+Checks that parser.build_records_frame gives exactly the same statuses as
+parser.build_records (including edge cases such as missing, naive and
+unparseable start times) and reports throughput in rows/sec for both. Both
+paths end in a DataFrame, since that is what the parser writes out. Chunks
+that only hold idle machines or only malformed dates are checked on their
+own, since a chunk is what the vectorized path parses at once.
+
+Usage:
+  uv run benchmarks/bench_status.py --snapshots 2000
+"""
+
+import argparse
+import datetime
+import importlib.util
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+import synthetic  # noqa: E402
+
+parser_path = Path(__file__).parent.parent / "parser.py"
+spec = importlib.util.spec_from_file_location("parser", parser_path)
+parser = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(parser)
+
+
+def edge_case_payload(now: datetime.datetime) -> dict:
+    """Machines covering every branch of calculate_status."""
+    exactly_due = synthetic.format_time(now - datetime.timedelta(minutes=30))
+    machines = [
+        {"start_time": None, "time_remaining": 10, "status": "IN_USE"},
+        {"start_time": "", "time_remaining": 10, "status": "IN_USE"},
+        {"start_time": "2025-01-01T10:00:00", "time_remaining": 10, "status": "IN_USE"},
+        {"start_time": "not a time", "time_remaining": 10, "status": "IN_USE"},
+        {"start_time": "2024-13-45T00:00:00Z", "time_remaining": 10, "status": "IN_USE"},
+        {"start_time": exactly_due, "time_remaining": 30, "status": "IN_USE"},
+        {"start_time": exactly_due, "time_remaining": 29, "status": "IN_USE"},
+        {"start_time": exactly_due, "time_remaining": 0, "status": "IN_USE"},
+        {"start_time": exactly_due, "time_remaining": 30, "status": "ERROR"},
+        {
+            "start_time": (now - datetime.timedelta(minutes=5)).isoformat(),
+            "time_remaining": 10,
+            "status": "IN_USE",
+        },
+        {
+            "start_time": synthetic.format_time(now + datetime.timedelta(minutes=5)),
+            "time_remaining": 10,
+            "status": "IN_USE",
+        },
+    ]
+    return machines_payload(machines)
+
+
+def machines_payload(machines: list) -> dict:
+    for number, machine in enumerate(machines, 1):
+        machine["machine_number"] = str(number)
+        machine["type"] = "washer"
+    return {"data": {"R1-0": {"machines": machines}}}
+
+
+def idle_payload() -> dict:
+    """Every machine available, so no start_time at all."""
+    return machines_payload(
+        [{"start_time": None, "time_remaining": 0, "status": "AVAILABLE"} for _ in range(10)]
+    )
+
+
+def malformed_payload() -> dict:
+    """Only start times that look like the API's format but are not valid dates."""
+    return machines_payload(
+        [
+            {"start_time": start_time, "time_remaining": 10, "status": "IN_USE"}
+            for start_time in ("2024-13-45T00:00:00Z", "2024-02-30T10:00:00.000Z")
+        ]
+    )
+
+
+def check_parity(location_fields, payloads, logger) -> list:
+    """Return (record, expected, actual) for every row where the two paths differ."""
+    records = []
+    for status_data, request_time in payloads:
+        records.extend(
+            parser.build_records(location_fields, status_data, request_time, logger)
+        )
+    df = parser.build_records_frame(location_fields, payloads, logger)
+    expected = [record["status"] for record in records]
+    actual = df["status"].tolist()
+    if len(expected) != len(actual):
+        return [(None, f"{len(expected)} rows", f"{len(actual)} rows")]
+    return [
+        (record, a, b) for record, a, b in zip(records, expected, actual) if a != b
+    ]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark status computation")
+    arg_parser.add_argument("--snapshots", type=int, default=2000)
+    args = arg_parser.parse_args()
+
+    logger = logging.getLogger("bench_status")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    location_fields = parser.extract_location_fields(synthetic.make_location(0))
+    rng = random.Random(0)
+    start = datetime.datetime(2025, 9, 27, tzinfo=datetime.UTC)
+
+    payloads = []
+    for i in range(args.snapshots):
+        now = start + datetime.timedelta(minutes=15 * i)
+        payloads.append((synthetic.make_status(0, now, rng=rng), synthetic.format_time(now)))
+    payloads.append((edge_case_payload(start), synthetic.format_time(start)))
+
+    scalar_start = time.perf_counter()
+    records = []
+    for status_data, request_time in payloads:
+        records.extend(
+            parser.build_records(location_fields, status_data, request_time, logger)
+        )
+    pd.DataFrame(records)
+    scalar_seconds = time.perf_counter() - scalar_start
+
+    vector_start = time.perf_counter()
+    df = parser.build_records_frame(location_fields, payloads, logger)
+    vector_seconds = time.perf_counter() - vector_start
+
+    expected = [record["status"] for record in records]
+    actual = df["status"].tolist()
+    mismatches = [i for i, (a, b) in enumerate(zip(expected, actual)) if a != b]
+
+    if len(expected) != len(actual) or mismatches:
+        print(f"PARITY FAILED: {len(mismatches)} mismatches, rows {len(expected)} vs {len(actual)}")
+        for i in mismatches[:10]:
+            print(f"  {records[i]}: expected {expected[i]}, got {actual[i]}")
+        sys.exit(1)
+
+    request_time = synthetic.format_time(start)
+    for name, payload in (("all idle", idle_payload()), ("malformed", malformed_payload())):
+        mismatches = check_parity(location_fields, [(payload, request_time)], logger)
+        if mismatches:
+            print(f"PARITY FAILED for the {name} chunk:")
+            for record, expected_status, actual_status in mismatches[:10]:
+                print(f"  {record}: expected {expected_status}, got {actual_status}")
+            sys.exit(1)
+
+    rows = len(records)
+    print(f"Parity OK for {rows} rows")
+    print(f"    scalar: {rows / scalar_seconds:,.0f} rows/sec ({scalar_seconds:.3f}s)")
+    print(f"vectorized: {rows / vector_seconds:,.0f} rows/sec ({vector_seconds:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
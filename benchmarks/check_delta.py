@@ -0,0 +1,121 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["numpy", "pandas", "pyarrow"]
+# ///
+
+"""
+Check: change-only encoding survives a restart with idle machines.
+Encodes one poll of a location where most machines are idle (no start_time),
+saves the DeltaEncoder state, loads it into a new encoder and encodes a second
+poll with the same machine states. Nothing may be emitted, whichever parse path
+(in-memory build_records or build_records_frame for status files) produced
+either poll, and the state file must be strict JSON (no NaN).
+Exits non-zero on the first failed case.
+
+Usage:
+  uv run benchmarks/check_delta.py
+"""
+
+import datetime
+import importlib.util
+import json
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+import synthetic  # noqa: E402
+
+parser_path = Path(__file__).parent.parent / "parser.py"
+spec = importlib.util.spec_from_file_location("parser", parser_path)
+parser = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(parser)
+
+
+# The busy machine's cycle started before both polls, so its state is unchanged
+STARTED = datetime.datetime(2025, 9, 27, 17, 55, tzinfo=datetime.UTC)
+
+
+def status_payload() -> dict:
+    """Nine idle machines and one that started at STARTED."""
+    machines = [
+        {"start_time": None, "time_remaining": 0, "status": "AVAILABLE"} for _ in range(9)
+    ]
+    machines.append(
+        {
+            "start_time": synthetic.format_time(STARTED),
+            "time_remaining": 40,
+            "status": "IN_USE",
+        }
+    )
+    for number, machine in enumerate(machines, 1):
+        machine["machine_number"] = str(number)
+        machine["type"] = "washer"
+    return {"data": {"R1-0": {"machines": machines}}}
+
+
+def parse(path: str, location_fields, now: datetime.datetime, logger) -> list:
+    """Records as the scraper hands them to DeltaEncoder.encode."""
+    payload = status_payload()
+    request_time = synthetic.format_time(now)
+    if path == "memory":
+        records = parser.build_records(location_fields, payload, request_time, logger)
+        df = pd.DataFrame(records)
+    else:
+        df = parser.build_records_frame(location_fields, [(payload, request_time)], logger)
+    return df.to_dict("records")
+
+
+def reject_constant(name: str):
+    raise ValueError(f"non-standard JSON constant {name}")
+
+
+def main():
+    logger = logging.getLogger("check_delta")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    location_fields = parser.extract_location_fields(synthetic.make_location(0))
+    first = datetime.datetime(2025, 9, 27, 18, 0, tzinfo=datetime.UTC)
+    second = first + datetime.timedelta(minutes=15)
+
+    failed = False
+    for first_path in ("memory", "file"):
+        for second_path in ("memory", "file"):
+            with tempfile.TemporaryDirectory() as tmp:
+                state_file = Path(tmp) / "delta_state.json"
+                encoder = parser.DeltaEncoder(state_file)
+                emitted = encoder.encode(parse(first_path, location_fields, first, logger))
+                encoder.save(logger)
+                problem = None
+                try:
+                    json.loads(state_file.read_text(), parse_constant=reject_constant)
+                except ValueError as e:
+                    problem = f"state file is not strict JSON ({e})"
+
+                restarted = parser.DeltaEncoder(state_file)
+                restarted.load(logger)
+                repeated = restarted.encode(
+                    parse(second_path, location_fields, second, logger)
+                )
+                if problem is None and repeated:
+                    problem = f"{len(repeated)} spurious transitions after the restart"
+
+            name = f"{first_path} -> save/load -> {second_path}"
+            detail = f"{len(emitted)} first-poll transitions"
+            if problem:
+                detail += f", {problem}"
+            print(f"{'FAIL' if problem else 'OK  '} {name}: {detail}")
+            failed = failed or problem is not None
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["aiohttp", "pandas", "requests", "python-dotenv"]
+# ///
+
+"""
+Check: location_code_mapper.py concurrent geocoding against a local stand-in
+geocoder (a threaded HTTP server in this process that logs every request).
+  - duplicates:  chain branches share a query; every unique query is
+                 requested and cached exactly once across the workers
+  - rate limit:  with --qps and a burst of 1, requests arrive no faster than
+                 the limit
+  - cache resume: after an interrupted run, only uncached queries are requested
+  - CLI resume:  a second location_code_mapper.py run skips every checkpointed
+                 code and sends no requests
+Exits non-zero on the first failed case.
+
+Usage:
+  uv run benchmarks/check_geocode.py
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).parent))
+import bench_geocode  # noqa: E402
+import mock_server  # noqa: E402
+
+location_code_mapper = bench_geocode.location_code_mapper
+MAPPER = Path(__file__).parent.parent / "location_code_mapper.py"
+
+LOCATIONS = 40
+CHAIN_RATIO = 0.5
+WORKERS = 8
+QPS = 20
+LATENCY_SECONDS = 0.02
+
+
+class StandInGeocoder:
+    """Google-shaped geocoder on a background thread that logs (time, address)."""
+
+    def __init__(self):
+        self.requests = []
+        lock = threading.Lock()
+        requests = self.requests
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                arrived = time.monotonic()
+                address = parse_qs(urlsplit(self.path).query).get("address", [""])[0]
+                with lock:
+                    requests.append((arrived, address))
+                time.sleep(LATENCY_SECONDS)
+                body = json.dumps(mock_server.geocode_result(address, 0)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/maps/api/geocode/json"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def take(self) -> list:
+        """Return and clear the requests logged so far."""
+        taken = list(self.requests)
+        self.requests.clear()
+        return taken
+
+
+def geocode(codes, data_dir: Path, geocoder: StandInGeocoder, rate_limiter=None):
+    logger = logging.getLogger("check_geocode")
+    cache = location_code_mapper.GeocodeCache(
+        data_dir / location_code_mapper.GEOCODE_CACHE_FILENAME, logger
+    )
+    cache.load()
+    with location_code_mapper.create_geocode_session(WORKERS) as session:
+        records, failed = location_code_mapper.geocode_locations(
+            codes, data_dir, "stand-in-key", logger, 30, WORKERS, session, cache,
+            rate_limiter, geocoder.url,
+        )  # fmt: skip
+    return records, failed, geocoder.take()
+
+
+def unique_queries(codes, data_dir: Path) -> set:
+    logger = logging.getLogger("check_geocode")
+    queries = set()
+    for code in codes:
+        name, state, _ = location_code_mapper.load_location_fields(code, data_dir, logger)
+        queries.add(location_code_mapper.normalize_query(
+            location_code_mapper.build_search_query(name, state)
+        ))  # fmt: skip
+    return queries
+
+
+def cache_lines(data_dir: Path) -> list:
+    cache_file = data_dir / location_code_mapper.GEOCODE_CACHE_FILENAME
+    with open(cache_file, "r", encoding="utf-8") as f:
+        return [json.loads(line)["query"] for line in f]
+
+
+def check_duplicates(geocoder, data_dir, codes, expected) -> list:
+    records, failed, requests = geocode(codes, data_dir, geocoder)
+    requested = Counter(location_code_mapper.normalize_query(a) for _, a in requests)
+    problems = []
+    if len(records) != len(codes) or failed:
+        problems.append(f"{len(records)} records and {failed} failures for {len(codes)} codes")
+    if set(requested) != expected or max(requested.values()) > 1:
+        twice = [query for query, count in requested.items() if count > 1]
+        problems.append(
+            f"{len(requests)} requests for {len(expected)} unique queries "
+            f"({len(twice)} requested more than once)"
+        )
+    lines = cache_lines(data_dir)
+    if sorted(lines) != sorted(expected):
+        problems.append(f"{len(lines)} cache lines for {len(expected)} unique queries")
+    return problems
+
+
+def check_rate_limit(geocoder, data_dir, codes, expected) -> list:
+    limiter = location_code_mapper.RateLimiter(QPS, capacity=1)
+    _, _, requests = geocode(codes, data_dir, geocoder, limiter)
+    arrivals = sorted(arrived for arrived, _ in requests)
+    problems = []
+    if len(arrivals) != len(expected):
+        problems.append(f"{len(arrivals)} requests for {len(expected)} unique queries")
+    # The n-th request may not arrive before n / QPS seconds after the first
+    early = [
+        i for i, arrived in enumerate(arrivals) if arrived - arrivals[0] < i / QPS - 0.01
+    ]
+    if early:
+        problems.append(f"{len(early)} requests arrived faster than {QPS}/s")
+    return problems
+
+
+def check_cache_resume(geocoder, data_dir, codes, expected) -> list:
+    geocode(codes, data_dir, geocoder)
+    # Keep the first half of the cache, as if the run had been interrupted
+    cache_file = data_dir / location_code_mapper.GEOCODE_CACHE_FILENAME
+    kept = cache_file.read_text(encoding="utf-8").splitlines(keepends=True)
+    kept = kept[: len(kept) // 2]
+    cache_file.write_text("".join(kept), encoding="utf-8")
+    cached = {json.loads(line)["query"] for line in kept}
+
+    _, _, requests = geocode(codes, data_dir, geocoder)
+    requested = {location_code_mapper.normalize_query(a) for _, a in requests}
+    if requested & cached or requested != expected - cached:
+        return [
+            f"{len(requests)} requests after resuming with {len(cached)} of "
+            f"{len(expected)} queries cached ({len(requested & cached)} of them cached)"
+        ]
+    return []
+
+
+def check_cli_resume(geocoder, data_dir, codes, expected) -> list:
+    command = [
+        sys.executable, str(MAPPER), "--data-dir", str(data_dir),
+        "--geocode-url", geocoder.url, "--workers", str(WORKERS),
+    ]  # fmt: skip
+    env = {**os.environ, "GOOGLE_MAPS_API_KEY": "stand-in-key"}
+    problems = []
+    for run, expected_requests in (("first", len(expected)), ("second", 0)):
+        result = subprocess.run(
+            command, capture_output=True, text=True, env=env, cwd=data_dir, timeout=300
+        )
+        requests = geocoder.take()
+        if result.returncode != 0 or len(requests) != expected_requests:
+            problems.append(
+                f"{run} run: exit code {result.returncode}, {len(requests)} requests "
+                f"(expected {expected_requests})"
+            )
+            print(result.stdout[-2000:])
+    return problems
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    geocoder = StandInGeocoder()
+    cases = [
+        ("duplicates", check_duplicates),
+        ("rate limit", check_rate_limit),
+        ("cache resume", check_cache_resume),
+        ("CLI resume", check_cli_resume),
+    ]
+
+    failed = False
+    for name, check in cases:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp)
+            codes = bench_geocode.seed_locations(data_dir, LOCATIONS, CHAIN_RATIO)
+            expected = unique_queries(codes, data_dir)
+            problems = check(geocoder, data_dir, codes, expected)
+        print(f"{'FAIL' if problems else 'OK  '} {name}: {'; '.join(problems) or 'passed'}")
+        failed = failed or bool(problems)
+
+    geocoder.server.shutdown()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
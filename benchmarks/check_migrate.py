@@ -0,0 +1,139 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["numpy", "pandas", "pyarrow"]
+# ///
+
+"""
+Check: storage.py migrate with one malformed parsed.csv among good ones.
+The malformed file has a bad request_time after enough good rows that part
+files were already flushed. Small chunk and flush sizes force several flushes
+per file.
+  - first run:  every good file is migrated exactly once, nothing of the
+                malformed file is left in the store
+  - rerun:      nothing is migrated again
+  - after fix:  once the malformed file is repaired, only it is migrated
+Exits non-zero on the first failed case.
+
+Usage:
+  uv run benchmarks/check_migrate.py
+"""
+
+import datetime
+import importlib.util
+import logging
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+import synthetic  # noqa: E402
+
+root = Path(__file__).parent.parent
+modules = {}
+for name in ("parser", "storage"):
+    spec = importlib.util.spec_from_file_location(name, root / f"{name}.py")
+    modules[name] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modules[name])
+parser, storage = modules["parser"], modules["storage"]
+
+LOCATIONS = 4
+MALFORMED = 1
+POLLS = 12
+START = datetime.datetime(2025, 9, 1, tzinfo=datetime.UTC)
+
+
+def location_records(index: int, logger) -> pd.DataFrame:
+    """POLLS polls of one synthetic location, 20 machines each."""
+    location_fields = parser.extract_location_fields(synthetic.make_location(index))
+    frames = []
+    for poll in range(POLLS):
+        now = START + datetime.timedelta(hours=poll * 3)
+        status = synthetic.make_status(index, now, rng=random.Random(poll))
+        records = parser.build_records(
+            location_fields, status, synthetic.format_time(now), logger
+        )
+        frames.append(pd.DataFrame(records))
+    return storage.sort_records(pd.concat(frames, ignore_index=True))
+
+
+def stored_counts(data_dir: Path) -> dict:
+    """Rows per location_id in the Parquet store."""
+    store_dir = data_dir / storage.STORE_DIRNAME
+    if not store_dir.exists():
+        return {}
+    table = storage.ParquetStore(store_dir).dataset().to_table(columns=["location_id"])
+    return table.to_pandas()["location_id"].astype(str).value_counts().to_dict()
+
+
+def main():
+    logger = logging.getLogger("check_migrate")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    # Several chunks and flushes per file
+    storage.CSV_CHUNK_SIZE = 50
+    storage.ParquetStore.FLUSH_ROWS = 100
+
+    failed = False
+
+    def report(name: str, problem, detail: str):
+        nonlocal failed
+        print(f"{'FAIL' if problem else 'OK  '} {name}: {problem or detail}")
+        failed = failed or bool(problem)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        writer = storage.CsvWriter(data_dir)
+        expected = {}
+        for index in range(LOCATIONS):
+            df = location_records(index, logger)
+            location_id = str(df["location_id"].iloc[0])
+            if index == MALFORMED:
+                good = df
+                df = df.copy()
+                df.loc[len(df) - 1, "request_time"] = "not a time"
+                malformed_id = location_id
+            else:
+                expected[location_id] = len(df)
+            writer.write(df, synthetic.location_code(index))
+
+        rows = storage.migrate_csv_files(data_dir, logger)
+        counts = stored_counts(data_dir)
+        problem = None
+        if counts != expected:
+            problem = f"stored rows per location {counts}, expected {expected}"
+        elif rows != sum(expected.values()):
+            problem = f"reported {rows} rows, expected {sum(expected.values())}"
+        report(
+            "first run",
+            problem,
+            f"{len(expected)} good files migrated once, malformed file rolled back",
+        )
+
+        rows = storage.migrate_csv_files(data_dir, logger)
+        problem = None
+        if rows or stored_counts(data_dir) != expected:
+            problem = f"{rows} rows migrated again, stored {stored_counts(data_dir)}"
+        report("rerun", problem, "nothing migrated again")
+
+        malformed_file = data_dir / synthetic.location_code(MALFORMED) / storage.CSV_FILENAME
+        malformed_file.unlink()
+        storage.CsvWriter(data_dir).write(good, synthetic.location_code(MALFORMED))
+        expected[malformed_id] = len(good)
+        rows = storage.migrate_csv_files(data_dir, logger)
+        problem = None
+        if rows != len(good) or stored_counts(data_dir) != expected:
+            problem = f"{rows} rows migrated, stored {stored_counts(data_dir)}"
+        report("after fix", problem, f"only the repaired file migrated ({rows} rows)")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
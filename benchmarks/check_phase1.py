@@ -0,0 +1,106 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["aiohttp", "pandas", "pyarrow"]
+# ///
+
+"""
+Check: Phase 1 location lookups in bulk_scraper.py against mock_server.py.
+Runs bulk_scraper.py for one cycle on fresh data directories and checks that
+every code was requested exactly once and saved:
+  - single batch: a handful of --codes, where the batch interval is 0
+  - slow batches: more codes than one batch, with mock latency longer than
+    the interval between batches
+Exits non-zero on the first failed case.
+
+Usage:
+  uv run benchmarks/check_phase1.py
+"""
+
+import asyncio
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import mock_server  # noqa: E402
+import synthetic  # noqa: E402
+
+SCRAPER = Path(__file__).parent.parent / "bulk_scraper.py"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_case(name: str, codes: int, interval_minutes: float, latency_ms: float) -> bool:
+    """Run Phase 1 (and one polling cycle) for codes W000001.. and check the result."""
+    app = mock_server.create_app(latency_ms, 0, not_found_ratio=0)
+    port = free_port()
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    runner = asyncio.run_coroutine_threadsafe(
+        mock_server.start_mock_server(app, "127.0.0.1", port), loop
+    ).result()
+
+    location_codes = [synthetic.location_code(index) for index in range(codes)]
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "data"
+        result = subprocess.run(
+            [
+                sys.executable,
+                str(SCRAPER),
+                "--codes",
+                *location_codes,
+                "--interval",
+                str(interval_minutes),
+                "--cycles",
+                "1",
+                "--api-base-url",
+                f"http://127.0.0.1:{port}",
+                "--data-dir",
+                str(data_dir),
+                "--log-dir",
+                str(Path(tmp) / "logs"),
+            ],
+            capture_output=True,
+            text=True,
+            timeout=300,
+        )
+        saved = [code for code in location_codes if (data_dir / code / f"{code}.json").exists()]
+
+    requests = app[mock_server.STATS_KEY]["locations_requests"]
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+    ok = result.returncode == 0 and requests == codes and len(saved) == codes
+    print(
+        f"{'OK  ' if ok else 'FAIL'} {name}: {codes} codes, {requests} location requests, "
+        f"{len(saved)} saved, exit code {result.returncode}"
+    )
+    if not ok:
+        print(result.stdout[-3000:])
+        print(result.stderr[-3000:])
+    return ok
+
+
+def main():
+    cases = [
+        # One batch: calculate_batch_parameters returns an interval of 0
+        ("single batch", 3, 0.05, 20),
+        # 12 codes over 3s: 3 batches 1s apart, each request taking 1.5s
+        ("slow batches", 12, 0.05, 1500),
+    ]
+    for case in cases:
+        if not run_case(*case):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["aiohttp"]
+# ///
+
+"""
+Local stand-in for the Wash Connect API.
+Serves /locations?srcode= and /get_machine_status_v1?uln= with synthetic rooms
+and machines (see synthetic.py), so bulk_scraper.py can be load tested without
+touching the production Cloud Functions. Location W000001 has ULN CA0000001,
+and so on. Response latency, the 5xx error rate and the share of codes that
+return 404 are configurable; which codes are missing is deterministic, so
+is_valid_code() tells a harness which locations exist. /stats returns request
+counts as JSON.
+
+It also answers /maps/api/geocode/json?address= like the Google Geocoding API,
+with a point in San Francisco derived from the address (ZERO_RESULTS for the
+same share of addresses as 404 codes), for location_code_mapper.py.
+
+Usage:
+  uv run benchmarks/mock_server.py --port 8080 --latency-ms 80 --error-rate 0.01
+  uv run bulk_scraper.py --range W000001 W000500 --api-base-url http://127.0.0.1:8080
+  uv run location_code_mapper.py --geocode-url http://127.0.0.1:8080/maps/api/geocode/json
+"""
+
+import argparse
+import asyncio
+import datetime
+import random
+import zlib
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).parent))
+import synthetic  # noqa: E402
+
+# Request counters served on /stats, also readable in process as app[STATS_KEY]
+STATS_KEY = web.AppKey("stats", Counter)
+
+# Knuth's multiplicative hash spreads missing codes evenly over a range
+HASH_MULTIPLIER = 2654435761
+
+# Mock geocoding results fall inside this (south, west, north, east) box
+SF_BOUNDS = (37.708, -122.515, 37.812, -122.357)
+
+
+def is_valid_code(index: int, not_found_ratio: float) -> bool:
+    """Whether the location at a zero-based index exists (doesn't return 404)."""
+    return (index * HASH_MULTIPLIER % 2**32) / 2**32 >= not_found_ratio
+
+
+def parse_index(value: str, prefix_length: int) -> int:
+    """Return the zero-based index of a location code or ULN, or -1."""
+    try:
+        return int(value[prefix_length:]) - 1
+    except ValueError:
+        return -1
+
+
+def geocode_result(address: str, not_found_ratio: float) -> dict:
+    """A Geocoding API response for an address, the same on every call."""
+    digest = zlib.crc32(address.strip().lower().encode("utf-8"))
+    if not is_valid_code(digest, not_found_ratio):
+        return {"status": "ZERO_RESULTS", "results": []}
+
+    south, west, north, east = SF_BOUNDS
+    rng = random.Random(digest)
+    lat = south + rng.random() * (north - south)
+    lng = west + rng.random() * (east - west)
+    street = f"{100 + digest % 3900} Mock St"
+    return {
+        "status": "OK",
+        "results": [
+            {
+                "formatted_address": f"{street}, San Francisco, CA 94110, USA",
+                "address_components": [
+                    {"long_name": "San Francisco", "short_name": "SF", "types": ["locality"]}
+                ],
+                "geometry": {
+                    "location": {"lat": round(lat, 7), "lng": round(lng, 7)},
+                    "location_type": "ROOFTOP",
+                },
+                "place_id": f"mock-{digest:08x}",
+                "types": ["laundry", "establishment"],
+            }
+        ],
+    }
+
+
+def create_app(
+    latency_ms: float = 50,
+    latency_jitter_ms: float = 25,
+    error_rate: float = 0.0,
+    not_found_ratio: float = 0.2,
+    seed: int = 0,
+) -> web.Application:
+    """Build the mock API application."""
+    rng = random.Random(seed)
+    stats = Counter()
+
+    async def respond(endpoint: str, index: Optional[int], build) -> web.Response:
+        """Count, delay and maybe fail a request; index None skips the 404 check."""
+        stats[f"{endpoint}_requests"] += 1
+
+        latency = latency_ms + rng.uniform(-latency_jitter_ms, latency_jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+        if rng.random() < error_rate:
+            stats[f"{endpoint}_errors"] += 1
+            return web.Response(status=rng.choice((429, 500, 503)))
+        if index is not None and (index < 0 or not is_valid_code(index, not_found_ratio)):
+            stats[f"{endpoint}_not_found"] += 1
+            return web.json_response({"error": "not found"}, status=404)
+
+        return web.json_response(build(index))
+
+    async def locations(request: web.Request) -> web.Response:
+        index = parse_index(request.query.get("srcode", ""), 1)
+        return await respond("locations", index, synthetic.make_location)
+
+    async def machine_status(request: web.Request) -> web.Response:
+        index = parse_index(request.query.get("uln", ""), 2)
+        now = datetime.datetime.now(datetime.UTC)
+        return await respond(
+            "machine_status",
+            index,
+            lambda index: synthetic.make_status(index, now, rng=rng),
+        )
+
+    async def geocode(request: web.Request) -> web.Response:
+        address = request.query.get("address", "")
+        # Missing places are a ZERO_RESULTS payload, not an HTTP 404
+        return await respond(
+            "geocode", None, lambda index: geocode_result(address, not_found_ratio)
+        )
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(dict(stats))
+
+    app = web.Application()
+    app[STATS_KEY] = stats
+    app.router.add_get("/locations", locations)
+    app.router.add_get("/get_machine_status_v1", machine_status)
+    app.router.add_get("/maps/api/geocode/json", geocode)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+async def start_mock_server(app: web.Application, host: str, port: int) -> web.AppRunner:
+    """Start serving app; call cleanup() on the result to stop."""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port, backlog=1024).start()
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Wash Connect API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--latency-jitter-ms", type=float, default=25)
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Share of 429/500/503 responses"
+    )
+    parser.add_argument(
+        "--not-found-ratio", type=float, default=0.2, help="Share of codes that 404"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app(
+        args.latency_ms,
+        args.latency_jitter_ms,
+        args.error_rate,
+        args.not_found_ratio,
+        args.seed,
+    )
+    print(f"Mock Wash Connect API on http://{args.host}:{args.port}")
+    web.run_app(app, host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Synthetic Wash Connect payloads for benchmarks.
+Generates location and machine status responses shaped like the real API.
+"""
+
+import datetime
+import random
+from typing import Dict, Any
+
+
+def format_time(dt: datetime.datetime) -> str:
+    """Format a datetime the same way bulk_scraper stamps request times."""
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ")[:-3] + "Z"
+
+
+def location_code(index: int) -> str:
+    """Return a location code for an index (W000001, W000002, ...)."""
+    return f"W{index + 1:06d}"
+
+
+def uln_for(index: int) -> str:
+    """Return a ULN for an index."""
+    return f"CA{index + 1:07d}"
+
+
+def make_location(index: int, rooms: int = 2) -> Dict[str, Any]:
+    """Build a location response for an index."""
+    return {
+        "location": {
+            "location_id": f"loc-{index + 1}",
+            "location_name": f"Synthetic Laundry {index + 1}",
+            "sitecode": f"S{index + 1:05d}",
+            "uln": uln_for(index),
+        },
+        "rooms": [
+            {
+                "room_id": f"R{index + 1}-{room}",
+                "room_name": f"Room {room}",
+                "id": (index + 1) * 100 + room,
+            }
+            for room in range(rooms)
+        ],
+    }
+
+
+def make_status(
+    index: int,
+    now: datetime.datetime,
+    rooms: int = 2,
+    machines_per_room: int = 10,
+    rng: random.Random = None,
+) -> Dict[str, Any]:
+    """Build a machine status response for an index at a point in time."""
+    rng = rng or random.Random(index)
+    data = {}
+
+    for room in range(rooms):
+        machines = []
+        for number in range(1, machines_per_room + 1):
+            roll = rng.random()
+            if roll < 0.05:
+                status, time_remaining, start_time = "ERROR", 0, None
+            elif roll < 0.5:
+                status, time_remaining, start_time = "AVAILABLE", 0, None
+            else:
+                status = "IN_USE"
+                time_remaining = rng.randint(1, 60)
+                start_time = format_time(
+                    now - datetime.timedelta(minutes=rng.randint(0, 90))
+                )
+
+            machines.append(
+                {
+                    "machine_number": str(number),
+                    "start_time": start_time,
+                    "time_remaining": time_remaining,
+                    "type": "washer" if number % 2 else "dryer",
+                    "status": status,
+                }
+            )
+
+        data[f"R{index + 1}-{room}"] = {"machines": machines}
+
+    return {"data": data}
@@ -2,14 +2,15 @@
 #
 # /// script
 # requires-python = ">=3.12"
-# dependencies = ["requests", "aiohttp", "asyncio", "pandas"]
+# dependencies = ["requests", "aiohttp", "asyncio", "pandas", "pyarrow"]
 # ///
 
 """
 Bulk API Scraper for Wash Mobile Pay
 Scrapes location data and machine status from API endpoints for a list of location codes.
 Distributes requests evenly across time intervals with parallel processing.
-Now includes integrated parsing to CSV and cleanup of JSON files.
+Now includes integrated parsing of responses straight to CSV (raw JSON is only
+kept on disk with --archive-raw).
 
 Usage:
   # Using a range (original functionality)
@@ -24,15 +25,27 @@ Usage:
 
 import argparse
 import asyncio
+import atexit
+import contextlib
 import json
 import logging
+import logging.handlers
+import queue
+import threading
 import sys
 import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Set
+from typing import Dict, Any, Iterable, Optional, List, Set
 import re
 import math
+import functools
+import time
+import heapq
+import random
 import importlib.util
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 
 import aiohttp
 import pandas as pd
@@ -46,9 +59,40 @@ spec = importlib.util.spec_from_file_location("parser", parser_path)
 parser = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(parser)
 
+# Import storage module at global scope
+storage_path = Path(__file__).parent / "storage.py"
+if not storage_path.exists():
+    raise ImportError(f"storage.py not found at {storage_path}")
+
+spec = importlib.util.spec_from_file_location("storage", storage_path)
+storage = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(storage)
+
+# Import metrics module at global scope
+metrics_path = Path(__file__).parent / "metrics.py"
+if not metrics_path.exists():
+    raise ImportError(f"metrics.py not found at {metrics_path}")
+
+spec = importlib.util.spec_from_file_location("metrics", metrics_path)
+metrics = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(metrics)
+
+# Import rollups module at global scope
+rollups_path = Path(__file__).parent / "rollups.py"
+if not rollups_path.exists():
+    raise ImportError(f"rollups.py not found at {rollups_path}")
+
+spec = importlib.util.spec_from_file_location("rollups", rollups_path)
+rollups = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(rollups)
+
 
 def setup_logging(log_dir: Path) -> logging.Logger:
-    """Setup logging configuration."""
+    """Setup logging configuration.
+
+    The logger only puts records on a queue; a QueueListener thread writes
+    them to the log file and stdout, so the event loop never waits on log I/O.
+    """
     log_dir.mkdir(parents=True, exist_ok=True)
     log_file = log_dir / "bulk_scraper.log"
 
@@ -74,12 +118,62 @@ def setup_logging(log_dir: Path) -> logging.Logger:
     file_handler.setFormatter(formatter)
     console_handler.setFormatter(formatter)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    logger.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    # Same attribute logging.config sets for a configured QueueHandler
+    queue_handler.listener = listener
+    listener.start()
+    # Drain queued records before the interpreter exits
+    atexit.register(listener.stop)
 
     return logger
 
 
+# Passed as extra= on log lines emitted once per request, which --log-summary
+# folds into one summary line per cycle
+PER_REQUEST = {"per_request": True}
+
+
+class RequestLogSummary(logging.Filter):
+    """
+    Logger filter behind --log-summary.
+
+    Drops per-request records (logged with extra=PER_REQUEST) and counts them
+    by level and message template instead; log_summary() logs the counts and
+    resets them. Hot-path messages use lazy %-style arguments, so dropped
+    records are never formatted. The writer thread logs too, hence the lock.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.counts: Counter = Counter()
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "per_request", False):
+            return True
+        with self.lock:
+            self.counts[(record.levelname, record.msg)] += 1
+        return False
+
+    def log_summary(self, logger: logging.Logger):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+        if counts:
+            logger.info(
+                "Per-request log lines: %s",
+                "; ".join(
+                    f"{count} x {level} {template!r}"
+                    for (level, template), count in counts.most_common()
+                ),
+            )
+
+
 def parse_location_code(location_code: str) -> tuple[str, int]:
     """Parse location code to extract prefix and number."""
     match = re.match(r"([A-Z]+)(\d+)", location_code.upper())
@@ -158,33 +252,341 @@ def validate_location_codes(codes: List[str], logger: logging.Logger) -> List[st
     return valid_codes
 
 
-def load_failed_codes(data_dir: Path) -> Set[str]:
-    """Load list of location codes that have failed with 404."""
-    failed_file = data_dir / "failed_codes.json"
-    try:
-        if failed_file.exists():
-            with open(failed_file, "r") as f:
-                return set(json.load(f))
-    except Exception:
-        pass
-    return set()
+FAILURES_FILENAME = "failed_codes.jsonl"
+LEGACY_FAILED_CODES_FILENAME = "failed_codes.json"
+
+
+class FailureRegistry:
+    """
+    Location codes whose lookup failed, with a time-to-live retry policy.
+
+    Every outcome is appended to data/failed_codes.jsonl as one
+    {"code", "status", "count", "time"} line (later lines win), so updates never
+    rewrite the file. count is the number of consecutive 404s; a 200 clears
+    the code. A code is skipped until its TTL, base_ttl * 2 ** (count - 1)
+    capped at max_ttl, has passed since the last attempt; expired codes are
+    then re-probed. The log is compacted on load once it holds many more lines
+    than codes, and the legacy failed_codes.json list is imported once.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        logger: logging.Logger,
+        base_ttl: float = 24 * 3600,
+        max_ttl: float = 30 * 24 * 3600,
+    ):
+        self.log_file = data_dir / FAILURES_FILENAME
+        self.legacy_file = data_dir / LEGACY_FAILED_CODES_FILENAME
+        self.logger = logger
+        self.base_ttl = base_ttl
+        self.max_ttl = max_ttl
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    def load(self) -> int:
+        """Load the failure log, importing failed_codes.json if needed."""
+        lines = 0
+        if self.log_file.exists():
+            with open(self.log_file, "r", encoding="utf-8") as f:
+                for line_num, line in enumerate(f, 1):
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                        self._apply(entry)
+                    except (ValueError, KeyError) as e:
+                        # A torn last line from an interrupted append is expected
+                        self.logger.warning(
+                            f"Skipping bad entry on line {line_num} of {self.log_file}: {e}"
+                        )
+        elif self.legacy_file.exists() and self._import_legacy():
+            self._compact()
 
+        if lines > 2 * len(self.entries) + 1000:
+            self._compact()
 
-def save_failed_codes(failed_codes: Set[str], data_dir: Path):
-    """Save list of location codes that have failed with 404."""
-    failed_file = data_dir / "failed_codes.json"
-    try:
-        data_dir.mkdir(parents=True, exist_ok=True)
-        with open(failed_file, "w") as f:
-            json.dump(list(failed_codes), f, indent=2)
-    except Exception as e:
-        logging.getLogger("bulk_api_scraper").error(f"Failed to save failed codes: {e}")
+        return len(self.entries)
 
+    def _apply(self, entry: Dict[str, Any]):
+        if entry["status"] == 200:
+            self.entries.pop(entry["code"], None)
+        else:
+            self.entries[entry["code"]] = entry
 
-async def make_request(
-    session: aiohttp.ClientSession, url: str, logger: logging.Logger, timeout: int = 30
+    def _import_legacy(self) -> bool:
+        try:
+            with open(self.legacy_file, "r") as f:
+                codes = json.load(f)
+            attempted = self.legacy_file.stat().st_mtime
+        except Exception as e:
+            self.logger.error(f"Failed to import {self.legacy_file}: {e}")
+            return False
+
+        for code in codes:
+            self.entries[code] = {"code": code, "status": 404, "count": 1, "time": attempted}
+        self.logger.info(f"Imported {len(codes)} failed codes from {self.legacy_file}")
+        return True
+
+    def _compact(self):
+        """Rewrite the log with one line per code."""
+        try:
+            self.log_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.log_file.with_suffix(".tmp")
+            with open(temp_file, "w", encoding="utf-8") as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry) + "\n")
+            temp_file.replace(self.log_file)
+
+            if self.legacy_file.exists():
+                self.legacy_file.rename(self.legacy_file.with_suffix(".json.migrated"))
+        except Exception as e:
+            self.logger.error(f"Failed to compact {self.log_file}: {e}")
+
+    def record(self, code: str, status_code: int):
+        """Record the outcome of a location lookup.
+
+        A 200 clears the code and a 404 increases its failure count; other
+        statuses (5xx, timeouts) only update the last attempt, so the code is
+        retried after its current TTL.
+        """
+        previous = self.entries.get(code)
+        if status_code == 200:
+            if previous is None:
+                return
+            count = 0
+        elif status_code == 404:
+            count = (previous["count"] if previous else 0) + 1
+        elif previous is None:
+            return
+        else:
+            count = previous["count"]
+
+        entry = {"code": code, "status": status_code, "count": count, "time": time.time()}
+        self._apply(entry)
+        try:
+            self.log_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except Exception as e:
+            self.logger.error(f"Failed to record failure for {code}: {e}")
+
+    def ttl(self, code: str) -> float:
+        count = self.entries[code]["count"]
+        return min(self.max_ttl, self.base_ttl * 2 ** max(0, count - 1))
+
+    def is_blocked(self, code: str, now: Optional[float] = None) -> bool:
+        """Whether a code failed recently enough that it should not be retried yet."""
+        entry = self.entries.get(code)
+        if entry is None:
+            return False
+        return (now or time.time()) < entry["time"] + self.ttl(code)
+
+    def expired(
+        self, codes: Optional[Iterable[str]] = None, now: Optional[float] = None
+    ) -> List[str]:
+        """Failed codes (optionally limited to codes) due for a re-probe, oldest first."""
+        now = now or time.time()
+        candidates = self.entries if codes is None else [c for c in codes if c in self.entries]
+        due = [code for code in candidates if not self.is_blocked(code, now)]
+        return sorted(due, key=lambda code: self.entries[code]["time"])
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def is_overload_status(status_code: int) -> bool:
+    """Whether a status means the upstream is overloaded (0 is a timeout or error)."""
+    return status_code in (0, 429) or status_code >= 500
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker for one API host.
+
+    Tracks whether each of the last `window` requests failed with an overload
+    status (timeout, 429 or 5xx). Once at least min_requests are in the window
+    and the failed share reaches threshold, the breaker opens and every
+    request to the host waits for cooldown seconds. Then a single probe
+    request goes through: success closes the breaker, failure reopens it for
+    twice as long (up to max_cooldown).
+    """
+
+    def __init__(
+        self,
+        host: str,
+        threshold: float = 0.5,
+        window: int = 50,
+        min_requests: int = 20,
+        cooldown: float = 30,
+        max_cooldown: float = 300,
+    ):
+        self.host = host
+        self.threshold = threshold
+        self.min_requests = min_requests
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.open_until = 0.0
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self._changed = asyncio.Event()
+
+    async def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Wait until a request may be sent; False if deadline passes first."""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if self.state == "closed":
+                return True
+            if now >= self.open_until:
+                # This caller is the probe; if it never reports back another
+                # one is let through after the cooldown
+                self.state = "half_open"
+                self.open_until = now + self.cooldown
+                return True
+
+            wake_at = self.open_until
+            if deadline is not None:
+                if now >= deadline:
+                    return False
+                wake_at = min(wake_at, deadline)
+
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), wake_at - now)
+            except asyncio.TimeoutError:
+                pass
+
+    def record(self, failed: bool) -> bool:
+        """Record a request outcome; returns True if the breaker just opened."""
+        if self.state == "half_open":
+            if failed:
+                self._open(min(self.max_cooldown, self.cooldown * 2))
+                return True
+            self.state = "closed"
+            self.cooldown = self.base_cooldown
+            self.outcomes.clear()
+            self._changed.set()
+            return False
+
+        if self.state == "open":
+            # Stragglers sent before the breaker opened
+            return False
+
+        self.outcomes.append(failed)
+        if (
+            len(self.outcomes) >= self.min_requests
+            and sum(self.outcomes) >= self.threshold * len(self.outcomes)
+        ):
+            self._open(self.cooldown)
+            return True
+        return False
+
+    def _open(self, cooldown: float):
+        self.state = "open"
+        self.cooldown = cooldown
+        self.open_until = asyncio.get_running_loop().time() + cooldown
+        self._changed.set()
+
+
+class RetryPolicy:
+    """
+    Retry settings and counters for make_request, with a circuit breaker per host.
+
+    Timeouts, 429s and 5xx responses are retried up to max_retries times after
+    a full-jitter exponential backoff (uniform between 0 and
+    base_delay * 2 ** attempt, capped at max_delay). A retry is only made if
+    its backoff ends before the request's deadline, so retries stay inside
+    the location's scheduling slot. Counters are kept per cycle and in total,
+    like ConnectionStats.
+    """
+
+    COUNTERS = (
+        "attempts",
+        "retries",
+        "retries_exhausted",
+        "retries_past_deadline",
+        "breaker_opened",
+        "breaker_rejected",
+    )
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        breaker_threshold: float = 0.5,
+        breaker_window: int = 50,
+        breaker_cooldown: float = 30.0,
+    ):
+        self.logger = logger
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_window = breaker_window
+        self.breaker_cooldown = breaker_cooldown
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.totals = dict.fromkeys(self.COUNTERS, 0)
+        self.reset()
+
+    def reset(self):
+        self.cycle = dict.fromkeys(self.COUNTERS, 0)
+
+    def count(self, counter: str):
+        self.cycle[counter] += 1
+        self.totals[counter] += 1
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                host,
+                self.breaker_threshold,
+                self.breaker_window,
+                min(self.breaker_window, 20),
+                self.breaker_cooldown,
+            )
+            self.breakers[host] = breaker
+        return breaker
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def log_summary(self):
+        cycle = self.cycle
+        open_hosts = [
+            host for host, breaker in self.breakers.items() if breaker.state != "closed"
+        ]
+        self.logger.info(
+            f"Retries: {cycle['attempts']} attempts, {cycle['retries']} retries, "
+            f"{cycle['retries_exhausted']} gave up after {self.max_retries} retries, "
+            f"{cycle['retries_past_deadline']} out of time; circuit breaker opened "
+            f"{cycle['breaker_opened']} times, {cycle['breaker_rejected']} requests "
+            f"timed out waiting"
+            + (f" (open: {', '.join(open_hosts)})" if open_hosts else "")
+        )
+        self.reset()
+
+
+async def send_request(
+    session: aiohttp.ClientSession,
+    url: str,
+    logger: logging.Logger,
+    timeout: float = 30,
+    timing: Optional[Dict[str, datetime.datetime]] = None,
 ) -> tuple[Optional[Dict[str, Any]], int]:
-    """Make HTTP request and return JSON response and status code."""
+    """Make a single HTTP request and return JSON response and status code.
+
+    If timing is given, its "sent" and "received" entries are set to the
+    anchored send and receive times of this request.
+    """
+    if timing is not None:
+        timing["sent"] = anchored_now()
     try:
         async with session.get(
             url, timeout=aiohttp.ClientTimeout(total=timeout)
@@ -192,34 +594,422 @@ async def make_request(
             status_code = response.status
             if status_code == 200:
                 data = await response.json()
-                logger.debug(f"Request successful for: {url}")
+                logger.debug("Request successful for: %s", url, extra=PER_REQUEST)
                 return data, status_code
             else:
-                logger.warning(f"HTTP {status_code} error for URL: {url}")
+                logger.warning("HTTP %s error for URL: %s", status_code, url, extra=PER_REQUEST)
                 return None, status_code
 
     except asyncio.TimeoutError:
-        logger.error(f"Timeout error for URL: {url}")
+        logger.error("Timeout error for URL: %s", url, extra=PER_REQUEST)
         return None, 0
     except Exception as e:
-        logger.error(f"Request failed for URL {url}: {e}")
+        logger.error("Request failed for URL %s: %s", url, e, extra=PER_REQUEST)
         return None, 0
+    finally:
+        if timing is not None:
+            timing["received"] = anchored_now()
+
+
+async def make_request(
+    session: aiohttp.ClientSession,
+    url: str,
+    logger: logging.Logger,
+    timeout: int = 30,
+    retry: Optional[RetryPolicy] = None,
+    deadline: Optional[float] = None,
+    timing: Optional[Dict[str, datetime.datetime]] = None,
+    shrink_timeout: bool = True,
+) -> tuple[Optional[Dict[str, Any]], int]:
+    """Make HTTP request and return JSON response and status code.
+
+    With a retry policy, requests wait while the host's circuit breaker is
+    open and transient failures are retried with backoff. deadline (event
+    loop time) bounds the whole call: no attempt or backoff runs past it.
+    With shrink_timeout False, every attempt gets the full timeout and the
+    deadline only decides whether a retry is started.
+    timing is passed to send_request, so it holds the times of the last attempt.
+    """
+    if retry is None:
+        return await send_request(session, url, logger, timeout, timing)
+
+    loop = asyncio.get_running_loop()
+    breaker = retry.breaker(url)
+
+    for attempt in range(retry.max_retries + 1):
+        if not await breaker.acquire(deadline):
+            retry.count("breaker_rejected")
+            logger.warning(
+                "Circuit breaker for %s still open, skipping %s",
+                breaker.host,
+                url,
+                extra=PER_REQUEST,
+            )
+            return None, 0
+
+        attempt_timeout = timeout
+        if deadline is not None and shrink_timeout:
+            attempt_timeout = min(timeout, deadline - loop.time())
+            if attempt_timeout <= 0:
+                retry.count("retries_past_deadline")
+                return None, 0
+
+        retry.count("attempts")
+        data, status_code = await send_request(
+            session, url, logger, attempt_timeout, timing
+        )
+
+        failed = is_overload_status(status_code)
+        if breaker.record(failed):
+            retry.count("breaker_opened")
+            logger.warning(
+                f"Circuit breaker for {breaker.host} opened, pausing requests for "
+                f"{breaker.cooldown:.0f}s"
+            )
+        if not failed:
+            return data, status_code
+
+        if attempt == retry.max_retries:
+            retry.count("retries_exhausted")
+            break
+
+        delay = retry.backoff(attempt)
+        if deadline is not None and loop.time() + delay >= deadline:
+            retry.count("retries_past_deadline")
+            break
+
+        retry.count("retries")
+        logger.debug(
+            "Retrying %s in %.2fs (attempt %d)", url, delay, attempt + 2, extra=PER_REQUEST
+        )
+        await asyncio.sleep(delay)
+
+    return data, status_code
+
+
+# Overridden with --api-base-url, e.g. to run against benchmarks/mock_server.py
+API_BASE_URL = "https://us-central1-washmobilepay.cloudfunctions.net"
+
+# All requests go to a single host, so idle connections are kept open long
+# enough to be reused between scheduled dispatches
+KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 300
+
+
+class ConnectionStats:
+    """
+    Connection reuse counters collected through aiohttp tracing.
+
+    Counts new connections, reused pooled connections, TLS handshakes (new
+    connections for https requests), requests that waited for a free pool slot
+    and DNS cache hits/misses. Counters are reset after each cycle summary.
+    """
+
+    COUNTERS = (
+        "requests",
+        "new_connections",
+        "reused_connections",
+        "tls_handshakes",
+        "queued_for_connection",
+        "dns_cache_hits",
+        "dns_cache_misses",
+    )
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self.totals = dict.fromkeys(self.COUNTERS, 0)
+        self.reset()
+
+    def reset(self):
+        self.cycle = dict.fromkeys(self.COUNTERS, 0)
+
+    def _count(self, counter: str):
+        self.cycle[counter] += 1
+        self.totals[counter] += 1
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            context.https = params.url.scheme == "https"
+            self._count("requests")
+
+        async def on_connection_create_end(session, context, params):
+            self._count("new_connections")
+            if getattr(context, "https", False):
+                self._count("tls_handshakes")
+
+        async def on_connection_reuseconn(session, context, params):
+            self._count("reused_connections")
+
+        async def on_connection_queued_start(session, context, params):
+            self._count("queued_for_connection")
+
+        async def on_dns_cache_hit(session, context, params):
+            self._count("dns_cache_hits")
+
+        async def on_dns_cache_miss(session, context, params):
+            self._count("dns_cache_misses")
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+
+        return trace_config
+
+    def log_summary(self):
+        cycle = self.cycle
+        reuse_rate = (
+            cycle["reused_connections"] / cycle["requests"] * 100
+            if cycle["requests"]
+            else 0
+        )
+        self.logger.info(
+            f"Connections: {cycle['requests']} requests, "
+            f"{cycle['new_connections']} new ({cycle['tls_handshakes']} TLS handshakes), "
+            f"{cycle['reused_connections']} reused ({reuse_rate:.1f}%), "
+            f"{cycle['queued_for_connection']} waited for a connection, "
+            f"DNS cache {cycle['dns_cache_hits']} hits / {cycle['dns_cache_misses']} misses"
+        )
+        self.reset()
+
+
+class ScraperMetrics:
+    """
+    The bulk scraper's metrics, registered on a metrics.MetricsRegistry.
+
+    Request latency and response statuses per endpoint come from aiohttp
+    tracing, schedule metrics from PollScheduler and writer job durations from
+    WriterStage. Counters the scraper already keeps (connection stats, retry
+    counters, writer queue) are exported through scrape-time callbacks.
+    """
+
+    def __init__(self, registry: "metrics.MetricsRegistry"):
+        self.registry = registry
+        self.request_seconds = registry.histogram(
+            "washconnect_request_duration_seconds",
+            "API request latency until response headers, per endpoint",
+            ("endpoint",),
+        )
+        self.responses = registry.counter(
+            "washconnect_responses_total",
+            "API responses per endpoint and HTTP status (timeout or error if none)",
+            ("endpoint", "status"),
+        )
+        self.cycles = registry.counter(
+            "washconnect_cycles_total", "Completed polling cycles"
+        )
+        self.cycle_seconds = registry.gauge(
+            "washconnect_cycle_duration_seconds", "Duration of the last polling cycle"
+        )
+        self.cycle_overrun_seconds = registry.gauge(
+            "washconnect_cycle_overrun_seconds",
+            "How far behind its slot the latest dispatch of the last cycle ran",
+        )
+        self.polls = registry.counter(
+            "washconnect_polls_total", "Location polls by result", ("result",)
+        )
+        self.skipped_slots = registry.counter(
+            "washconnect_skipped_slots_total",
+            "Polling slots skipped because dispatch fell a whole interval behind",
+        )
+        self.schedule_jitter_seconds = registry.histogram(
+            "washconnect_schedule_jitter_seconds",
+            "Dispatch time minus scheduled time",
+            buckets=metrics.LAG_BUCKETS,
+        )
+        self.loop_lag_seconds = registry.histogram(
+            "washconnect_event_loop_lag_seconds",
+            "Event loop wake-up delay",
+            buckets=metrics.LAG_BUCKETS,
+        )
+        self.loop_lag_last_seconds = registry.gauge(
+            "washconnect_event_loop_lag_last_seconds",
+            "Most recent event loop wake-up delay",
+        )
+        self.writer_job_seconds = registry.histogram(
+            "washconnect_writer_job_duration_seconds",
+            "Writer thread job durations (parse_and_cleanup_location_data, "
+            "save_json, flush_writer, ...)",
+            ("job",),
+            buckets=metrics.DURATION_BUCKETS,
+        )
+
+    def export_totals(self, name: str, help_text: str, totals: Dict[str, int]):
+        """Export a dict of running totals as one counter labelled by event."""
+        self.registry.counter(
+            name,
+            help_text,
+            ("event",),
+            lambda: {(event,): value for event, value in totals.items()},
+        )
+
+    def watch_writer(self, writer_stage: "WriterStage"):
+        for key, help_text in (
+            ("queue_depth", "Jobs waiting for the writer thread"),
+            ("queue_capacity", "Writer queue size before submits block"),
+            ("max_queue_depth", "Highest writer queue depth seen"),
+        ):
+            self.registry.gauge(
+                f"washconnect_writer_{key}",
+                help_text,
+                function=lambda key=key: writer_stage.metrics()[key],
+            )
+        self.registry.counter(
+            "washconnect_writer_blocked_submits_total",
+            "Submits that waited for room in the writer queue",
+            function=lambda: writer_stage.blocked_submits,
+        )
+
+    def watch_scheduler(self, scheduler: "PollScheduler"):
+        self.registry.gauge(
+            "washconnect_in_flight_polls",
+            "Polls dispatched and not yet finished",
+            function=lambda: scheduler.in_flight,
+        )
+        self.registry.gauge(
+            "washconnect_scheduled_locations",
+            "Locations being polled",
+            function=lambda: len(scheduler.location_items),
+        )
+
+    def watch_breakers(self, retry: "RetryPolicy"):
+        self.registry.gauge(
+            "washconnect_circuit_breaker_open",
+            "1 while requests to a host are paused by its circuit breaker",
+            ("host",),
+            lambda: {
+                (host,): int(breaker.state != "closed")
+                for host, breaker in retry.breakers.items()
+            },
+        )
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            context.endpoint = params.url.path.rsplit("/", 1)[-1]
+            context.started = asyncio.get_running_loop().time()
+
+        async def on_request_end(session, context, params):
+            self.request_seconds.observe(
+                asyncio.get_running_loop().time() - context.started,
+                endpoint=context.endpoint,
+            )
+            self.responses.inc(
+                endpoint=context.endpoint, status=str(params.response.status)
+            )
+
+        async def on_request_exception(session, context, params):
+            status = (
+                "timeout"
+                if isinstance(params.exception, asyncio.TimeoutError)
+                else "error"
+            )
+            self.responses.inc(endpoint=context.endpoint, status=status)
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+
+        return trace_config
+
+    @contextlib.asynccontextmanager
+    async def serve(self, host: str, port: int, logger: logging.Logger):
+        """Serve /metrics and sample event loop lag for the duration of the block."""
+        runner = await metrics.start_metrics_server(self.registry, host, port, logger)
+        lag_task = asyncio.create_task(
+            metrics.monitor_event_loop_lag(
+                self.loop_lag_seconds, self.loop_lag_last_seconds
+            )
+        )
+        try:
+            yield
+        finally:
+            lag_task.cancel()
+            await runner.cleanup()
+
+
+def create_session(
+    max_concurrent: int,
+    connection_stats: Optional[ConnectionStats] = None,
+    scraper_metrics: Optional[ScraperMetrics] = None,
+) -> aiohttp.ClientSession:
+    """Create the shared session with a connector tuned for a single API host.
+
+    The pool allows max_concurrent connections in total and to the API host,
+    DNS lookups are cached and idle connections are kept alive for reuse.
+    aiohttp already enables TCP_NODELAY on every connection it opens.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=max_concurrent,
+        limit_per_host=max_concurrent,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        use_dns_cache=True,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    trace_configs = [
+        stats.trace_config()
+        for stats in (connection_stats, scraper_metrics)
+        if stats is not None
+    ]
+    return aiohttp.ClientSession(
+        connector=connector, trace_configs=trace_configs or None
+    )
+
+
+# Wall clock anchored to the monotonic clock at startup, so request timestamps
+# are consistent with each other even if the system clock steps mid-run
+CLOCK_ANCHOR_WALL = datetime.datetime.now(datetime.UTC)
+CLOCK_ANCHOR_MONOTONIC = time.monotonic()
+
+
+def anchored_now() -> datetime.datetime:
+    """Return the current UTC time derived from the monotonic clock."""
+    return CLOCK_ANCHOR_WALL + datetime.timedelta(
+        seconds=time.monotonic() - CLOCK_ANCHOR_MONOTONIC
+    )
+
+
+def format_request_time(timestamp: datetime.datetime) -> str:
+    """Format a timestamp the way status filenames and records expect it."""
+    return timestamp.strftime("%Y-%m-%dT%H:%M:%S.%fZ")[:-3] + "Z"
 
 
 async def get_location_data(
-    session: aiohttp.ClientSession, location_code: str, logger: logging.Logger
+    session: aiohttp.ClientSession,
+    location_code: str,
+    logger: logging.Logger,
+    retry: Optional[RetryPolicy] = None,
+    deadline: Optional[float] = None,
 ) -> tuple[Optional[Dict[str, Any]], int]:
-    """Get location data from the first API endpoint."""
-    url = f"https://us-central1-washmobilepay.cloudfunctions.net/locations?srcode={location_code}"
-    return await make_request(session, url, logger)
+    """Get location data from the first API endpoint.
+
+    A location is only looked up once, so a deadline never cuts an attempt
+    short; it only stops retries.
+    """
+    url = f"{API_BASE_URL}/locations?srcode={location_code}"
+    return await make_request(
+        session, url, logger, retry=retry, deadline=deadline, shrink_timeout=False
+    )
 
 
 async def get_machine_status(
-    session: aiohttp.ClientSession, uln: str, logger: logging.Logger
+    session: aiohttp.ClientSession,
+    uln: str,
+    logger: logging.Logger,
+    retry: Optional[RetryPolicy] = None,
+    deadline: Optional[float] = None,
+    timing: Optional[Dict[str, datetime.datetime]] = None,
 ) -> tuple[Optional[Dict[str, Any]], int]:
     """Get machine status from the second API endpoint."""
-    url = f"https://us-central1-washmobilepay.cloudfunctions.net/get_machine_status_v1?uln={uln}"
-    return await make_request(session, url, logger)
+    url = f"{API_BASE_URL}/get_machine_status_v1?uln={uln}"
+    return await make_request(
+        session, url, logger, retry=retry, deadline=deadline, timing=timing
+    )
 
 
 def save_json(data: Dict[str, Any], filepath: Path, logger: logging.Logger) -> bool:
@@ -228,7 +1018,7 @@ def save_json(data: Dict[str, Any], filepath: Path, logger: logging.Logger) -> b
         filepath.parent.mkdir(parents=True, exist_ok=True)
         with open(filepath, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
-        logger.debug(f"Successfully saved data to: {filepath}")
+        logger.debug("Successfully saved data to: %s", filepath, extra=PER_REQUEST)
         return True
     except Exception as e:
         logger.error(f"Failed to save file {filepath}: {e}")
@@ -246,44 +1036,135 @@ def load_json(filepath: Path) -> Optional[Dict[str, Any]]:
     return None
 
 
+def save_location_records(
+    df: pd.DataFrame,
+    location_code: str,
+    writer,
+    logger: logging.Logger,
+    delta_encoder: Optional["parser.DeltaEncoder"] = None,
+):
+    """Sort and write parsed records, keeping only transitions with a delta_encoder."""
+    if delta_encoder is not None:
+        parsed_count = len(df)
+        df = pd.DataFrame(delta_encoder.encode(df.to_dict("records")))
+        logger.debug(
+            "%d of %d records for %s are transitions",
+            len(df),
+            parsed_count,
+            location_code,
+            extra=PER_REQUEST,
+        )
+
+    if df.empty:
+        return
+
+    df = storage.sort_records(df)
+    output_file = writer.write(df, location_code)
+    logger.info(
+        "Parsed and saved %d records to %s", len(df), output_file, extra=PER_REQUEST
+    )
+
+
 def parse_and_cleanup_location_data(
-    location_code: str, data_dir: Path, logger: logging.Logger
+    location_code: str,
+    data_dir: Path,
+    logger: logging.Logger,
+    status_data: Optional[Dict[str, Any]] = None,
+    request_time: Optional[str] = None,
+    writer=None,
+    registry: Optional["parser.LocationRegistry"] = None,
+    sent_time: Optional[str] = None,
+    received_time: Optional[str] = None,
+    delta_encoder: Optional["parser.DeltaEncoder"] = None,
+    rollup_writer: Optional["rollups.RollupWriter"] = None,
 ) -> bool:
-    """Parse location data to CSV and cleanup JSON files."""
+    """Parse location data, save it with the storage writer and cleanup JSON files.
+
+    When status_data is given, the decoded payload is parsed directly in memory
+    and nothing is read back from disk. Otherwise any status JSON files in the
+    location directory are parsed in bounded chunks and removed. Records go to parsed.csv unless
+    another writer from storage.open_writer is passed. Location metadata comes
+    from the registry built at startup when one is given. sent_time and
+    received_time are stored alongside request_time (their midpoint) when known.
+    With a delta_encoder only machine state transitions are written. All
+    parsed records, transitions or not, also go to rollup_writer when given.
+    """
     try:
-        # Parse the location data
-        records = parser.parse_location_code_data(location_code, data_dir, logger)
+        location_dir = data_dir / location_code
 
-        if not records:
-            logger.warning(f"No records found for {location_code}")
-            return False
+        if registry is None:
+            registry = parser.LocationRegistry(data_dir, logger)
 
-        # Create DataFrame and save to CSV
-        df = pd.DataFrame(records)
-        df = df.sort_values(["request_time", "room_id", "machine_number"])
+        location_fields = registry.get(location_code)
+        if location_fields is None:
+            logger.error(f"Failed to load location data for {location_code}")
+            return False
 
-        # Save to CSV
-        output_dir = data_dir / location_code
-        output_file = output_dir / "parsed.csv"
+        if writer is None:
+            writer = storage.CsvWriter(data_dir)
+
+        if status_data is not None:
+            records = parser.build_records(
+                location_fields,
+                status_data,
+                request_time,
+                logger,
+                sent_time=sent_time,
+                received_time=received_time,
+            )
+            if not records:
+                logger.warning(
+                    "No records found for %s", location_code, extra=PER_REQUEST
+                )
+                return False
+
+            df = pd.DataFrame(records)
+            save_location_records(df, location_code, writer, logger, delta_encoder)
+            if rollup_writer is not None:
+                rollup_writer.write(df)
+                if rollup_writer.full:
+                    # Only roll up records the storage backend has committed
+                    writer.flush()
+                    rollup_writer.flush()
+            return True
+
+        # Parse pending status files in bounded chunks, oldest first, and
+        # remove each chunk's files once its records are saved
+        parsed_count = 0
+        removed_count = 0
+        for df, files in parser.iter_record_chunks(location_fields, location_dir, logger):
+            parsed_count += len(df)
+            if not df.empty:
+                save_location_records(df, location_code, writer, logger, delta_encoder)
+                # Buffering writers must commit before the files are removed
+                writer.flush()
+                if rollup_writer is not None:
+                    rollup_writer.write(df)
+                    rollup_writer.flush()
+
+            for name in files:
+                try:
+                    (location_dir / name).unlink()
+                    removed_count += 1
+                except OSError as e:
+                    logger.warning(f"Failed to remove {location_dir / name}: {e}")
 
-        # Append to existing CSV or create new one
-        df.to_csv(output_file, index=False, mode="a", header=not output_file.exists())
-        logger.info(f"Parsed and saved {len(df)} records to {output_file}")
+        if parsed_count == 0:
+            logger.warning(f"No records found for {location_code}")
+            return False
 
-        # Cleanup: Remove JSON status files (keep location file)
-        location_dir = data_dir / location_code
+        # Cleanup: Remove leftover JSON status files (keep location file)
         uln_pattern = re.compile(
             r"^[A-Z]{2}[A-Z0-9]+-\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{4}Z\.json$"
         )
 
-        removed_count = 0
         for json_file in location_dir.glob("*.json"):
             # Only remove status files, keep location files
             if uln_pattern.match(json_file.name):
                 try:
                     json_file.unlink()
                     removed_count += 1
-                    logger.debug(f"Removed JSON file: {json_file}")
+                    logger.debug("Removed JSON file: %s", json_file)
                 except Exception as e:
                     logger.warning(f"Failed to remove {json_file}: {e}")
 
@@ -299,35 +1180,70 @@ def parse_and_cleanup_location_data(
         return False
 
 
+def save_location(
+    code: str,
+    data: Dict[str, Any],
+    data_dir: Path,
+    logger: logging.Logger,
+    registry: Optional["parser.LocationRegistry"] = None,
+) -> Optional[str]:
+    """Save fetched location data and index it; returns the ULN on success."""
+    try:
+        uln = data["location"]["uln"].strip()
+    except (KeyError, AttributeError, TypeError):
+        logger.error(f"No ULN found in location data for {code}")
+        return None
+
+    if not save_json(data, data_dir / code / f"{code}.json", logger):
+        return None
+
+    if registry is not None:
+        registry.record(code, data)
+    logger.info("Saved location data for %s (ULN: %s)", code, uln, extra=PER_REQUEST)
+    return uln
+
+
 async def scrape_location_batch(
     session: aiohttp.ClientSession,
     location_codes: List[str],
     data_dir: Path,
-    failed_codes: Set[str],
+    failures: FailureRegistry,
     logger: logging.Logger,
-) -> tuple[Dict[str, str], Set[str]]:
-    """Scrape location data for a batch of codes."""
+    registry: Optional["parser.LocationRegistry"] = None,
+    retry: Optional[RetryPolicy] = None,
+    deadline: Optional[float] = None,
+) -> Dict[str, str]:
+    """Scrape location data for a batch of codes.
+
+    404s are recorded in the failure registry. New locations are added to the
+    location registry (and its index file) when given. retry and deadline are
+    passed on to make_request.
+    """
     tasks = []
     code_to_task = {}
+    location_to_uln = {}
 
     for code in location_codes:
-        if code in failed_codes:
+        if failures.is_blocked(code):
             continue
 
         location_file = data_dir / code / f"{code}.json"
         if location_file.exists():
+            # Saved by another tool since the index was written
+            if registry is not None and registry.cached(code) is None:
+                data = load_json(location_file)
+                if data and registry.record(code, data):
+                    location_to_uln[code] = registry.cached(code)["uln"]
             continue
 
-        task = get_location_data(session, code, logger)
+        task = get_location_data(session, code, logger, retry, deadline)
         tasks.append(task)
         code_to_task[task] = code
 
     if not tasks:
-        return {}, failed_codes
+        return location_to_uln
 
     results = await asyncio.gather(*tasks, return_exceptions=True)
-    location_to_uln = {}
-    new_failed_codes = set()
 
     for i, result in enumerate(results):
         task = tasks[i]
@@ -338,25 +1254,24 @@ async def scrape_location_batch(
             continue
 
         data, status_code = result
+        failures.record(code, status_code)
 
         if status_code == 404:
-            logger.warning(f"Location {code} not found (404) - adding to failed codes")
-            new_failed_codes.add(code)
+            logger.warning(
+                "Location %s not found (404) - adding to failed codes",
+                code,
+                extra=PER_REQUEST,
+            )
             continue
         elif data is None:
-            logger.warning(f"Failed to get location data for {code}")
+            logger.warning("Failed to get location data for %s", code, extra=PER_REQUEST)
             continue
 
-        try:
-            uln = data["location"]["uln"].strip()
-            location_file = data_dir / code / f"{code}.json"
-            if save_json(data, location_file, logger):
-                location_to_uln[code] = uln
-                logger.info(f"Saved location data for {code} (ULN: {uln})")
-        except KeyError:
-            logger.error(f"No ULN found in location data for {code}")
+        uln = save_location(code, data, data_dir, logger, registry)
+        if uln:
+            location_to_uln[code] = uln
 
-    return location_to_uln, failed_codes | new_failed_codes
+    return location_to_uln
 
 
 async def scrape_machine_status_batch(
@@ -364,8 +1279,27 @@ async def scrape_machine_status_batch(
     location_to_uln: Dict[str, str],
     data_dir: Path,
     logger: logging.Logger,
+    archive_raw: bool = False,
+    writer=None,
+    registry: Optional["parser.LocationRegistry"] = None,
+    writer_stage: Optional["WriterStage"] = None,
+    on_status=None,
+    delta_encoder: Optional["parser.DeltaEncoder"] = None,
+    retry: Optional[RetryPolicy] = None,
+    deadline: Optional[float] = None,
+    rollup_writer: Optional["rollups.RollupWriter"] = None,
 ) -> int:
-    """Scrape machine status for a batch of locations, parse to CSV, and cleanup."""
+    """Scrape machine status for a batch of locations and parse to CSV in memory.
+
+    Every response gets its own send/receive timestamps rather than one
+    timestamp per batch. Raw payloads are only written to disk (under
+    data/<code>/raw/) when archive_raw is set. With a writer_stage, archiving,
+    parsing and writing are queued for the writer thread instead of running on
+    the event loop, and the count is of responses handed to it. on_status, if
+    given, is called with (code, status_data, request_time) for every response.
+    retry and deadline are passed on to make_request. Parsed records also go
+    to rollup_writer when given.
+    """
     if not location_to_uln:
         return 0
 
@@ -373,21 +1307,17 @@ async def scrape_machine_status_batch(
     uln_to_code = {}
 
     for code, uln in location_to_uln.items():
-        task = get_machine_status(session, uln, logger)
+        timing = {}
+        task = get_machine_status(session, uln, logger, retry, deadline, timing)
         tasks.append(task)
-        uln_to_code[task] = (code, uln)
+        uln_to_code[task] = (code, uln, timing)
 
     results = await asyncio.gather(*tasks, return_exceptions=True)
     success_count = 0
-    codes_to_parse = []
-
-    request_time = (
-        datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%dT%H:%M:%S.%fZ")[:-3] + "Z"
-    )
 
     for i, result in enumerate(results):
         task = tasks[i]
-        code, uln = uln_to_code[task]
+        code, uln, timing = uln_to_code[task]
 
         if isinstance(result, Exception):
             logger.error(f"Exception for {code} (ULN: {uln}): {result}")
@@ -396,35 +1326,81 @@ async def scrape_machine_status_batch(
         data, status_code = result
 
         if data is None:
-            logger.warning(f"Failed to get machine status for {code} (ULN: {uln})")
+            logger.warning(
+                "Failed to get machine status for %s (ULN: %s)",
+                code,
+                uln,
+                extra=PER_REQUEST,
+            )
             continue
 
-        status_file = data_dir / code / f"{uln}-{request_time}.json"
-        if save_json(data, status_file, logger):
-            success_count += 1
-            codes_to_parse.append(code)
-            logger.debug(f"Saved machine status for {code}")
+        # Each response is stamped with the midpoint of its own round trip
+        # (the last attempt, if it was retried)
+        sent, received = timing["sent"], timing["received"]
+        request_time = format_request_time(sent + (received - sent) / 2)
+
+        if on_status is not None:
+            on_status(code, data, request_time)
+
+        jobs = []
+        if archive_raw:
+            # Archive outside the location directory root so parser.py never
+            # re-ingests payloads that have already been parsed
+            raw_file = data_dir / code / "raw" / f"{uln}-{request_time}.json"
+            jobs.append(functools.partial(save_json, data, raw_file, logger))
+
+        jobs.append(
+            functools.partial(
+                parse_and_cleanup_location_data,
+                code,
+                data_dir,
+                logger,
+                status_data=data,
+                request_time=request_time,
+                writer=writer,
+                registry=registry,
+                sent_time=format_request_time(sent),
+                received_time=format_request_time(received),
+                delta_encoder=delta_encoder,
+                rollup_writer=rollup_writer,
+            )
+        )
 
-    # Parse and cleanup for all successfully scraped codes
-    for code in codes_to_parse:
-        parse_and_cleanup_location_data(code, data_dir, logger)
+        if writer_stage is not None:
+            for job in jobs:
+                await writer_stage.submit(job)
+            success_count += 1
+            logger.debug("Queued machine status for %s", code, extra=PER_REQUEST)
+        elif all([job() for job in jobs]):
+            success_count += 1
+            logger.debug("Parsed machine status for %s", code, extra=PER_REQUEST)
 
     return success_count
 
 
-def get_existing_locations(data_dir: Path, location_codes: List[str]) -> Dict[str, str]:
-    """Get existing location data and extract ULNs."""
+def get_existing_locations(
+    data_dir: Path,
+    location_codes: List[str],
+    registry: Optional["parser.LocationRegistry"] = None,
+) -> Dict[str, str]:
+    """Get existing location data and extract ULNs.
+
+    Loading goes through the location registry, so the same read also warms it
+    for the parse step. When the registry was filled from its index file, no
+    location file is touched at all.
+    """
+    if registry is None:
+        registry = parser.LocationRegistry(data_dir)
+
     location_to_uln = {}
 
     for code in location_codes:
-        location_file = data_dir / code / f"{code}.json"
-        data = load_json(location_file)
-        if data:
-            try:
-                uln = data["location"]["uln"].strip()
-                location_to_uln[code] = uln
-            except KeyError:
-                pass
+        if registry.indexed:
+            location_fields = registry.cached(code)
+        else:
+            location_fields = registry.get(code)
+        if location_fields:
+            location_to_uln[code] = location_fields["uln"]
 
     return location_to_uln
 
@@ -457,25 +1433,821 @@ def calculate_batch_parameters(
     return batch_size, batch_interval
 
 
+class WriterStage:
+    """
+    Writer stage between the network side and the disk.
+
+    Archiving, parsing (pandas) and writing jobs go into a bounded asyncio.Queue
+    that is drained in batches by a single writer thread, so the event loop never
+    runs blocking disk or pandas work. A single thread keeps appends to the same
+    file ordered. When the queue is full, submit() waits, which is the
+    backpressure signal reported in metrics().
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int,
+        logger: logging.Logger,
+        batch_size: int = 64,
+        scraper_metrics: Optional[ScraperMetrics] = None,
+    ):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.logger = logger
+        self.batch_size = batch_size
+        self.scraper_metrics = scraper_metrics
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="bulk-writer"
+        )
+        self._drain_task: Optional[asyncio.Task] = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.blocked_submits = 0
+        self.submit_wait_seconds = 0.0
+        self.max_depth = 0
+        self.flushes = 0
+        self.write_seconds = 0.0
+
+    def start(self):
+        self._drain_task = asyncio.create_task(self._drain())
+
+    async def submit(self, job):
+        """Queue a job (a callable returning truthy on success) for the writer."""
+        if self.queue.full():
+            self.blocked_submits += 1
+            wait_start = time.monotonic()
+            await self.queue.put(job)
+            self.submit_wait_seconds += time.monotonic() - wait_start
+        else:
+            self.queue.put_nowait(job)
+
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def _run_batch(self, batch: List[Any]) -> tuple[int, int, float]:
+        """Run a batch of jobs in the writer thread."""
+        batch_start = time.monotonic()
+        completed = failed = 0
+
+        for job in batch:
+            job_start = time.monotonic()
+            try:
+                if job():
+                    completed += 1
+                else:
+                    failed += 1
+            except Exception as e:
+                failed += 1
+                self.logger.error(f"Writer job failed: {e}")
+
+            if self.scraper_metrics is not None:
+                name = getattr(getattr(job, "func", job), "__name__", "job")
+                self.scraper_metrics.writer_job_seconds.observe(
+                    time.monotonic() - job_start, job=name
+                )
+
+        return completed, failed, time.monotonic() - batch_start
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            try:
+                completed, failed, seconds = await loop.run_in_executor(
+                    self.executor, self._run_batch, batch
+                )
+                self.completed += completed
+                self.failed += failed
+                self.write_seconds += seconds
+                self.flushes += 1
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def close(self):
+        """Flush everything still queued and stop the writer thread."""
+        if self._drain_task is not None:
+            await self.queue.join()
+            self._drain_task.cancel()
+            try:
+                await self._drain_task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=True)
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "max_queue_depth": self.max_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "blocked_submits": self.blocked_submits,
+            "submit_wait_seconds": self.submit_wait_seconds,
+            "flushes": self.flushes,
+            "write_seconds": self.write_seconds,
+        }
+
+    def log_summary(self):
+        metrics = self.metrics()
+        average_batch = (
+            (metrics["completed"] + metrics["failed"]) / metrics["flushes"]
+            if metrics["flushes"]
+            else 0
+        )
+        self.logger.info(
+            f"Writer: queue {metrics['queue_depth']}/{metrics['queue_capacity']} "
+            f"(max {metrics['max_queue_depth']}), {metrics['completed']} written, "
+            f"{metrics['failed']} failed, {metrics['flushes']} flushes "
+            f"(avg batch {average_batch:.1f}, {metrics['write_seconds']:.2f}s writing), "
+            f"{metrics['blocked_submits']} blocked submits "
+            f"({metrics['submit_wait_seconds']:.2f}s waiting)"
+        )
+
+
+class TokenBucket:
+    """Token bucket rate limiter for the asyncio event loop."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = None
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            now = loop.time()
+            if self.updated is not None:
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit for the asyncio event loop.
+
+    The limit grows by one after a full window of successful requests and is
+    halved when the upstream signals overload (429, 5xx, timeouts). Requests
+    that were already in flight when the limit was cut don't cut it again, so
+    one burst of errors halves the limit once.
+    """
+
+    def __init__(self, initial: int, maximum: int, minimum: int = 1):
+        self.limit = max(minimum, min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.decreases = 0
+        self._successes = 0
+        self._epoch = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> int:
+        """Wait for a free slot; returns the epoch to pass to release()."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            return self._epoch
+
+    async def release(self, epoch: int, overloaded: bool):
+        async with self._condition:
+            self.in_flight -= 1
+            if overloaded:
+                if epoch == self._epoch:
+                    self.limit = max(self.minimum, self.limit // 2)
+                    self._epoch += 1
+                    self._successes = 0
+                    self.decreases += 1
+            else:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self.limit = min(self.maximum, self.limit + 1)
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+class AdaptivePollPolicy:
+    """
+    Per-location poll intervals driven by the last machine status.
+
+    A location with running machines is polled shortly after the first one is
+    due to finish. A location whose machine states haven't changed for
+    idle_polls polls in a row backs off exponentially. Every delay is clamped to
+    [min_interval, max_interval] seconds; failed polls use the base interval.
+    """
+
+    FINISH_GRACE_SECONDS = 30
+
+    def __init__(
+        self,
+        base_interval: float,
+        min_interval: float,
+        max_interval: float,
+        idle_polls: int = 3,
+    ):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_polls = idle_polls
+
+        self.signatures: Dict[str, tuple] = {}
+        self.unchanged: Dict[str, int] = {}
+        self.pending: Dict[str, float] = {}
+
+    def observe(self, code: str, status_data: Dict[str, Any], request_time: str):
+        """Record a successful poll and work out when to poll the location next."""
+        signature = parser.machine_state_signature(status_data)
+        if self.signatures.get(code) == signature:
+            self.unchanged[code] = self.unchanged.get(code, 0) + 1
+        else:
+            self.unchanged[code] = 0
+        self.signatures[code] = signature
+
+        # Back off once the location has been idle for idle_polls polls
+        idle_steps = self.unchanged[code] - self.idle_polls + 1
+        delay = self.base_interval * (2 ** max(0, idle_steps))
+
+        finish_times = parser.expected_finish_times(status_data, request_time)
+        if finish_times:
+            polled_at = parser.parse_datetime(request_time)
+            until_finish = (min(finish_times) - polled_at).total_seconds()
+            delay = min(delay, until_finish + self.FINISH_GRACE_SECONDS)
+
+        self.pending[code] = max(self.min_interval, min(delay, self.max_interval))
+
+    def next_delay(self, code: str) -> float:
+        """Return the delay before the next poll of a location."""
+        delay = self.pending.pop(code, None)
+        if delay is None:
+            return max(self.min_interval, min(self.base_interval, self.max_interval))
+        return delay
+
+
+class PollScheduler:
+    """
+    Continuous scheduler for machine status polling.
+
+    Every location gets its own due time, spread evenly across the interval,
+    and is dispatched to a semaphore-bounded worker pool through a token bucket.
+    A slow request only occupies its own worker, so it never delays the
+    locations scheduled after it. Schedule jitter (dispatch time minus due time)
+    is tracked per location and summarised once per interval.
+
+    With an AdaptivePollPolicy, a location's next due time is set when its poll
+    completes, using the delay the policy derived from the response.
+    """
+
+    def __init__(
+        self,
+        location_items: List[tuple[str, str]],
+        interval_seconds: float,
+        max_concurrent: int,
+        logger: logging.Logger,
+        max_rate: Optional[float] = None,
+        policy: Optional[AdaptivePollPolicy] = None,
+        scraper_metrics: Optional[ScraperMetrics] = None,
+    ):
+        self.location_items = location_items
+        self.policy = policy
+        self.scraper_metrics = scraper_metrics
+        self.interval_seconds = interval_seconds
+        self.logger = logger
+        self.spacing = interval_seconds / max(1, len(location_items))
+
+        # Default to twice the scheduled rate so late requests can catch up
+        self.rate = max_rate or max(1.0, 2 * len(location_items) / interval_seconds)
+        self.bucket = TokenBucket(self.rate, capacity=max_concurrent)
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+
+        self.location_jitter: Dict[str, Dict[str, float]] = {}
+        self.in_flight = 0
+        self._schedule: List[tuple[float, int, str, str]] = []
+        self._rescheduled = asyncio.Event()
+        self._reset_cycle_stats()
+
+    def _reset_cycle_stats(self):
+        self.cycle_jitter: List[float] = []
+        self.cycle_success = 0
+        self.cycle_failed = 0
+        self.cycle_skipped = 0
+
+    def _record_jitter(self, code: str, jitter: float):
+        self.cycle_jitter.append(jitter)
+        if self.scraper_metrics is not None:
+            self.scraper_metrics.schedule_jitter_seconds.observe(jitter)
+
+        stats = self.location_jitter.setdefault(
+            code, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+        )
+        stats["count"] += 1
+        stats["total"] += jitter
+        stats["max"] = max(stats["max"], jitter)
+        stats["last"] = jitter
+
+    def _record_cycle_metrics(self, duration: float):
+        scraper_metrics = self.scraper_metrics
+        scraper_metrics.cycles.inc()
+        scraper_metrics.cycle_seconds.set(duration)
+        scraper_metrics.cycle_overrun_seconds.set(max(self.cycle_jitter, default=0.0))
+        scraper_metrics.polls.inc(self.cycle_success, result="success")
+        scraper_metrics.polls.inc(self.cycle_failed, result="failed")
+        scraper_metrics.skipped_slots.inc(self.cycle_skipped)
+
+    def _log_cycle_summary(self, cycle: int, duration: float):
+        if self.scraper_metrics is not None:
+            self._record_cycle_metrics(duration)
+
+        jitter = sorted(self.cycle_jitter)
+        if jitter:
+            mean = sum(jitter) / len(jitter)
+            p95 = jitter[min(len(jitter) - 1, int(len(jitter) * 0.95))]
+            jitter_summary = (
+                f"jitter mean {mean:.2f}s, p95 {p95:.2f}s, max {jitter[-1]:.2f}s"
+            )
+        else:
+            jitter_summary = "no dispatches"
+
+        self.logger.info(
+            f"Cycle {cycle} complete: {self.cycle_success} successful updates and parses, "
+            f"{self.cycle_failed} failed in {duration:.2f}s ({jitter_summary}, "
+            f"{self.in_flight} in flight, {self.cycle_skipped} slots skipped)"
+        )
+
+        worst = sorted(
+            self.location_jitter.items(), key=lambda item: item[1]["last"], reverse=True
+        )[:3]
+        if worst and worst[0][1]["last"] > self.spacing:
+            self.logger.info(
+                "Highest schedule jitter: "
+                + ", ".join(f"{code} ({stats['last']:.2f}s)" for code, stats in worst)
+            )
+
+        self._reset_cycle_stats()
+
+    async def _run_one(self, poll, order: int, code: str, uln: str):
+        try:
+            if await poll(code, uln):
+                self.cycle_success += 1
+            else:
+                self.cycle_failed += 1
+        except Exception as e:
+            self.cycle_failed += 1
+            self.logger.error(f"Exception polling {code} (ULN: {uln}): {e}")
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+
+            if self.policy is not None:
+                next_due = asyncio.get_running_loop().time() + self.policy.next_delay(
+                    code
+                )
+                heapq.heappush(self._schedule, (next_due, order, code, uln))
+                self._rescheduled.set()
+
+    def add(self, code: str, uln: str):
+        """Start polling a new location at the next dispatch."""
+        order = len(self.location_items)
+        self.location_items.append((code, uln))
+        heapq.heappush(
+            self._schedule, (asyncio.get_running_loop().time(), order, code, uln)
+        )
+        self._rescheduled.set()
+
+    async def run(
+        self, poll, cycles: Optional[int] = None, on_cycle_complete=None
+    ) -> int:
+        """
+        Poll every location once per interval until cancelled.
+
+        poll is an async callable taking (code, uln) and returning a truthy
+        value on success. on_cycle_complete, if given, is called with the
+        cycle number after each cycle summary. If cycles is given, stop after
+        that many intervals. Returns the number of completed cycles.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        schedule = self._schedule
+        schedule[:] = [
+            (start + i * self.spacing, i, code, uln)
+            for i, (code, uln) in enumerate(self.location_items)
+        ]
+        heapq.heapify(schedule)
+
+        tasks = set()
+        cycle = 1
+        cycle_start = start
+
+        try:
+            while True:
+                now = loop.time()
+                cycle_end = cycle_start + self.interval_seconds
+
+                if now >= cycle_end:
+                    self._log_cycle_summary(cycle, now - cycle_start)
+                    if on_cycle_complete is not None:
+                        on_cycle_complete(cycle)
+                    if cycles is not None and cycle >= cycles:
+                        break
+                    cycle += 1
+                    cycle_start = cycle_end
+                    continue
+
+                # In adaptive mode every location may be in flight, and a
+                # completed poll can schedule one earlier than the current head
+                wake_at = schedule[0][0] if schedule else cycle_end
+                if wake_at > now:
+                    self._rescheduled.clear()
+                    try:
+                        await asyncio.wait_for(
+                            self._rescheduled.wait(), min(wake_at, cycle_end) - now
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                due, order, code, uln = schedule[0]
+
+                heapq.heappop(schedule)
+
+                await self.bucket.acquire()
+                await self.semaphore.acquire()
+
+                dispatched = loop.time()
+                self._record_jitter(code, dispatched - due)
+
+                self.in_flight += 1
+                task = asyncio.create_task(self._run_one(poll, order, code, uln))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+                if self.policy is not None:
+                    continue
+
+                # Keep every location on its own fixed grid; if dispatch fell a
+                # whole interval behind, skip the missed slots instead of bursting
+                next_due = due + self.interval_seconds
+                if next_due <= dispatched:
+                    missed = math.ceil((dispatched - next_due) / self.interval_seconds)
+                    next_due += missed * self.interval_seconds
+                    self.cycle_skipped += missed
+
+                heapq.heappush(schedule, (next_due, order, code, uln))
+
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return cycle
+
+
+DISCOVERY_PROGRESS_PREFIX = "# scanned through "
+DISCOVERY_MAX_ATTEMPTS = 4
+DISCOVERY_PROGRESS_EVERY = 100
+
+
+def read_discovery_file(codes_file: Path) -> tuple[Set[str], Optional[str]]:
+    """Return the codes already in a discovery file and its last progress mark."""
+    known = set()
+    scanned_through = None
+
+    if not codes_file.exists():
+        return known, scanned_through
+
+    with open(codes_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith(DISCOVERY_PROGRESS_PREFIX):
+                scanned_through = line[len(DISCOVERY_PROGRESS_PREFIX) :].strip()
+            elif line and not line.startswith("#"):
+                known.add(line.upper())
+
+    return known, scanned_through
+
+
+async def discover_locations(
+    session: aiohttp.ClientSession,
+    location_codes: List[str],
+    codes_file: Path,
+    data_dir: Path,
+    failures: FailureRegistry,
+    logger: logging.Logger,
+    rate: float,
+    max_concurrent: int,
+    registry: Optional["parser.LocationRegistry"] = None,
+) -> int:
+    """Probe location codes as fast as the upstream allows and record valid ones.
+
+    Valid codes are appended to codes_file as they are found, in the format
+    load_location_codes_from_file reads, and their location data is saved
+    like Phase 1 does; 404s go to the failure registry, and codes whose
+    failure has not expired yet are skipped. Requests are limited by their own token bucket (rate)
+    and an AIMD concurrency limit that backs off on 429/5xx. Overloaded codes
+    are retried with exponential backoff. A "# scanned through <code>" line is
+    appended whenever every code up to that one is resolved, and a later run
+    over the same codes resumes after the last such line. Returns the number
+    of codes found.
+    """
+    known, scanned_through = read_discovery_file(codes_file)
+    start = 0
+    if scanned_through in location_codes:
+        start = location_codes.index(scanned_through) + 1
+        logger.info(f"Resuming discovery after {scanned_through}")
+
+    bucket = TokenBucket(rate, max(1.0, rate))
+    limiter = AdaptiveConcurrency(min(4, max_concurrent), max_concurrent)
+    queue = list(range(start, len(location_codes)))
+    queue.reverse()
+    resolved = [False] * len(location_codes)
+    watermark = start
+    last_mark = start
+    found = 0
+    requests = 0
+    overloads = 0
+    started = time.monotonic()
+
+    codes_file.parent.mkdir(parents=True, exist_ok=True)
+    output = open(codes_file, "a", encoding="utf-8")
+
+    def record(line: str):
+        output.write(line + "\n")
+        output.flush()
+
+    def resolve(index: int):
+        nonlocal watermark, last_mark
+        resolved[index] = True
+        while watermark < len(location_codes) and resolved[watermark]:
+            watermark += 1
+
+        if watermark - last_mark >= DISCOVERY_PROGRESS_EVERY or watermark == len(
+            location_codes
+        ):
+            last_mark = watermark
+            record(f"{DISCOVERY_PROGRESS_PREFIX}{location_codes[watermark - 1]}")
+            elapsed = time.monotonic() - started
+            logger.info(
+                f"Discovery: scanned through {location_codes[watermark - 1]} "
+                f"({watermark}/{len(location_codes)}), {found} found, "
+                f"{requests / elapsed:.1f} requests/s, concurrency {limiter.limit}, "
+                f"{overloads} overloaded responses"
+            )
+
+    async def probe(index: int):
+        nonlocal found, requests, overloads
+        code = location_codes[index]
+
+        for attempt in range(DISCOVERY_MAX_ATTEMPTS):
+            await bucket.acquire()
+            epoch = await limiter.acquire()
+            data, status_code = await get_location_data(session, code, logger)
+            requests += 1
+
+            overloaded = is_overload_status(status_code)
+            await limiter.release(epoch, overloaded)
+
+            if not overloaded:
+                break
+
+            overloads += 1
+            await asyncio.sleep(min(60, 2**attempt) * (0.5 + random.random()))
+
+        failures.record(code, status_code)
+
+        if status_code == 200 and data is not None:
+            if save_location(code, data, data_dir, logger, registry):
+                record(code)
+                found += 1
+        elif status_code != 404:
+            logger.warning(f"Giving up on {code} after HTTP {status_code}")
+            record(f"# unresolved {code} (HTTP {status_code})")
+
+        resolve(index)
+
+    async def worker():
+        nonlocal found
+        while queue:
+            index = queue.pop()
+            code = location_codes[index]
+
+            if code in known or failures.is_blocked(code):
+                resolve(index)
+                continue
+            if registry is not None and registry.cached(code) is not None:
+                # Location data is already on disk from an earlier run
+                record(code)
+                known.add(code)
+                found += 1
+                resolve(index)
+                continue
+
+            await probe(index)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max_concurrent)))
+    finally:
+        # Keep the progress of an interrupted scan
+        if watermark > last_mark:
+            record(f"{DISCOVERY_PROGRESS_PREFIX}{location_codes[watermark - 1]}")
+        output.close()
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Discovery complete: {found} valid locations in {len(location_codes) - start} codes "
+        f"({requests} requests in {elapsed:.1f}s, concurrency cut {limiter.decreases} times)"
+    )
+    return found
+
+
+async def run_discovery(
+    location_codes: List[str],
+    codes_file: Path,
+    data_dir: Path,
+    max_concurrent: int,
+    rate: float,
+    logger: logging.Logger,
+):
+    """Run --discover: scan location codes and write valid ones to codes_file."""
+    registry = parser.LocationRegistry(data_dir, logger)
+    if registry.load_index() is None:
+        registry.rebuild_index()
+
+    failures = FailureRegistry(data_dir, logger)
+    failures.load()
+    connection_stats = ConnectionStats(logger)
+
+    logger.info(
+        f"Discovering locations in {len(location_codes)} codes at up to {rate:.1f} "
+        f"requests/second and {max_concurrent} concurrent requests"
+    )
+
+    async with create_session(max_concurrent, connection_stats) as session:
+        try:
+            await discover_locations(
+                session,
+                location_codes,
+                codes_file,
+                data_dir,
+                failures,
+                logger,
+                rate,
+                max_concurrent,
+                registry,
+            )
+        finally:
+            connection_stats.log_summary()
+
+    logger.info(f"Discovered codes are in {codes_file} (use --file {codes_file})")
+
+
+async def reprobe_failed_codes(
+    session: aiohttp.ClientSession,
+    failures: FailureRegistry,
+    location_codes: List[str],
+    data_dir: Path,
+    logger: logging.Logger,
+    registry: "parser.LocationRegistry",
+    scheduler: PollScheduler,
+    interval_seconds: float,
+):
+    """Re-probe one expired failed code every interval_seconds until cancelled.
+
+    Codes that come back are saved like Phase 1 does and added to the running
+    scheduler. A code is only cleared once its location is saved; a 200
+    without usable location data counts as an error (status 0).
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+
+        expired = failures.expired(location_codes)
+        if not expired:
+            continue
+
+        code = expired[0]
+        try:
+            data, status_code = await get_location_data(session, code, logger)
+
+            uln = None
+            if status_code == 200 and data is not None:
+                uln = save_location(code, data, data_dir, logger, registry)
+            if status_code == 200 and not uln:
+                status_code = 0
+            failures.record(code, status_code)
+
+            if uln:
+                logger.info(f"Failed code {code} is back, adding it to the schedule")
+                scheduler.add(code, uln)
+            elif code in failures:
+                logger.debug(
+                    "Re-probed %s: HTTP %s, next attempt in %.0fh",
+                    code,
+                    status_code,
+                    failures.ttl(code) / 3600,
+                    extra=PER_REQUEST,
+                )
+        except Exception as e:
+            logger.error(f"Failed to re-probe {code}: {e}")
+
+
 async def run_bulk_scraper(
     location_codes: List[str],
-    interval_minutes: int,
+    interval_minutes: float,
     data_dir: Path,
     max_concurrent: int,  # Now used as absolute maximum only
     logger: logging.Logger,
+    archive_raw: bool = False,
+    storage_backend: str = "csv",
+    max_rate: Optional[float] = None,
+    write_queue_size: int = 1000,
+    adaptive: bool = False,
+    min_interval_minutes: float = 1,
+    max_interval_minutes: float = 60,
+    idle_polls: int = 3,
+    change_only: bool = False,
+    rebuild_index: bool = False,
+    failure_ttl_hours: float = 24,
+    reprobe_interval: float = 10,
+    max_retries: int = 3,
+    retry_base_delay: float = 1.0,
+    breaker_threshold: float = 0.5,
+    breaker_cooldown: float = 30,
+    metrics_port: Optional[int] = None,
+    metrics_host: str = "127.0.0.1",
+    log_summary: bool = False,
+    max_cycles: Optional[int] = None,
+    update_rollups: bool = False,
 ):
-    """Run the bulk scraper with distributed timing and integrated parsing."""
-    failed_codes = load_failed_codes(data_dir)
-    logger.info(f"Loaded {len(failed_codes)} previously failed codes")
+    """Run the bulk scraper with distributed timing and integrated parsing.
+
+    Polls until interrupted, or for max_cycles intervals when given. With
+    update_rollups, every cycle's records are also merged into data/rollups.db
+    once the storage backend has committed them.
+    """
+    writer = storage.open_writer(storage_backend, data_dir, change_only)
+    logger.info(f"Writing parsed records with the {storage_backend} backend")
+
+    rollup_writer = None
+    if update_rollups:
+        rollup_writer = rollups.RollupWriter(
+            rollups.RollupStore(data_dir / rollups.ROLLUP_FILENAME)
+        )
+        logger.info(f"Updating usage rollups in {rollup_writer.store.path} every cycle")
+
+    request_log = None
+    if log_summary:
+        request_log = RequestLogSummary()
+        logger.addFilter(request_log)
+        logger.info("Per-request log lines are summarised once per cycle")
+
+    delta_encoder = None
+    if change_only:
+        delta_encoder = parser.DeltaEncoder(data_dir / storage.DELTA_STATE_FILENAME)
+        restored = delta_encoder.load(logger)
+        logger.info(
+            f"Change-only storage: recording state transitions ({restored} machine states restored)"
+        )
+
+    failures = FailureRegistry(data_dir, logger, base_ttl=failure_ttl_hours * 3600)
+    failures.load()
+    logger.info(
+        f"Loaded {len(failures)} previously failed codes "
+        f"({len(failures.expired(location_codes))} due for a re-probe)"
+    )
 
-    # Filter out failed codes for location scraping
-    active_codes = [code for code in location_codes if code not in failed_codes]
+    # Filter out failed codes for location scraping; expired ones are
+    # re-probed in the background during Phase 2
+    active_codes = [code for code in location_codes if code not in failures]
     logger.info(
         f"Processing {len(active_codes)} active codes out of {len(location_codes)} total"
     )
 
-    # Get existing locations
-    existing_locations = get_existing_locations(data_dir, location_codes)
+    # Get existing locations, loading their metadata once for the whole run
+    registry = parser.LocationRegistry(data_dir, logger)
+    indexed_count = None if rebuild_index else registry.load_index()
+    if indexed_count is None:
+        logger.info(f"Rebuilding location index {registry.index_file}")
+        indexed_count = registry.rebuild_index()
+    logger.info(f"Loaded {indexed_count} locations from {registry.index_file}")
+
+    existing_locations = get_existing_locations(data_dir, location_codes, registry)
     logger.info(f"Found {len(existing_locations)} existing locations with cached data")
 
     # Codes that need location data
@@ -486,7 +2258,36 @@ async def run_bulk_scraper(
 
     interval_seconds = interval_minutes * 60
 
-    async with aiohttp.ClientSession() as session:
+    connection_stats = ConnectionStats(logger)
+    retry = RetryPolicy(
+        logger,
+        max_retries,
+        retry_base_delay,
+        breaker_threshold=breaker_threshold,
+        breaker_cooldown=breaker_cooldown,
+    )
+
+    scraper_metrics = None
+    serve_metrics = contextlib.nullcontext()
+    if metrics_port is not None:
+        scraper_metrics = ScraperMetrics(metrics.MetricsRegistry())
+        scraper_metrics.export_totals(
+            "washconnect_connection_events_total",
+            "Connection pool events (new, reused, TLS handshakes, DNS cache)",
+            connection_stats.totals,
+        )
+        scraper_metrics.export_totals(
+            "washconnect_retry_events_total",
+            "Request attempts, retries and circuit breaker events",
+            retry.totals,
+        )
+        scraper_metrics.watch_breakers(retry)
+        serve_metrics = scraper_metrics.serve(metrics_host, metrics_port, logger)
+
+    async with (
+        serve_metrics,
+        create_session(max_concurrent, connection_stats, scraper_metrics) as session,
+    ):
         start_time = asyncio.get_event_loop().time()
 
         # Phase 1: Scrape location data for codes that need it (one-time setup)
@@ -523,8 +2324,21 @@ async def run_bulk_scraper(
                     f"Processing location batch {batch_num}/{total_location_batches} ({len(batch)} codes)"
                 )
 
-                batch_locations, failed_codes = await scrape_location_batch(
-                    session, batch, data_dir, failed_codes, logger
+                # Retries stop when the next batch is due; a single batch has
+                # no next batch, so its retries are only bounded by max_retries
+                deadline = None
+                if location_batch_interval > 0:
+                    deadline = batch_start + location_batch_interval
+
+                batch_locations = await scrape_location_batch(
+                    session,
+                    batch,
+                    data_dir,
+                    failures,
+                    logger,
+                    registry,
+                    retry,
+                    deadline,
                 )
 
                 new_locations.update(batch_locations)
@@ -539,11 +2353,13 @@ async def run_bulk_scraper(
                         )
                         await asyncio.sleep(sleep_time)
 
-            # Save updated failed codes
-            save_failed_codes(failed_codes, data_dir)
             logger.info(
-                f"Phase 1 complete: Found {len(new_locations)} new locations, {len(failed_codes)} total failed codes"
+                f"Phase 1 complete: Found {len(new_locations)} new locations, {len(failures)} total failed codes"
             )
+            connection_stats.log_summary()
+            retry.log_summary()
+            if request_log is not None:
+                request_log.log_summary(logger)
 
             # Update existing locations with new ones
             existing_locations.update(new_locations)
@@ -564,83 +2380,138 @@ async def run_bulk_scraper(
             )
             await asyncio.sleep(remaining_time)
 
-        # Calculate dynamic batch parameters for machine status scraping
-        status_batch_size, status_batch_interval = calculate_batch_parameters(
-            len(existing_locations), interval_seconds, max_batch_size=max_concurrent
-        )
+        policy = None
+        if adaptive:
+            policy = AdaptivePollPolicy(
+                interval_seconds,
+                min_interval_minutes * 60,
+                max_interval_minutes * 60,
+                idle_polls,
+            )
 
-        total_status_batches = math.ceil(len(existing_locations) / status_batch_size)
+        scheduler = PollScheduler(
+            list(existing_locations.items()),
+            interval_seconds,
+            max_concurrent,
+            logger,
+            max_rate,
+            policy,
+            scraper_metrics,
+        )
 
         logger.info(
             f"Phase 2: Starting continuous machine status scraping for {len(existing_locations)} locations"
         )
         logger.info(
-            f"Status batch size: {status_batch_size}, interval: {status_batch_interval:.2f}s, total batches: {total_status_batches}"
+            f"Dispatch spacing: {scheduler.spacing:.2f}s, workers: {max_concurrent}, rate limit: {scheduler.rate:.2f} requests/second"
         )
         logger.info(
             f"Rate: {len(existing_locations) / interval_seconds:.2f} requests/second"
         )
-        logger.info(f"Each location will be updated every {interval_minutes} minutes")
+        if adaptive:
+            logger.info(
+                f"Adaptive polling: every {min_interval_minutes}-{max_interval_minutes} minutes "
+                f"(base {interval_minutes}), backing off after {idle_polls} unchanged polls"
+            )
+        else:
+            logger.info(f"Each location will be updated every {interval_minutes} minutes")
         logger.info("Press Ctrl+C to stop the continuous scraping...")
 
-        location_items = list(existing_locations.items())
-        cycle_count = 0
-
-        try:
-            while True:
-                cycle_count += 1
-                cycle_start_time = asyncio.get_event_loop().time()
-                total_success = 0
-
-                logger.info(
-                    f"Starting cycle {cycle_count} - processing {len(existing_locations)} locations"
-                )
-
-                # Process machine status in batches with parsing
-                for i in range(0, len(location_items), status_batch_size):
-                    batch_dict = dict(location_items[i : i + status_batch_size])
-                    batch_start = asyncio.get_event_loop().time()
-
-                    batch_num = i // status_batch_size + 1
-                    logger.debug(
-                        f"Cycle {cycle_count}: Processing batch {batch_num}/{total_status_batches} ({len(batch_dict)} locations)"
-                    )
-
-                    success_count = await scrape_machine_status_batch(
-                        session, batch_dict, data_dir, logger
-                    )
-
-                    total_success += success_count
-
-                    # Wait for next batch timing (except for last batch)
-                    if batch_num < total_status_batches:
-                        elapsed = asyncio.get_event_loop().time() - batch_start
-                        sleep_time = max(0, status_batch_interval - elapsed)
-                        if sleep_time > 0:
-                            await asyncio.sleep(sleep_time)
+        writer_stage = WriterStage(
+            write_queue_size, logger, scraper_metrics=scraper_metrics
+        )
+        writer_stage.start()
+        if scraper_metrics is not None:
+            scraper_metrics.watch_writer(writer_stage)
+            scraper_metrics.watch_scheduler(scheduler)
+
+        # Retries must finish before the location is due again
+        slot_seconds = min_interval_minutes * 60 if adaptive else interval_seconds
+
+        async def poll(code: str, uln: str) -> int:
+            deadline = asyncio.get_running_loop().time() + slot_seconds
+            return await scrape_machine_status_batch(
+                session,
+                {code: uln},
+                data_dir,
+                logger,
+                archive_raw,
+                writer,
+                registry,
+                writer_stage,
+                policy.observe if policy else None,
+                delta_encoder,
+                retry,
+                deadline,
+                rollup_writer,
+            )
 
-                cycle_duration = asyncio.get_event_loop().time() - cycle_start_time
-                logger.info(
-                    f"Cycle {cycle_count} complete: {total_success} successful updates and parses in {cycle_duration:.2f}s"
-                )
+        background_tasks = set()
+
+        def flush_writer() -> bool:
+            # Rollups only after the records are committed: if the storage
+            # flush raises, both buffers are kept for the next cycle's flush
+            writer.flush()
+            if rollup_writer is not None:
+                rollup_writer.flush()
+            return True
+
+        async def end_cycle_writes():
+            # The writer and encoder are only touched by the writer thread, so
+            # the per-cycle flush and state save run there too
+            await writer_stage.submit(flush_writer)
+            if delta_encoder is not None:
+                await writer_stage.submit(functools.partial(delta_encoder.save, logger))
+
+        def on_cycle_complete(cycle: int):
+            connection_stats.log_summary()
+            retry.log_summary()
+            writer_stage.log_summary()
+            if request_log is not None:
+                request_log.log_summary(logger)
+            task = asyncio.create_task(end_cycle_writes())
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+
+        reprobe_task = asyncio.create_task(
+            reprobe_failed_codes(
+                session,
+                failures,
+                location_codes,
+                data_dir,
+                logger,
+                registry,
+                scheduler,
+                reprobe_interval,
+            )
+        )
 
-                # Wait for the remainder of the interval before starting next cycle
-                remaining_cycle_time = interval_seconds - cycle_duration
-                if remaining_cycle_time > 0:
-                    logger.info(
-                        f"Waiting {remaining_cycle_time:.2f}s before next cycle..."
-                    )
-                    await asyncio.sleep(remaining_cycle_time)
-                else:
-                    logger.warning(
-                        f"Cycle took {cycle_duration:.2f}s, longer than {interval_seconds}s interval!"
-                    )
+        cycle_count = 0
 
+        try:
+            cycle_count = await scheduler.run(
+                poll, cycles=max_cycles, on_cycle_complete=on_cycle_complete
+            )
+            logger.info(f"Stopping after {cycle_count} cycles")
         except KeyboardInterrupt:
             logger.info(f"Stopping continuous scraping after {cycle_count} cycles")
         except Exception as e:
             logger.error(f"Error in continuous scraping: {e}")
             raise
+        finally:
+            reprobe_task.cancel()
+            await writer_stage.close()
+            try:
+                writer.flush()
+                if rollup_writer is not None:
+                    rollup_writer.flush()
+            finally:
+                if rollup_writer is not None:
+                    rollup_writer.store.close()
+            if delta_encoder is not None:
+                delta_encoder.save(logger)
+            if request_log is not None:
+                request_log.log_summary(logger)
 
 
 def create_argument_groups(parser):
@@ -668,6 +2539,8 @@ def create_argument_groups(parser):
 
 
 def main():
+    global API_BASE_URL
+
     parser = argparse.ArgumentParser(
         description="Bulk scrape Wash Mobile Pay API with integrated parsing",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -682,6 +2555,10 @@ Examples:
   # Using specific codes directly
   ./bulk_scraper.py --codes W000001 W000002 W000003 --interval 15
 
+  # Find the valid codes in a range first, then poll only those
+  ./bulk_scraper.py --range W000001 W010000 --discover location_codes.txt
+  ./bulk_scraper.py --file location_codes.txt --interval 15
+
 Location codes file format:
   W000001
   W000050
@@ -696,7 +2573,7 @@ Location codes file format:
     parser.add_argument(
         "--interval",
         "-i",
-        type=int,
+        type=float,
         default=15,
         help="Time interval in minutes to distribute requests (default: 15)",
     )
@@ -705,7 +2582,142 @@ Location codes file format:
         "-c",
         type=int,
         default=50,
-        help="Maximum concurrent requests per batch - used as upper bound (default: 50)",
+        help="Maximum concurrent requests (batch size bound in Phase 1, worker pool size in Phase 2) (default: 50)",
+    )
+    parser.add_argument(
+        "--max-rate",
+        type=float,
+        default=None,
+        help="Token bucket limit for machine status requests per second "
+        "(default: twice the scheduled rate)",
+    )
+    parser.add_argument(
+        "--write-queue-size",
+        type=int,
+        default=1000,
+        help="Responses that may wait for the writer thread before polling "
+        "applies backpressure (default: 1000)",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Poll busy locations soon after machines finish and back off on idle ones",
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=1,
+        help="Shortest adaptive poll interval in minutes (default: 1)",
+    )
+    parser.add_argument(
+        "--max-interval",
+        type=float,
+        default=60,
+        help="Longest adaptive poll interval in minutes (default: 60)",
+    )
+    parser.add_argument(
+        "--idle-polls",
+        type=int,
+        default=3,
+        help="Unchanged polls before an adaptive location starts backing off (default: 3)",
+    )
+    parser.add_argument(
+        "--change-only",
+        action="store_true",
+        help="Store only machine state transitions (transitions.csv or "
+        "<data-dir>/transitions) instead of a row per machine per poll",
+    )
+    parser.add_argument(
+        "--rebuild-index",
+        action="store_true",
+        help="Rebuild <data-dir>/location_index.jsonl from the location files "
+        "(needed after adding locations outside bulk_scraper.py)",
+    )
+    parser.add_argument(
+        "--failure-ttl",
+        type=float,
+        default=24,
+        help="Hours before a code that returned 404 is re-probed; doubles with "
+        "every further 404, up to 30 days (default: 24)",
+    )
+    parser.add_argument(
+        "--reprobe-interval",
+        type=float,
+        default=10,
+        help="Seconds between background re-probes of expired failed codes (default: 10)",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=3,
+        help="Retries for timeouts, 429 and 5xx responses, within the location's "
+        "polling slot (default: 3)",
+    )
+    parser.add_argument(
+        "--retry-base-delay",
+        type=float,
+        default=1.0,
+        help="Base delay in seconds for jittered exponential retry backoff (default: 1)",
+    )
+    parser.add_argument(
+        "--breaker-threshold",
+        type=float,
+        default=0.5,
+        help="Share of failed requests among the last 50 that pauses all requests "
+        "(default: 0.5)",
+    )
+    parser.add_argument(
+        "--breaker-cooldown",
+        type=float,
+        default=30,
+        help="Seconds requests are paused once the circuit breaker opens; doubles "
+        "while the API keeps failing (default: 30)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics on this port at /metrics (off by default)",
+    )
+    parser.add_argument(
+        "--metrics-host",
+        default="127.0.0.1",
+        help="Address for the metrics endpoint (default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--log-summary",
+        action="store_true",
+        help="Replace per-request log lines with one count per message in each "
+        "cycle summary",
+    )
+    parser.add_argument(
+        "--rollups",
+        action="store_true",
+        help=f"Also update the usage rollups in <data-dir>/{rollups.ROLLUP_FILENAME} "
+        "after each cycle's records are stored (otherwise run rollups.py rebuild)",
+    )
+    parser.add_argument(
+        "--cycles",
+        type=int,
+        help="Stop after this many polling cycles (default: run until interrupted)",
+    )
+    parser.add_argument(
+        "--api-base-url",
+        default=API_BASE_URL,
+        help="Wash Connect API base URL, e.g. http://127.0.0.1:8080 for "
+        "benchmarks/mock_server.py (default: the production Cloud Functions)",
+    )
+    parser.add_argument(
+        "--discover",
+        type=Path,
+        metavar="CODES_FILE",
+        help="Only scan the given codes for valid locations, appending them to "
+        "CODES_FILE (resumes where a previous scan of the same codes stopped)",
+    )
+    parser.add_argument(
+        "--discover-rate",
+        type=float,
+        default=20,
+        help="Request rate budget for --discover in requests/second (default: 20)",
     )
     parser.add_argument(
         "--data-dir", default="data", help="Directory to store data files"
@@ -713,9 +2725,24 @@ Location codes file format:
     parser.add_argument(
         "--log-dir", default="logs", help="Directory to store log files"
     )
+    parser.add_argument(
+        "--archive-raw",
+        action="store_true",
+        help="Also archive raw machine status JSON to <data-dir>/<code>/raw/",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=["csv", "parquet", "sqlite"],
+        default="csv",
+        help="Where parsed records are written: per-location parsed.csv, the "
+        "partitioned Parquet store in <data-dir>/store or the SQLite database "
+        f"<data-dir>/{storage.SQLITE_FILENAME}, committed once per cycle (default: csv)",
+    )
 
     args = parser.parse_args()
 
+    API_BASE_URL = args.api_base_url.rstrip("/")
+
     data_dir = Path(args.data_dir)
     log_dir = Path(args.log_dir)
 
@@ -754,6 +2781,23 @@ Location codes file format:
         logger.error(f"Error loading location codes: {e}")
         sys.exit(1)
 
+    if args.discover:
+        if args.discover_rate <= 0:
+            logger.error("--discover-rate must be positive")
+            sys.exit(1)
+
+        asyncio.run(
+            run_discovery(
+                location_codes,
+                args.discover,
+                data_dir,
+                args.max_concurrent,
+                args.discover_rate,
+                logger,
+            )
+        )
+        return
+
     logger.info(
         f"Starting bulk scraper with integrated parsing for {len(location_codes)} codes"
     )
@@ -764,7 +2808,32 @@ Location codes file format:
     # Run the scraper
     asyncio.run(
         run_bulk_scraper(
-            location_codes, args.interval, data_dir, args.max_concurrent, logger
+            location_codes,
+            args.interval,
+            data_dir,
+            args.max_concurrent,
+            logger,
+            args.archive_raw,
+            args.storage,
+            args.max_rate,
+            args.write_queue_size,
+            args.adaptive,
+            args.min_interval,
+            args.max_interval,
+            args.idle_polls,
+            args.change_only,
+            args.rebuild_index,
+            args.failure_ttl,
+            args.reprobe_interval,
+            args.max_retries,
+            args.retry_base_delay,
+            args.breaker_threshold,
+            args.breaker_cooldown,
+            args.metrics_port,
+            args.metrics_host,
+            args.log_summary,
+            args.cycles,
+            args.rollups,
         )
     )
 
@@ -2,7 +2,7 @@
 #
 # /// script
 # requires-python = ">=3.12"
-# dependencies = ["requests", "pandas", "python-dotenv"]
+# dependencies = ["requests", "numpy", "pandas", "pyarrow", "python-dotenv"]
 # ///
 
 """
@@ -13,9 +13,22 @@ Setup:
 1. Copy .env.example to .env
 2. Add your Google Maps API key to .env
 
+Locations are geocoded by a thread pool sharing one pooled HTTP session and
+a token bucket (--qps). Answers are cached in data/geocode_cache.jsonl by
+normalized search query, so chain laundromats that share a name and reruns
+are only geocoded once.
+
+Each record is checkpointed as soon as it is geocoded: appended to
+data/location_code_mapping.jsonl (or upserted with --storage sqlite), so an
+interrupted run keeps its progress. --compact merges the checkpoint into the
+sorted CSV and fills its neighborhood column (see neighborhoods.py).
+
 Usage:
   uv run location_code_mapper.py                    # Process all locations
   uv run location_code_mapper.py W000001            # Process single location
+  uv run location_code_mapper.py --storage sqlite   # Write to data/washconnect.db
+  uv run location_code_mapper.py --workers 16 --qps 40
+  uv run location_code_mapper.py --compact          # Merge checkpoint into the CSV
 """
 
 import argparse
@@ -23,14 +36,35 @@ import json
 import logging
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import threading
 import time
+import importlib.util
 
 import requests
 import pandas as pd
 from dotenv import load_dotenv
 
+# Import storage module at global scope
+storage_path = Path(__file__).parent / "storage.py"
+if not storage_path.exists():
+    raise ImportError(f"storage.py not found at {storage_path}")
+
+spec = importlib.util.spec_from_file_location("storage", storage_path)
+storage = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(storage)
+
+# Import neighborhoods module at global scope
+neighborhoods_path = Path(__file__).parent / "neighborhoods.py"
+if not neighborhoods_path.exists():
+    raise ImportError(f"neighborhoods.py not found at {neighborhoods_path}")
+
+spec = importlib.util.spec_from_file_location("neighborhoods", neighborhoods_path)
+neighborhoods = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(neighborhoods)
+
 
 def setup_logging() -> logging.Logger:
     """Setup logging configuration."""
@@ -56,6 +90,107 @@ def setup_logging() -> logging.Logger:
     return logger
 
 
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+GEOCODE_CACHE_FILENAME = "geocode_cache.jsonl"
+
+
+def build_search_query(partial_address: str, state_code: str) -> str:
+    return f"{partial_address}, {state_code}, USA"
+
+
+def normalize_query(search_query: str) -> str:
+    """Cache key for a search query, ignoring case and repeated whitespace."""
+    return " ".join(search_query.lower().split())
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket allowing `rate` requests per second.
+
+    Each acquire() reserves a token, possibly driving the balance negative,
+    and sleeps until that token would have been refilled, so waiting threads
+    are released in order without polling.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+class GeocodeCache:
+    """
+    On-disk cache of geocoding answers, keyed by normalize_query(search_query).
+
+    Each answer is appended to data/geocode_cache.jsonl as one
+    {"query", "result"} line, where result is None for ZERO_RESULTS; later
+    lines win. Only answers about the address are cached, so quota and
+    transport errors are retried on the next run. Geocoding threads share the
+    cache, so updates are locked.
+    """
+
+    def __init__(self, cache_file: Path, logger: logging.Logger):
+        self.cache_file = cache_file
+        self.logger = logger
+        self.entries: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.lock = threading.Lock()
+
+    def load(self) -> int:
+        if not self.cache_file.exists():
+            return 0
+
+        with open(self.cache_file, "r", encoding="utf-8") as f:
+            for line_num, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                    self.entries[entry["query"]] = entry["result"]
+                except (ValueError, KeyError) as e:
+                    # A torn last line from an interrupted append is expected
+                    self.logger.warning(
+                        f"Skipping bad entry on line {line_num} of {self.cache_file}: {e}"
+                    )
+        return len(self.entries)
+
+    def __contains__(self, search_query: str) -> bool:
+        return normalize_query(search_query) in self.entries
+
+    def get(self, search_query: str) -> Optional[Dict[str, Any]]:
+        result = self.entries.get(normalize_query(search_query))
+        if result is None:
+            return None
+        return {**result, "search_query": search_query}
+
+    def put(self, search_query: str, result: Optional[Dict[str, Any]]):
+        key = normalize_query(search_query)
+        line = json.dumps({"query": key, "result": result}) + "\n"
+        with self.lock:
+            self.entries[key] = result
+            try:
+                self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.cache_file, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                self.logger.error(f"Failed to write geocode cache {self.cache_file}: {e}")
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
 def load_location_data(
     location_file: Path, logger: logging.Logger
 ) -> Optional[Dict[str, Any]]:
@@ -92,20 +227,33 @@ def geocode_address(
     state_code: str,
     logger: logging.Logger,
     timeout: int = 30,
+    session: Optional[requests.Session] = None,
+    cache: Optional[GeocodeCache] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    url: str = GEOCODE_URL,
 ) -> Optional[Dict[str, Any]]:
-    """Use Google Geocoding API to get full address and coordinates."""
-    try:
-        # Construct search query
-        search_query = f"{partial_address}, {state_code}, USA"
+    """Use Google Geocoding API to get full address and coordinates.
+
+    Cached answers are returned without a request. Otherwise the request
+    waits for rate_limiter and goes through session when given.
+    """
+    # Construct search query
+    search_query = build_search_query(partial_address, state_code)
+
+    if cache is not None and search_query in cache:
+        logger.debug(f"Geocode cache hit: {search_query}")
+        return cache.get(search_query)
 
+    try:
         logger.debug(f"Geocoding query: {search_query}")
 
-        # Construct API URL
-        base_url = "https://maps.googleapis.com/maps/api/geocode/json"
         params = {"address": search_query, "key": api_key}
 
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+
         # Make HTTP request
-        response = requests.get(base_url, params=params, timeout=timeout)
+        response = (session or requests).get(url, params=params, timeout=timeout)
         response.raise_for_status()
 
         geocode_result = response.json()
@@ -119,11 +267,15 @@ def geocode_address(
             logger.warning(
                 f"Geocoding API returned status '{status}' for '{search_query}': {error_message}"
             )
+            if status == "ZERO_RESULTS" and cache is not None:
+                cache.put(search_query, None)
             return None
 
         results = geocode_result.get("results", [])
         if not results:
             logger.warning(f"No geocoding results for: {search_query}")
+            if cache is not None:
+                cache.put(search_query, None)
             return None
 
         # Get the first (best) result
@@ -147,6 +299,8 @@ def geocode_address(
         logger.info(
             f"Successfully geocoded: {search_query} -> {geocoding_data['formatted_address']}"
         )
+        if cache is not None:
+            cache.put(search_query, geocoding_data)
         return geocoding_data
 
     except requests.exceptions.RequestException as e:
@@ -177,14 +331,10 @@ def get_all_location_codes(data_dir: Path) -> List[str]:
     return sorted(location_codes)
 
 
-def process_location(
-    location_code: str,
-    data_dir: Path,
-    api_key: str,
-    logger: logging.Logger,
-    timeout: int = 30,
-) -> Optional[Dict[str, Any]]:
-    """Process a single location code and return mapping data."""
+def load_location_fields(
+    location_code: str, data_dir: Path, logger: logging.Logger
+) -> Optional[Tuple[str, str, str]]:
+    """Return (location_name, state_code, location_id) for a location code."""
     location_dir = data_dir / location_code
     location_file = location_dir / f"{location_code}.json"
 
@@ -198,47 +348,155 @@ def process_location(
         return None
 
     try:
-        # Extract partial address
-        location_name, state_code, location_id = extract_partial_address(location_data)
-        logger.info(f"Processing {location_code}: {location_name}, {state_code}")
+        return extract_partial_address(location_data)
+    except ValueError as e:
+        logger.error(f"Error processing {location_code}: {e}")
+        return None
+
 
-        # Geocode the address
-        geocoding_data = geocode_address(
-            api_key, location_name, state_code, logger, timeout
+def build_record(
+    location_code: str,
+    fields: Tuple[str, str, str],
+    geocoding_data: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Combine a location's fields and its geocoding result into a mapping row."""
+    location_name, state_code, location_id = fields
+    record = {
+        "location_code": location_code,
+        "location_id": location_id,
+        "original_name": location_name,
+        "state_code": state_code,
+    }
+
+    if geocoding_data:
+        record.update(geocoding_data)
+        record["geocoding_success"] = True
+    else:
+        # Fill with None values if geocoding failed
+        record.update(
+            {
+                "formatted_address": None,
+                "address_components": None,
+                "latitude": None,
+                "longitude": None,
+                "place_id": None,
+                "types": None,
+                "location_type": None,
+                "search_query": build_search_query(location_name, state_code),
+                "geocoding_success": False,
+            }
         )
 
-        # Prepare record
-        record = {
-            "location_code": location_code,
-            "location_id": location_id,
-            "original_name": location_name,
-            "state_code": state_code,
+    return record
+
+
+def process_location(
+    location_code: str,
+    data_dir: Path,
+    api_key: str,
+    logger: logging.Logger,
+    timeout: int = 30,
+    **geocode_options: Any,
+) -> Optional[Dict[str, Any]]:
+    """Process a single location code and return mapping data."""
+    fields = load_location_fields(location_code, data_dir, logger)
+    if fields is None:
+        return None
+
+    location_name, state_code, _ = fields
+    logger.info(f"Processing {location_code}: {location_name}, {state_code}")
+
+    # Geocode the address
+    geocoding_data = geocode_address(
+        api_key, location_name, state_code, logger, timeout, **geocode_options
+    )
+    return build_record(location_code, fields, geocoding_data)
+
+
+def create_geocode_session(workers: int) -> requests.Session:
+    """HTTP session keeping one connection per worker alive between requests."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def geocode_locations(
+    location_codes: List[str],
+    data_dir: Path,
+    api_key: str,
+    logger: logging.Logger,
+    timeout: int,
+    workers: int,
+    session: requests.Session,
+    cache: GeocodeCache,
+    rate_limiter: Optional[RateLimiter],
+    url: str = GEOCODE_URL,
+    on_record: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Geocode locations on a thread pool and return (records, failed_count).
+
+    Locations with the same normalized search query are geocoded once and
+    the answer is shared, which also keeps concurrent workers from missing
+    the cache for the same chain name at the same time. on_record is called
+    with each record as it completes, on the calling thread.
+    """
+    groups: Dict[str, List[Tuple[str, Tuple[str, str, str]]]] = {}
+    failed = 0
+    for location_code in location_codes:
+        fields = load_location_fields(location_code, data_dir, logger)
+        if fields is None:
+            failed += 1
+            continue
+        query = normalize_query(build_search_query(fields[0], fields[1]))
+        groups.setdefault(query, []).append((location_code, fields))
+
+    cached = sum(1 for query in groups if query in cache.entries)
+    logger.info(
+        f"Geocoding {len(groups)} unique queries for {len(location_codes) - failed} "
+        f"locations ({cached} cached) with {workers} workers"
+    )
+
+    def geocode_group(members: List[Tuple[str, Tuple[str, str, str]]]):
+        location_name, state_code, _ = members[0][1]
+        return geocode_address(
+            api_key,
+            location_name,
+            state_code,
+            logger,
+            timeout,
+            session=session,
+            cache=cache,
+            rate_limiter=rate_limiter,
+            url=url,
+        )
+
+    records = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(geocode_group, members): members
+            for members in groups.values()
         }
+        for done, future in enumerate(as_completed(futures), 1):
+            members = futures[future]
+            try:
+                geocoding_data = future.result()
+            except Exception as e:
+                logger.error(f"Error geocoding {members[0][0]}: {e}")
+                geocoding_data = None
 
-        if geocoding_data:
-            record.update(geocoding_data)
-            record["geocoding_success"] = True
-        else:
-            # Fill with None values if geocoding failed
-            record.update(
-                {
-                    "formatted_address": None,
-                    "address_components": None,
-                    "latitude": None,
-                    "longitude": None,
-                    "place_id": None,
-                    "types": None,
-                    "location_type": None,
-                    "search_query": f"{location_name}, {state_code}, USA",
-                    "geocoding_success": False,
-                }
-            )
+            for location_code, fields in members:
+                record = build_record(location_code, fields, geocoding_data)
+                records.append(record)
+                if on_record is not None:
+                    on_record(record)
 
-        return record
+            if done % 100 == 0 or done == len(futures):
+                logger.info(f"Geocoded {done}/{len(futures)} queries")
 
-    except ValueError as e:
-        logger.error(f"Error processing {location_code}: {e}")
-        return None
+    return records, failed
 
 
 def load_existing_csv(output_file: Path) -> pd.DataFrame:
@@ -252,6 +510,127 @@ def load_existing_csv(output_file: Path) -> pd.DataFrame:
     return pd.DataFrame()
 
 
+def neighborhoods_unchanged(before: pd.DataFrame, after: pd.DataFrame) -> bool:
+    """Whether the neighborhood join left a mapping's neighborhood column as it was."""
+    if "neighborhood" not in after.columns:
+        return True
+    if "neighborhood" not in before.columns:
+        return False
+    # Empty CSV cells are read back as NaN where the join returns None
+    return (
+        before["neighborhood"].fillna("").astype(str).tolist()
+        == after["neighborhood"].fillna("").astype(str).tolist()
+    )
+
+
+def load_existing_codes(output_file: Path) -> set:
+    """Location codes already in the output CSV, reading only that column."""
+    try:
+        if output_file.exists():
+            return set(pd.read_csv(output_file, usecols=["location_code"])["location_code"])
+    except Exception:
+        pass
+    return set()
+
+
+class MappingCheckpoint:
+    """
+    Append-only JSONL sidecar of mapping records not yet merged into the CSV.
+
+    Each record is written and flushed as one line as soon as it is geocoded,
+    so a run costs O(new records) and an interrupted run keeps its progress.
+    A torn last line from a crash is skipped on load. compact() folds the
+    checkpoint into the sorted CSV, joins every row to its neighborhood and
+    empties the checkpoint.
+    """
+
+    def __init__(self, checkpoint_file: Path, logger: logging.Logger):
+        self.checkpoint_file = checkpoint_file
+        self.logger = logger
+        self.file = None
+
+    def load(self) -> List[Dict[str, Any]]:
+        records = []
+        if not self.checkpoint_file.exists():
+            return records
+
+        with open(self.checkpoint_file, "r", encoding="utf-8") as f:
+            for line_num, line in enumerate(f, 1):
+                try:
+                    records.append(json.loads(line))
+                except ValueError as e:
+                    self.logger.warning(
+                        f"Skipping bad record on line {line_num} of {self.checkpoint_file}: {e}"
+                    )
+        return records
+
+    def append(self, record: Dict[str, Any]):
+        if self.file is None:
+            self.checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(self.checkpoint_file, "a", encoding="utf-8")
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def compact(self, output_file: Path) -> int:
+        """Merge checkpointed records into output_file; return its row count.
+
+        The neighborhood column is joined even without new records, and the CSV
+        is rewritten whenever that adds or changes it.
+        """
+        records = self.load()
+        existing_df = load_existing_csv(output_file)
+        if not records and existing_df.empty:
+            return 0
+
+        # Create DataFrame from new records
+        new_df = pd.DataFrame(records)
+
+        # Combine with existing data
+        if new_df.empty:
+            final_df = existing_df.copy()
+        elif not existing_df.empty:
+            # Ensure columns match
+            for col in new_df.columns:
+                if col not in existing_df.columns:
+                    existing_df[col] = None
+            for col in existing_df.columns:
+                if col not in new_df.columns:
+                    new_df[col] = None
+            # Reorder columns to match existing
+            new_df = new_df[existing_df.columns]
+            final_df = pd.concat([existing_df, new_df], ignore_index=True)
+        else:
+            final_df = new_df
+
+        # Later records win, so compacting twice after a crash is harmless
+        final_df = final_df.drop_duplicates("location_code", keep="last")
+
+        # Sort by location code
+        final_df = final_df.sort_values("location_code").reset_index(drop=True)
+
+        if neighborhoods.NEIGHBORHOODS_FILE.exists():
+            final_df = neighborhoods.add_neighborhood_column(final_df)
+        else:
+            self.logger.warning(
+                f"{neighborhoods.NEIGHBORHOODS_FILE} not found, skipping neighborhood column"
+            )
+
+        if not records and neighborhoods_unchanged(existing_df, final_df):
+            return len(final_df)
+
+        # Replace the CSV atomically, then drop the merged checkpoint
+        temp_file = output_file.with_name(output_file.name + ".tmp")
+        final_df.to_csv(temp_file, index=False)
+        os.replace(temp_file, output_file)
+        self.checkpoint_file.unlink(missing_ok=True)
+        return len(final_df)
+
+
 def main():
     # Load environment variables from .env file
     load_dotenv()
@@ -272,12 +651,50 @@ def main():
         default="location_code_mapping.csv",
         help="Output CSV file name",
     )
+    parser.add_argument(
+        "--storage",
+        choices=["csv", "sqlite"],
+        default="csv",
+        help=f"Write to the output CSV or the location_mapping table in <data-dir>/{storage.SQLITE_FILENAME}",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Merge checkpointed records into the sorted output CSV and exit",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Concurrent geocoding requests (default: 8)",
+    )
+    parser.add_argument(
+        "--qps",
+        type=float,
+        default=10,
+        help="Maximum geocoding requests per second, 0 for no limit (default: 10)",
+    )
+    parser.add_argument(
+        "--geocode-url",
+        default=GEOCODE_URL,
+        help="Geocoding API endpoint (default: Google's; point at a mock server for testing)",
+    )
 
     args = parser.parse_args()
 
     # Setup logging
     logger = setup_logging()
 
+    data_dir = Path(args.data_dir)
+    output_file = data_dir.joinpath(args.output_file)
+    checkpoint = MappingCheckpoint(output_file.with_suffix(".jsonl"), logger)
+
+    if args.compact:
+        total_records = checkpoint.compact(output_file)
+        logger.info(f"Compacted {checkpoint.checkpoint_file} into {output_file}")
+        logger.info(f"Total records in output: {total_records}")
+        return
+
     # Get configuration from environment variables or arguments
     api_key = os.getenv("GOOGLE_MAPS_API_KEY")
     if not api_key:
@@ -287,15 +704,12 @@ def main():
         logger.error("Copy .env.example to .env and add your API key")
         sys.exit(1)
 
-    # Get delay and timeout from environment or arguments
-    delay = 0.1  # seconds
     timeout = 30  # seconds
 
     logger.info("Google Maps API key loaded successfully")
-    logger.info(f"Request delay: {delay}s, timeout: {timeout}s")
-
-    data_dir = Path(args.data_dir)
-    output_file = data_dir.joinpath(args.output_file)
+    logger.info(
+        f"Workers: {args.workers}, rate limit: {args.qps or 'none'} req/s, timeout: {timeout}s"
+    )
 
     # Determine location codes to process
     if args.location_code:
@@ -311,76 +725,73 @@ def main():
         logger.error("No location codes to process")
         sys.exit(1)
 
-    # Load existing data to append new records to
-    processed_codes = set()
-    existing_df = load_existing_csv(output_file)
-    if not existing_df.empty:
-        processed_codes = set(existing_df["location_code"].tolist())
-        logger.info(f"Found existing data for {len(processed_codes)} locations")
+    # Find locations already in the output or the checkpoint
+    store = None
+    if args.storage == "sqlite":
+        store = storage.SqliteStore(data_dir / storage.SQLITE_FILENAME)
+        processed_codes = set(store.read_mappings()["location_code"])
 
-    # Process locations
-    all_records = []
-    success_count = 0
-    fail_count = 0
-    skip_count = 0
-
-    for i, location_code in enumerate(location_codes, 1):
-        if location_code in processed_codes:
-            logger.info(f"Skipping {location_code} (already processed)")
-            skip_count += 1
-            continue
+        def save_record(record: Dict[str, Any]):
+            store.write_mappings([record])
 
-        logger.info(f"Processing {i}/{len(location_codes)}: {location_code}")
+    else:
+        processed_codes = load_existing_codes(output_file)
+        processed_codes.update(record["location_code"] for record in checkpoint.load())
+        save_record = checkpoint.append
+    if processed_codes:
+        logger.info(f"Found existing data for {len(processed_codes)} locations")
 
-        record = process_location(location_code, data_dir, api_key, logger, timeout)
+    pending_codes = [code for code in location_codes if code not in processed_codes]
+    skip_count = len(location_codes) - len(pending_codes)
+    if skip_count > 0:
+        logger.info(f"Skipping {skip_count} already processed locations")
 
-        if record:
-            all_records.append(record)
-            if record.get("geocoding_success", False):
-                success_count += 1
-            else:
-                fail_count += 1
-        else:
-            fail_count += 1
+    cache = GeocodeCache(data_dir / GEOCODE_CACHE_FILENAME, logger)
+    cached_count = cache.load()
+    if cached_count:
+        logger.info(f"Loaded {cached_count} cached geocoding results")
 
-        # Rate limiting
-        if i < len(location_codes) and delay > 0:
-            time.sleep(delay)
+    # Process locations
+    workers = max(1, args.workers)
+    rate_limiter = RateLimiter(args.qps) if args.qps > 0 else None
+    try:
+        with create_geocode_session(workers) as session:
+            all_records, fail_count = geocode_locations(
+                pending_codes,
+                data_dir,
+                api_key,
+                logger,
+                timeout,
+                workers,
+                session,
+                cache,
+                rate_limiter,
+                args.geocode_url,
+                on_record=save_record,
+            )
+    finally:
+        checkpoint.close()
+        if store is not None:
+            store.close()
+    success_count = sum(1 for record in all_records if record["geocoding_success"])
+    fail_count += len(all_records) - success_count
 
-    # Create DataFrame from new records
     if all_records:
-        new_df = pd.DataFrame(all_records)
-
-        # Combine with existing data
-        if not existing_df.empty:
-            # Ensure columns match
-            for col in new_df.columns:
-                if col not in existing_df.columns:
-                    existing_df[col] = None
-            for col in existing_df.columns:
-                if col not in new_df.columns:
-                    new_df[col] = None
-
-            # Reorder columns to match existing
-            new_df = new_df[existing_df.columns]
-            final_df = pd.concat([existing_df, new_df], ignore_index=True)
+        if store is not None:
+            output_desc = f"{store.path} (location_mapping table)"
         else:
-            final_df = new_df
-
-        # Sort by location code
-        final_df = final_df.sort_values("location_code").reset_index(drop=True)
-
-        # Save to CSV
-        final_df.to_csv(output_file, index=False)
+            output_desc = checkpoint.checkpoint_file
 
         logger.info(f"\nProcessing complete!")
-        logger.info(f"Output saved to: {output_file}")
-        logger.info(f"Total records in output: {len(final_df)}")
+        logger.info(f"Output saved to: {output_desc}")
+        logger.info(f"Total records in output: {len(processed_codes) + len(all_records)}")
         logger.info(f"New records processed: {len(all_records)}")
         logger.info(f"Successful geocoding: {success_count}")
         logger.info(f"Failed geocoding: {fail_count}")
         if skip_count > 0:
             logger.info(f"Skipped (already processed): {skip_count}")
+        if store is None:
+            logger.info(f"Run with --compact to merge the new records into {output_file}")
 
     else:
         logger.warning("No records processed successfully")
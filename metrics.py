@@ -0,0 +1,227 @@
+"""
+Prometheus-style metrics for the bulk scraper.
+Counters, gauges and histograms are kept in process and served in the
+Prometheus text exposition format by a small aiohttp server, so a scrape never
+touches the polling path:
+
+  uv run bulk_scraper.py --file location_codes.txt --metrics-port 9108
+  curl http://127.0.0.1:9108/metrics
+
+Metrics can also be backed by a callback evaluated at scrape time, which is
+how existing counters (connection stats, writer queue) are exported without
+updating two copies. Updates take a lock, since the writer thread records
+job durations.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+
+# Request round trips, from a fast cached response to the 30s timeout
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Writer jobs (parse, archive, flush)
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+# Event loop lag and schedule jitter
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """
+    A named metric with optional labels.
+
+    Values are keyed by the tuple of label values. If a function is given,
+    it is called at scrape time and returns either a single value or a dict
+    of label tuples to values, and the stored values are ignored.
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Tuple[str, ...] = (),
+        function: Optional[Callable[[], object]] = None,
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.function = function
+        self.values: Dict[LabelValues, float] = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> List[Tuple[str, LabelValues, float]]:
+        if self.function is not None:
+            result = self.function()
+            values = result if isinstance(result, dict) else {(): result}
+        else:
+            with self.lock:
+                values = dict(self.values)
+        return [(self.name, key, value) for key, value in sorted(values.items())]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type}"]
+        for name, key, value in self.samples():
+            lines.append(
+                f"{name}{format_labels(self.label_names, key)} {format_value(value)}"
+            )
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    """Cumulative histogram with fixed upper bounds, plus _sum and _count."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.counts: Dict[LabelValues, List[int]] = {}
+        self.sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self.lock:
+            counts = self.counts.get(key)
+            if counts is None:
+                counts = self.counts[key] = [0] * len(self.buckets)
+                self.sums[key] = 0.0
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self.sums[key] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type}"]
+        with self.lock:
+            series = [(key, list(counts), self.sums[key]) for key, counts in self.counts.items()]
+
+        for key, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = format_labels(
+                    self.label_names + ("le",), key + (format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on /metrics."""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names=(), function=None) -> Counter:
+        return self._register(Counter(name, help_text, tuple(label_names), function))
+
+    def gauge(self, name: str, help_text: str, label_names=(), function=None) -> Gauge:
+        return self._register(Gauge(name, help_text, tuple(label_names), function))
+
+    def histogram(
+        self, name: str, help_text: str, label_names=(), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, tuple(label_names), buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+async def start_metrics_server(
+    registry: MetricsRegistry, host: str, port: int, logger: logging.Logger
+) -> web.AppRunner:
+    """Serve registry on http://host:port/metrics; call cleanup() on the result to stop."""
+
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            text=registry.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return runner
+
+
+async def monitor_event_loop_lag(
+    histogram: Histogram, gauge: Gauge, interval: float = 0.5
+):
+    """Measure how late the event loop wakes a sleeping task, until cancelled.
+
+    Lag is time spent running other callbacks (or blocked in synchronous code)
+    past the requested wake-up, so it rises before dispatches fall behind.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        histogram.observe(lag)
+        gauge.set(lag)
@@ -0,0 +1,230 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["numpy", "pandas"]
+# ///
+
+"""
+Offline spatial join of coordinates to San Francisco neighborhoods.
+Loads the neighborhood MultiPolygons from sf-data/ once and indexes them with a
+uniform grid: each cell lists the neighborhoods whose bounding box overlaps it.
+A bulk lookup bins every point into its cell, then runs one vectorized
+even-odd point-in-polygon test per neighborhood, only against the points in
+that neighborhood's cells. Points outside every neighborhood get None.
+
+Usage:
+  uv run neighborhoods.py                                   # Annotate data/location_code_mapping.csv
+  uv run neighborhoods.py --mapping-file other_mapping.csv
+  uv run neighborhoods.py --lookup 37.7599 -122.4148        # Single point
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+NEIGHBORHOODS_FILE = (
+    Path(__file__).parent / "sf-data" / "SF_Find_Neighborhoods_20250927.geojson"
+)
+
+# About 550m x 450m in San Francisco, so a cell overlaps a handful of neighborhoods
+CELL_DEGREES = 0.005
+
+
+def setup_logging() -> logging.Logger:
+    """Setup logging configuration."""
+    logger = logging.getLogger("neighborhoods")
+    logger.setLevel(logging.INFO)
+
+    # Remove existing handlers to avoid duplicates
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+
+    # Console handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+
+    # Formatter
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    console_handler.setFormatter(formatter)
+
+    logger.addHandler(console_handler)
+
+    return logger
+
+
+def load_neighborhoods(
+    path: Path = NEIGHBORHOODS_FILE,
+) -> Tuple[List[str], List[List[np.ndarray]]]:
+    """Return neighborhood names and, for each, its rings as (lng, lat) arrays."""
+    with open(path, "r", encoding="utf-8") as f:
+        collection = json.load(f)
+
+    names = []
+    polygons = []
+    for feature in collection["features"]:
+        geometry = feature["geometry"]
+        if geometry["type"] == "Polygon":
+            parts = [geometry["coordinates"]]
+        elif geometry["type"] == "MultiPolygon":
+            parts = geometry["coordinates"]
+        else:
+            continue
+        names.append(feature["properties"]["name"])
+        polygons.append(
+            [np.asarray(ring, dtype=float) for part in parts for ring in part]
+        )
+    return names, polygons
+
+
+class NeighborhoodIndex:
+    """
+    Grid index over neighborhood polygons for bulk point lookups.
+
+    Each neighborhood keeps its ring edges as flat arrays (x1, y1, x2, y2),
+    holes included, so the even-odd crossing count handles holes and
+    multi-part neighborhoods in one test. cells[x_cell, y_cell, i] says
+    whether neighborhood i's bounding box overlaps that grid cell.
+    """
+
+    def __init__(
+        self,
+        names: List[str],
+        polygons: List[List[np.ndarray]],
+        cell_degrees: float = CELL_DEGREES,
+    ):
+        self.names = names
+        self.edges = []
+        self.bounds = np.empty((len(names), 4))  # min_x, min_y, max_x, max_y
+        for i, rings in enumerate(polygons):
+            starts = np.concatenate([ring[:-1] for ring in rings])
+            ends = np.concatenate([ring[1:] for ring in rings])
+            self.edges.append((starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1]))
+            points = np.concatenate(rings)
+            self.bounds[i] = (*points.min(axis=0), *points.max(axis=0))
+
+        self.cell_degrees = cell_degrees
+        self.origin = self.bounds[:, :2].min(axis=0)
+        extent = self.bounds[:, 2:].max(axis=0) - self.origin
+        self.shape = tuple((np.floor(extent / cell_degrees) + 1).astype(int))
+        self.cells = np.zeros(self.shape + (len(names),), dtype=bool)
+        low = np.floor((self.bounds[:, :2] - self.origin) / cell_degrees).astype(int)
+        high = np.floor((self.bounds[:, 2:] - self.origin) / cell_degrees).astype(int)
+        for i in range(len(names)):
+            self.cells[low[i, 0] : high[i, 0] + 1, low[i, 1] : high[i, 1] + 1, i] = True
+
+    @classmethod
+    def from_geojson(cls, path: Path = NEIGHBORHOODS_FILE) -> "NeighborhoodIndex":
+        """Build the index from a GeoJSON FeatureCollection with a name property."""
+        return cls(*load_neighborhoods(path))
+
+    def lookup_many(
+        self, latitudes: Sequence[float], longitudes: Sequence[float]
+    ) -> np.ndarray:
+        """Return the neighborhood name for each point (None if outside or NaN)."""
+        x = np.asarray(longitudes, dtype=float)
+        y = np.asarray(latitudes, dtype=float)
+        result = np.full(len(x), None, dtype=object)
+
+        with np.errstate(invalid="ignore"):
+            col = np.floor((x - self.origin[0]) / self.cell_degrees)
+            row = np.floor((y - self.origin[1]) / self.cell_degrees)
+        in_grid = (col >= 0) & (col < self.shape[0]) & (row >= 0) & (row < self.shape[1])
+        points = np.flatnonzero(in_grid)
+        if len(points) == 0:
+            return result
+
+        candidates = self.cells[col[points].astype(int), row[points].astype(int)]
+        unassigned = np.ones(len(points), dtype=bool)
+        for i in np.flatnonzero(candidates.any(axis=0)):
+            subset = np.flatnonzero(candidates[:, i] & unassigned)
+            if len(subset) == 0:
+                continue
+            px = x[points[subset]][:, None]
+            py = y[points[subset]][:, None]
+            x1, y1, x2, y2 = self.edges[i]
+            # Count edges crossed by a ray running east from each point
+            spans = (y1 > py) != (y2 > py)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossing_x = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+            inside = np.count_nonzero(spans & (px < crossing_x), axis=1) % 2 == 1
+            result[points[subset[inside]]] = self.names[i]
+            unassigned[subset[inside]] = False
+        return result
+
+    def lookup(self, latitude: float, longitude: float) -> Optional[str]:
+        return self.lookup_many([latitude], [longitude])[0]
+
+
+def add_neighborhood_column(
+    df: pd.DataFrame, index: Optional[NeighborhoodIndex] = None
+) -> pd.DataFrame:
+    """Set df["neighborhood"] from its latitude/longitude columns, in bulk."""
+    if index is None:
+        index = NeighborhoodIndex.from_geojson()
+    if df.empty:
+        df["neighborhood"] = pd.Series(dtype=object)
+        return df
+    latitudes = pd.to_numeric(df["latitude"], errors="coerce")
+    longitudes = pd.to_numeric(df["longitude"], errors="coerce")
+    df["neighborhood"] = index.lookup_many(latitudes, longitudes)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Join location coordinates to San Francisco neighborhoods"
+    )
+    parser.add_argument(
+        "--data-dir", default="data", help="Directory containing data files"
+    )
+    parser.add_argument(
+        "--mapping-file",
+        default="location_code_mapping.csv",
+        help="Mapping CSV (in --data-dir) to add a neighborhood column to",
+    )
+    parser.add_argument(
+        "--neighborhoods-file",
+        default=str(NEIGHBORHOODS_FILE),
+        help="Neighborhood GeoJSON with a name property per feature",
+    )
+    parser.add_argument(
+        "--lookup",
+        nargs=2,
+        type=float,
+        metavar=("LAT", "LNG"),
+        help="Print the neighborhood of a single point and exit",
+    )
+    args = parser.parse_args()
+
+    # Setup logging
+    logger = setup_logging()
+
+    index = NeighborhoodIndex.from_geojson(Path(args.neighborhoods_file))
+    if args.lookup:
+        print(index.lookup(*args.lookup))
+        return
+
+    mapping_file = Path(args.data_dir) / args.mapping_file
+    if not mapping_file.exists():
+        logger.error(f"Mapping file not found: {mapping_file}")
+        sys.exit(1)
+
+    df = add_neighborhood_column(pd.read_csv(mapping_file), index)
+    df.to_csv(mapping_file, index=False)
+    matched = df["neighborhood"].notna().sum()
+    logger.info(
+        f"Matched {matched}/{len(df)} locations to {len(index.names)} neighborhoods in {mapping_file}"
+    )
+
+
+if __name__ == "__main__":
+    main()
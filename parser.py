@@ -2,26 +2,49 @@
 #
 # /// script
 # requires-python = ">=3.12"
-# dependencies = ["pandas"]
+# dependencies = ["numpy", "pandas", "pyarrow"]
 # ///
 
 """
 JSON to CSV Parser for Wash Connect Data
 Parses location and machine status JSON files and outputs a consolidated CSV.
-Usage: uv run parser.py <location_code>
+Usage: uv run parser.py <location_code> [--storage csv|parquet|sqlite]
+       uv run parser.py --all [--workers N] [--include-raw]
 """
 
 import argparse
+import bz2
+import gzip
 import json
+import lzma
+import os
 import logging
 import sys
 import re
 from pathlib import Path
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set
+from datetime import datetime, timedelta
+import importlib.util
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 
+import numpy as np
 import pandas as pd
 
+# Import storage module at global scope
+storage_path = Path(__file__).parent / "storage.py"
+if not storage_path.exists():
+    raise ImportError(f"storage.py not found at {storage_path}")
+
+spec = importlib.util.spec_from_file_location("storage", storage_path)
+storage = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(storage)
+
 
 def setup_logging() -> logging.Logger:
     """Setup logging configuration."""
@@ -52,10 +75,21 @@ def extract_state_code(uln: str) -> str:
     return uln[:2] if len(uln) >= 2 else ""
 
 
+def is_status_filename(filename: str) -> bool:
+    """Whether a file name is a status JSON file, compressed or not."""
+    return filename.endswith(".json") or any(
+        filename.endswith(f".json{suffix}") for suffix in COMPRESSED_OPENERS
+    )
+
+
 def extract_request_time(filename: str) -> Optional[str]:
-    """Extract request time from filename format: {uln}-{request_time}.json"""
+    """Extract request time from filename format: {uln}-{request_time}.json
+
+    Also matches the millisecond timestamps of --archive-raw files and
+    compressed archives ({uln}-{request_time}.json.gz).
+    """
     # Pattern to match timestamp in filename
-    pattern = r"-(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{4}Z)\.json$"
+    pattern = r"-(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3,6}Z)\.json(?:\.(?:gz|bz2|xz))?$"
     match = re.search(pattern, filename)
     return match.group(1) if match else None
 
@@ -104,6 +138,52 @@ def calculate_status(machine: Dict[str, Any], request_time_str: str) -> str:
         return "available"
 
 
+def machine_state_signature(status_data: Dict[str, Any]) -> tuple:
+    """Return a hashable summary of every machine's reported state.
+
+    Two payloads with the same signature describe the same machine states.
+    """
+    return tuple(
+        sorted(
+            (
+                str(room_id),
+                str(machine.get("machine_number")),
+                str(machine.get("status")),
+                str(machine.get("start_time")),
+                str(machine.get("time_remaining")),
+            )
+            for room_id, room_data in status_data.get("data", {}).items()
+            for machine in room_data.get("machines", [])
+        )
+    )
+
+
+def expected_finish_times(
+    status_data: Dict[str, Any], request_time_str: str
+) -> List[datetime]:
+    """Return when each in-use machine is expected to become available.
+
+    Mirrors calculate_status: a machine counts as in use until more than
+    time_remaining whole minutes have elapsed since its start_time.
+    """
+    finish_times = []
+
+    for room_data in status_data.get("data", {}).values():
+        for machine in room_data.get("machines", []):
+            if calculate_status(machine, request_time_str) != "in_use":
+                continue
+
+            try:
+                start_time = parse_datetime(machine.get("start_time"))
+                minutes = int(machine.get("time_remaining")) + 1
+            except Exception:
+                continue
+
+            finish_times.append(start_time + timedelta(minutes=minutes))
+
+    return finish_times
+
+
 def load_location_data(
     location_file: Path, logger: logging.Logger
 ) -> Optional[Dict[str, Any]]:
@@ -121,166 +201,1065 @@ def load_location_data(
 def load_machine_status(
     status_file: Path, logger: logging.Logger
 ) -> Optional[Dict[str, Any]]:
-    """Load machine status JSON file."""
+    """Load machine status JSON file, decompressing .gz/.bz2/.xz archives."""
+    opener = COMPRESSED_OPENERS.get(status_file.suffix, open)
     try:
-        with open(status_file, "r", encoding="utf-8") as f:
+        with opener(status_file, "rt", encoding="utf-8") as f:
             data = json.load(f)
-        logger.info(f"Loaded machine status from: {status_file}")
+        logger.debug(f"Loaded machine status from: {status_file}")
         return data
     except Exception as e:
         logger.error(f"Failed to load status file {status_file}: {e}")
         return None
 
 
-def parse_location_code_data(
-    location_code: str, data_dir: Path, logger: logging.Logger
-) -> List[Dict[str, Any]]:
-    """Parse all JSON files for a location code and return consolidated data."""
-    location_dir = data_dir / location_code
+def extract_location_fields(location_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract location fields and a room_id -> room index from location data.
 
-    if not location_dir.exists():
-        logger.error(f"Location directory not found: {location_dir}")
-        return []
+    Raises KeyError if a required field is missing.
+    """
+    location_info = location_data["location"]
+    uln = location_info["uln"].strip()
 
-    # Load location data
-    location_file = location_dir / f"{location_code}.json"
-    location_data = load_location_data(location_file, logger)
+    rooms = location_data.get("rooms", [])
 
-    if not location_data:
-        logger.error(f"Failed to load location data for {location_code}")
-        return []
+    return {
+        "location_id": location_info["location_id"],
+        "location_name": location_info["location_name"],
+        "sitecode": location_info["sitecode"],
+        "uln": uln,
+        "state_code": extract_state_code(uln),
+        "room_mapping": {room["room_id"]: room for room in rooms},
+    }
 
-    # Extract location fields
-    try:
-        location_info = location_data["location"]
-        location_id = location_info["location_id"]
-        location_name = location_info["location_name"]
-        sitecode = location_info["sitecode"]
-        uln = location_info["uln"].strip()
-        state_code = extract_state_code(uln)
 
-        # Extract rooms information
-        rooms = location_data.get("rooms", [])
-        room_mapping = {room["room_id"]: room for room in rooms}
+LOCATION_INDEX_FILENAME = "location_index.jsonl"
+BACKFILL_CHECKPOINT_FILENAME = "backfill_checkpoint.jsonl"
+# Records per DataFrame when streaming a location's status files
+PARSE_CHUNK_RECORDS = 100_000
 
-        logger.info(f"Location: {location_name} ({location_id})")
-        logger.info(f"ULN: {uln}, State: {state_code}")
-        logger.info(f"Found {len(rooms)} rooms")
+# Status files archived by bulk_scraper.py --archive-raw
+RAW_DIRNAME = "raw"
+COMPRESSED_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
 
-    except KeyError as e:
-        logger.error(f"Missing key in location data: {e}")
-        return []
 
-    # Process all machine status files
-    all_records = []
-    status_files = list(location_dir.glob(f"{uln}-*.json"))
+class LocationRegistry:
+    """
+    Location metadata loaded once per process.
 
-    logger.info(f"Found {len(status_files)} status files")
+    Holds each location's ULN, location fields and room_id -> room index, keyed
+    by location code. Entries are re-read only when the mtime of
+    data/<code>/<code>.json changes, so a poll costs one stat instead of an
+    open and a JSON decode.
 
-    for status_file in status_files:
-        request_time = extract_request_time(status_file.name)
-        if not request_time:
-            logger.warning(f"Could not extract request time from: {status_file.name}")
-            continue
+    At startup the registry can be filled from a single JSON-lines index
+    (data/location_index.jsonl, one {"code", "mtime_ns", "data"} entry per
+    location, later lines winning) instead of opening every location file.
+    The index is appended to as new locations are saved, and rebuilt from the
+    directory tree with a thread pool when it is missing.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        logger: Optional[logging.Logger] = None,
+        index_file: Optional[Path] = None,
+    ):
+        self.data_dir = data_dir
+        self.logger = logger or logging.getLogger("parser")
+        self.index_file = index_file or data_dir / LOCATION_INDEX_FILENAME
+        self.indexed = False
+        self._entries: Dict[str, tuple[int, Dict[str, Any]]] = {}
+
+    def location_file(self, location_code: str) -> Path:
+        return self.data_dir / location_code / f"{location_code}.json"
+
+    def get(self, location_code: str) -> Optional[Dict[str, Any]]:
+        """Return location fields for a code, reloading them if the file changed."""
+        location_file = self.location_file(location_code)
+
+        try:
+            mtime = location_file.stat().st_mtime_ns
+        except OSError:
+            self._entries.pop(location_code, None)
+            return None
+
+        cached = self._entries.get(location_code)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with open(location_file, "r", encoding="utf-8") as f:
+                location_fields = extract_location_fields(json.load(f))
+        except KeyError as e:
+            self.logger.error(f"Missing key in location data for {location_code}: {e}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Failed to load location file {location_file}: {e}")
+            return None
+
+        self._entries[location_code] = (mtime, location_fields)
+        return location_fields
+
+    def cached(self, location_code: str) -> Optional[Dict[str, Any]]:
+        """Return location fields from memory without touching the file."""
+        entry = self._entries.get(location_code)
+        return entry[1] if entry else None
+
+    def load_index(self) -> Optional[int]:
+        """Fill the registry from the index file.
+
+        Returns the number of locations loaded, or None if there is no index.
+        """
+        if not self.index_file.exists():
+            return None
+
+        with open(self.index_file, "r", encoding="utf-8") as f:
+            for line_num, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                    self._entries[entry["code"]] = (
+                        entry["mtime_ns"],
+                        extract_location_fields(entry["data"]),
+                    )
+                except (ValueError, KeyError) as e:
+                    # A torn last line from an interrupted append is expected
+                    self.logger.warning(
+                        f"Skipping bad entry on line {line_num} of {self.index_file}: {e}"
+                    )
+
+        self.indexed = True
+        return len(self._entries)
+
+    def _read_location_file(self, location_dir: Path) -> Optional[Dict[str, Any]]:
+        location_file = location_dir / f"{location_dir.name}.json"
+        try:
+            mtime = location_file.stat().st_mtime_ns
+            with open(location_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            extract_location_fields(data)
+        except Exception:
+            return None
+        return {"code": location_dir.name, "mtime_ns": mtime, "data": data}
+
+    def rebuild_index(self, max_workers: int = 16) -> int:
+        """Rebuild the index from every data/<code>/<code>.json file."""
+        # A first run may start before anything created the data directory
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        location_dirs = [
+            Path(entry.path)
+            for entry in os.scandir(self.data_dir)
+            if entry.is_dir() and not entry.name.startswith(".")
+        ]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            entries = [
+                entry
+                for entry in executor.map(self._read_location_file, location_dirs)
+                if entry is not None
+            ]
+
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.index_file.with_suffix(".tmp")
+        with open(temp_file, "w", encoding="utf-8") as f:
+            for entry in sorted(entries, key=lambda e: e["code"]):
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        temp_file.replace(self.index_file)
+
+        for entry in entries:
+            self._entries[entry["code"]] = (
+                entry["mtime_ns"],
+                extract_location_fields(entry["data"]),
+            )
+
+        self.indexed = True
+        return len(entries)
+
+    def record(self, location_code: str, location_data: Dict[str, Any]) -> bool:
+        """Add a freshly saved location to the registry and append it to the index."""
+        try:
+            mtime = self.location_file(location_code).stat().st_mtime_ns
+            self._entries[location_code] = (
+                mtime,
+                extract_location_fields(location_data),
+            )
+
+            entry = {"code": location_code, "mtime_ns": mtime, "data": location_data}
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.index_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to index location {location_code}: {e}")
+            return False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DeltaEncoder:
+    """
+    Change-only encoding of parsed machine records.
+
+    Keeps the last known state of every (location_id, room_id, machine_number)
+    and passes through only the records where that state changed, i.e. the
+    transitions. Each emitted record starts a new state at its request_time and
+    closes the previous one, described by:
+      - previous_status: status before the transition (empty for first sighting)
+      - previous_since: request_time the previous state was first seen
+      - previous_last_seen: last request_time the previous state was seen
+
+    State is saved to a JSON file so a restart doesn't re-emit every machine.
+    """
 
-        status_data = load_machine_status(status_file, logger)
-        if not status_data:
+    STATE_FIELDS = ("status", "status_raw", "start_time")
+
+    def __init__(self, state_file: Optional[Path] = None):
+        self.state_file = state_file
+        # key -> [status, status_raw, start_time, since, last_seen]
+        self.states: Dict[tuple, list] = {}
+
+    @staticmethod
+    def state_value(value: Any) -> Any:
+        """None for any missing value, so NaN/NaT from DataFrames compare equal."""
+        if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)):
+            return None
+        return value
+
+    @staticmethod
+    def record_key(record: Dict[str, Any]) -> tuple:
+        return (
+            str(record["location_id"]),
+            str(record["room_id"]),
+            str(record["machine_number"]),
+        )
+
+    def load(self, logger: logging.Logger) -> int:
+        """Load saved state, returning the number of machines restored."""
+        if self.state_file is None or not self.state_file.exists():
+            return 0
+
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            # Files saved before missing values were normalized may hold NaN
+            self.states = {
+                tuple(entry[:3]): [self.state_value(value) for value in entry[3:]]
+                for entry in entries
+            }
+        except Exception as e:
+            logger.error(f"Failed to load delta state {self.state_file}: {e}")
+            self.states = {}
+
+        return len(self.states)
+
+    def save(self, logger: logging.Logger) -> bool:
+        """Persist the current state atomically."""
+        if self.state_file is None:
+            return True
+
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.state_file.with_suffix(".tmp")
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump([list(key) + state for key, state in self.states.items()], f)
+            temp_file.replace(self.state_file)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save delta state {self.state_file}: {e}")
+            return False
+
+    def encode(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return only the records that are state transitions."""
+        transitions = []
+
+        for record in sorted(records, key=lambda r: r["request_time"]):
+            key = self.record_key(record)
+            state = [self.state_value(record[field]) for field in self.STATE_FIELDS]
+            request_time = record["request_time"]
+            previous = self.states.get(key)
+
+            if previous is not None and previous[:3] == state:
+                previous[4] = request_time
+                continue
+
+            transitions.append(
+                {
+                    **record,
+                    "previous_status": previous[0] if previous else None,
+                    "previous_since": previous[3] if previous else None,
+                    "previous_last_seen": previous[4] if previous else None,
+                }
+            )
+            self.states[key] = state + [request_time, request_time]
+
+        return transitions
+
+
+def build_records(
+    location_fields: Dict[str, Any],
+    status_data: Dict[str, Any],
+    request_time: str,
+    logger: logging.Logger,
+    sent_time: Optional[str] = None,
+    received_time: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Build one record per machine from a decoded machine status payload.
+
+    request_time is used for the status calculation. When the caller knows when
+    the request was sent and the response received, request_time should be
+    their midpoint and both are stored as extra columns.
+    """
+    records = []
+    room_mapping = location_fields["room_mapping"]
+
+    # Process machines for each room
+    machines_data = status_data.get("data", {})
+
+    for room_id, room_data in machines_data.items():
+        if room_id not in room_mapping:
+            logger.warning("Room ID %s not found in location data", room_id)
             continue
 
-        # Process machines for each room
-        machines_data = status_data.get("data", {})
+        room_info = room_mapping[room_id]
+        machines = room_data.get("machines", [])
+
+        for machine in machines:
+            record = {
+                # Location fields
+                "location_id": location_fields["location_id"],
+                "location_name": location_fields["location_name"],
+                "sitecode": location_fields["sitecode"],
+                "uln": location_fields["uln"],
+                "state_code": location_fields["state_code"],
+                # Room fields
+                "room_id": room_info["room_id"],
+                "room_name": room_info["room_name"],
+                "id": room_info["id"],
+                # Machine fields
+                "machine_number": machine.get("machine_number"),
+                "start_time": machine.get("start_time"),
+                "time_remaining": int(machine.get("time_remaining")),
+                "type": machine.get("type"),
+                "request_time": request_time,
+                "request_sent_time": sent_time,
+                "response_received_time": received_time,
+                "status_raw": machine.get("status"),
+                # Calculated status
+                "status": calculate_status(machine, request_time),
+            }
+
+            records.append(record)
 
-        for room_id, room_data in machines_data.items():
+    return records
+
+
+RECORD_COLUMNS = [
+    "location_id",
+    "location_name",
+    "sitecode",
+    "uln",
+    "state_code",
+    "room_id",
+    "room_name",
+    "id",
+    "machine_number",
+    "start_time",
+    "time_remaining",
+    "type",
+    "request_time",
+    "request_sent_time",
+    "response_received_time",
+    "status_raw",
+    "status",
+]
+
+# start_time strings without a UTC offset make calculate_status fail (aware
+# minus naive datetime), which it treats as available
+TIMEZONE_SUFFIX = r"(?:Z|[+-]\d{2}:?\d{2})$"
+UTC_TIMESTAMP = r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?Z"
+
+
+def parse_utc_column(values: pd.Series, require_timezone: bool = False) -> pd.Series:
+    """Parse ISO 8601 strings to UTC timestamps, NaT where parsing fails.
+
+    Each distinct string is parsed once, which matters because request_time
+    repeats for every machine in a snapshot and start_time for every poll
+    while a machine runs. Strings in the API's own UTC format are parsed by
+    NumPy; anything else goes through pandas. With require_timezone, strings
+    without a UTC offset are treated as unparseable. Invalid dates such as
+    month 13 become NaT, as calculate_status treats them as unparseable too.
+    """
+    codes, uniques = pd.factorize(values)
+    if len(uniques) == 0:
+        # All null, e.g. start_time at a location where every machine is idle
+        return pd.Series(pd.NaT, index=values.index, dtype="datetime64[us, UTC]")
+
+    uniques = pd.Series(uniques, dtype="object")
+    strings = uniques.astype("string")
+
+    parsed = np.full(len(uniques), np.datetime64("NaT"), dtype="datetime64[us]")
+    fast = strings.str.fullmatch(UTC_TIMESTAMP).fillna(False).astype(bool)
+    if fast.any():
+        try:
+            parsed[fast.to_numpy()] = np.array(
+                strings[fast].str[:-1].tolist(), dtype="datetime64[us]"
+            )
+        except ValueError:
+            # Well-formed but invalid dates; let pandas coerce them to NaT
+            fast[:] = False
+
+    slow = ~fast
+    if require_timezone:
+        slow &= strings.str.contains(TIMEZONE_SUFFIX, regex=True).fillna(False).astype(bool)
+    if slow.any():
+        parsed[slow.to_numpy()] = (
+            pd.to_datetime(uniques[slow], utc=True, format="ISO8601", errors="coerce")
+            .dt.tz_convert(None)
+            .to_numpy(dtype="datetime64[us]")
+        )
+
+    taken = np.where(codes >= 0, parsed[np.maximum(codes, 0)], np.datetime64("NaT"))
+    return pd.Series(taken, index=values.index).dt.tz_localize("UTC")
+
+
+def calculate_status_vectorized(df: pd.DataFrame) -> pd.Series:
+    """
+    Vectorized calculate_status over status_raw, time_remaining, start_time and
+    request_time columns. Gives exactly the same result as calling
+    calculate_status on every row.
+    """
+    time_remaining = df["time_remaining"].to_numpy(dtype="int64")
+
+    # Empty strings and naive times fail in calculate_status too
+    start_time = parse_utc_column(
+        df["start_time"].where(df["start_time"] != ""), require_timezone=True
+    )
+    request_time = parse_utc_column(df["request_time"])
+
+    elapsed_seconds = (request_time - start_time).dt.total_seconds()
+    elapsed_minutes = np.floor_divide(elapsed_seconds.to_numpy(dtype="float64"), 60)
+
+    in_use = (
+        (time_remaining != 0)
+        & start_time.notna().to_numpy()
+        & request_time.notna().to_numpy()
+        & ~(elapsed_minutes > time_remaining)
+    )
+
+    status = np.where(in_use, "in_use", "available")
+    status = np.where((df["status_raw"] == "ERROR").to_numpy(), "error", status)
+    return pd.Series(status, index=df.index, name="status")
+
+
+def build_records_frame(
+    location_fields: Dict[str, Any],
+    payloads: Iterable[tuple[Dict[str, Any], str]],
+    logger: logging.Logger,
+) -> pd.DataFrame:
+    """Batch variant of build_records for many payloads of one location.
+
+    payloads yields (status_data, request_time) pairs. Machine dicts are
+    loaded into one DataFrame with a single from_records call and status is
+    computed with calculate_status_vectorized, instead of building a record
+    dict and calling calculate_status per machine.
+    """
+    room_mapping = location_fields["room_mapping"]
+    machines_flat = []
+    room_columns = {"room_id": [], "room_name": [], "id": [], "request_time": []}
+
+    for status_data, request_time in payloads:
+        for room_id, room_data in status_data.get("data", {}).items():
             if room_id not in room_mapping:
-                logger.warning(f"Room ID {room_id} not found in location data")
+                logger.warning("Room ID %s not found in location data", room_id)
                 continue
 
             room_info = room_mapping[room_id]
             machines = room_data.get("machines", [])
+            count = len(machines)
+
+            machines_flat.extend(machines)
+            room_columns["room_id"].extend([room_info["room_id"]] * count)
+            room_columns["room_name"].extend([room_info["room_name"]] * count)
+            room_columns["id"].extend([room_info["id"]] * count)
+            room_columns["request_time"].extend([request_time] * count)
+
+    # Plain object columns, as build_records produces; inferring Arrow string
+    # columns costs more than the status computation itself on large batches
+    with pd.option_context("future.infer_string", False):
+        df = pd.DataFrame.from_records(
+            machines_flat,
+            columns=["machine_number", "start_time", "time_remaining", "type", "status"],
+        ).rename(columns={"status": "status_raw"})
+        for column, values in room_columns.items():
+            df[column] = values
+        df["time_remaining"] = df["time_remaining"].astype("int64")
+        for field in ("location_id", "location_name", "sitecode", "uln", "state_code"):
+            df[field] = location_fields[field]
+        df["request_sent_time"] = None
+        df["response_received_time"] = None
+        df["status"] = (
+            calculate_status_vectorized(df) if len(df) else pd.Series(dtype=object)
+        )
+
+    return df[RECORD_COLUMNS]
+
+
+def iter_status_payloads(
+    location_dir: Path,
+    uln: str,
+    logger: logging.Logger,
+    skip_files: Optional[Set[str]] = None,
+    include_raw: bool = False,
+) -> Iterator[tuple[Dict[str, Any], str, str]]:
+    """Yield (status_data, request_time, file name) for status files, oldest first.
+
+    Files are ordered by the request time in their names and loaded one at a
+    time, so only a single payload is held in memory. Files named in
+    skip_files are not read. With include_raw, files archived in the raw/
+    subdirectory are read too; their names are relative to location_dir
+    (raw/<file>), and a file that is also in location_dir is only read once.
+    """
+    status_files = []
+    prefix = f"{uln}-"
+    directories = [(location_dir, "")]
+    raw_dir = location_dir / RAW_DIRNAME
+    if include_raw and raw_dir.is_dir():
+        directories.append((raw_dir, f"{RAW_DIRNAME}/"))
+    seen = set()
+
+    for directory, name_prefix in directories:
+        for entry in os.scandir(directory):
+            if not entry.name.startswith(prefix) or not is_status_filename(entry.name):
+                continue
+            if entry.name in seen:
+                continue
+            seen.add(entry.name)
+
+            name = name_prefix + entry.name
+            if skip_files and name in skip_files:
+                continue
+
+            request_time = extract_request_time(entry.name)
+            if not request_time:
+                logger.warning(f"Could not extract request time from: {name}")
+                continue
+
+            status_files.append((request_time, name))
+
+    status_files.sort()
+    logger.info(f"Found {len(status_files)} status files")
+
+    for request_time, name in status_files:
+        status_data = load_machine_status(location_dir / name, logger)
+        if status_data:
+            yield status_data, request_time, name
+
+
+def iter_record_chunks(
+    location_fields: Dict[str, Any],
+    location_dir: Path,
+    logger: logging.Logger,
+    skip_files: Optional[Set[str]] = None,
+    chunk_records: int = PARSE_CHUNK_RECORDS,
+    include_raw: bool = False,
+) -> Iterator[tuple[pd.DataFrame, List[str]]]:
+    """Yield parsed records in DataFrames of about chunk_records rows.
+
+    Chunks come in timestamp order along with the names of the files they were
+    parsed from, so peak memory depends on chunk_records rather than on how
+    many status files are pending. include_raw also reads the raw/ archive
+    (see iter_status_payloads); callers that delete parsed files must not set it.
+    """
+    payloads = []
+    files = []
+    pending_records = 0
+
+    for status_data, request_time, name in iter_status_payloads(
+        location_dir, location_fields["uln"], logger, skip_files, include_raw
+    ):
+        payloads.append((status_data, request_time))
+        files.append(name)
+        pending_records += sum(
+            len(room_data.get("machines", []))
+            for room_data in status_data.get("data", {}).values()
+        )
+
+        if pending_records >= chunk_records:
+            yield build_records_frame(location_fields, payloads, logger), files
+            payloads, files, pending_records = [], [], 0
+
+    if payloads:
+        yield build_records_frame(location_fields, payloads, logger), files
+
+
+def resolve_location_fields(
+    location_code: str,
+    data_dir: Path,
+    logger: logging.Logger,
+    registry: Optional[LocationRegistry] = None,
+) -> Optional[Dict[str, Any]]:
+    """Load location fields for a code, logging the location's details."""
+    location_dir = data_dir / location_code
+
+    if not location_dir.exists():
+        logger.error(f"Location directory not found: {location_dir}")
+        return None
+
+    # Load location data
+    if registry is not None:
+        location_fields = registry.get(location_code)
+        if not location_fields:
+            logger.error(f"Failed to load location data for {location_code}")
+            return None
+    else:
+        location_file = location_dir / f"{location_code}.json"
+        location_data = load_location_data(location_file, logger)
+
+        if not location_data:
+            logger.error(f"Failed to load location data for {location_code}")
+            return None
+
+        try:
+            location_fields = extract_location_fields(location_data)
+        except KeyError as e:
+            logger.error(f"Missing key in location data: {e}")
+            return None
+
+    logger.info(
+        f"Location: {location_fields['location_name']} ({location_fields['location_id']})"
+    )
+    logger.info(f"ULN: {location_fields['uln']}, State: {location_fields['state_code']}")
+    logger.info(f"Found {len(location_fields['room_mapping'])} rooms")
+
+    return location_fields
 
-            for machine in machines:
-                record = {
-                    # Location fields
-                    "location_id": location_id,
-                    "location_name": location_name,
-                    "sitecode": sitecode,
-                    "uln": uln,
-                    "state_code": state_code,
-                    # Room fields
-                    "room_id": room_info["room_id"],
-                    "room_name": room_info["room_name"],
-                    "id": room_info["id"],
-                    # Machine fields
-                    "machine_number": machine.get("machine_number"),
-                    "start_time": machine.get("start_time"),
-                    "time_remaining": int(machine.get("time_remaining")),
-                    "type": machine.get("type"),
-                    "request_time": request_time,
-                    "status_raw": machine.get("status"),
-                    # Calculated status
-                    "status": calculate_status(machine, request_time),
-                }
 
-                all_records.append(record)
+def parse_location_code_frame(
+    location_code: str,
+    data_dir: Path,
+    logger: logging.Logger,
+    registry: Optional[LocationRegistry] = None,
+) -> pd.DataFrame:
+    """Parse all JSON files for a location code into one DataFrame.
 
-    logger.info(f"Processed {len(all_records)} machine records")
-    return all_records
+    If a LocationRegistry is given, location metadata comes from it instead of
+    re-reading data/<code>/<code>.json. Returns an empty DataFrame on failure.
+    """
+    location_fields = resolve_location_fields(location_code, data_dir, logger, registry)
+    if location_fields is None:
+        return pd.DataFrame()
+
+    payloads = [
+        (status_data, request_time)
+        for status_data, request_time, _ in iter_status_payloads(
+            data_dir / location_code, location_fields["uln"], logger
+        )
+    ]
+    df = build_records_frame(location_fields, payloads, logger)
+    logger.info(f"Processed {len(df)} machine records")
+    return df
+
+
+def parse_location_code_data(
+    location_code: str,
+    data_dir: Path,
+    logger: logging.Logger,
+    registry: Optional[LocationRegistry] = None,
+) -> List[Dict[str, Any]]:
+    """Parse all JSON files for a location code and return consolidated data."""
+    return parse_location_code_frame(location_code, data_dir, logger, registry).to_dict(
+        "records"
+    )
+
+
+def iter_location_records(
+    location_code: str,
+    data_dir: Path,
+    logger: logging.Logger,
+    registry: Optional[LocationRegistry] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Streaming variant of parse_location_code_data.
+
+    Yields records file by file in timestamp order instead of collecting
+    every record first.
+    """
+    location_fields = resolve_location_fields(location_code, data_dir, logger, registry)
+    if location_fields is None:
+        return
+
+    for status_data, request_time, _ in iter_status_payloads(
+        data_dir / location_code, location_fields["uln"], logger
+    ):
+        yield from build_records(location_fields, status_data, request_time, logger)
+
+
+def find_location_codes(data_dir: Path) -> List[str]:
+    """Return every location code with a data/<code>/<code>.json file."""
+    return sorted(
+        entry.name
+        for entry in os.scandir(data_dir)
+        if entry.is_dir()
+        and not entry.name.startswith(".")
+        and os.path.exists(os.path.join(entry.path, f"{entry.name}.json"))
+    )
+
+
+class BackfillCheckpoint:
+    """
+    Processed-files checkpoint for --all backfills.
+
+    An append-only JSON-lines file with one {"code", "files"} entry per
+    location batch written to the output. A resumed backfill skips every file
+    listed here. Entries are appended only after the batch is written, so a
+    crash in between re-parses that batch rather than losing it.
+    """
+
+    def __init__(self, checkpoint_file: Path, logger: logging.Logger):
+        self.checkpoint_file = checkpoint_file
+        self.logger = logger
+        self.processed: Dict[str, Set[str]] = {}
+
+    def load(self) -> int:
+        """Load the checkpoint, returning the number of processed files."""
+        if not self.checkpoint_file.exists():
+            return 0
+
+        with open(self.checkpoint_file, "r", encoding="utf-8") as f:
+            for line_num, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                    self.processed.setdefault(entry["code"], set()).update(entry["files"])
+                except (ValueError, KeyError) as e:
+                    # A torn last line from an interrupted append is expected
+                    self.logger.warning(
+                        f"Skipping bad entry on line {line_num} of {self.checkpoint_file}: {e}"
+                    )
+
+        return sum(len(files) for files in self.processed.values())
+
+    def record(self, location_code: str, files: List[str]):
+        """Mark files of a location as processed."""
+        self.processed.setdefault(location_code, set()).update(files)
+        self.checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.checkpoint_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"code": location_code, "files": files}) + "\n")
+
+
+def init_backfill_worker():
+    """Keep per-location logging in worker processes down to warnings."""
+    setup_logging().setLevel(logging.WARNING)
+
+
+def backfill_location(
+    location_code: str,
+    data_dir: Path,
+    skip_files: Set[str],
+    chunk_records: int,
+    include_raw: bool = False,
+) -> tuple[pd.DataFrame, List[str]]:
+    """Parse the next chunk of a location's unprocessed status files.
+
+    Runs in a worker process. Returns no files once the location is done.
+    """
+    logger = logging.getLogger("parser")
+    location_fields = LocationRegistry(data_dir, logger).get(location_code)
+    if location_fields is None:
+        return pd.DataFrame(), []
+
+    chunks = iter_record_chunks(
+        location_fields,
+        data_dir / location_code,
+        logger,
+        skip_files,
+        chunk_records,
+        include_raw,
+    )
+    return next(chunks, (pd.DataFrame(), []))
+
+
+def open_output(
+    storage_backend: str, data_dir: Path, output_dir: Path, change_only: bool
+):
+    """Return the writer for parsed records.
+
+    CSV output goes to a single parsed.csv/transitions.csv in output_dir; the
+    Parquet store and SQLite database live under data_dir.
+    """
+    if storage_backend == "csv":
+        return storage.CsvFileWriter(
+            output_dir
+            / (storage.TRANSITIONS_CSV_FILENAME if change_only else storage.CSV_FILENAME)
+        )
+    return storage.open_writer(storage_backend, data_dir, change_only)
+
+
+def run_backfill(
+    data_dir: Path,
+    writer,
+    change_only: bool,
+    workers: int,
+    checkpoint_file: Path,
+    logger: logging.Logger,
+    chunk_records: int = PARSE_CHUNK_RECORDS,
+    include_raw: bool = False,
+) -> int:
+    """Parse every location under data_dir across a process pool.
+
+    Each task parses one chunk of a location's files, oldest first; the main
+    process writes it with writer (see open_output), records its files in the
+    checkpoint and submits the location again until no files are left. At
+    most two tasks per worker are in flight, so memory stays bounded by chunk
+    size. With include_raw, the raw/ archives written by --archive-raw are
+    parsed too. Returns the number of records written.
+    """
+    location_codes = find_location_codes(data_dir)
+    checkpoint = BackfillCheckpoint(checkpoint_file, logger)
+    skipped = checkpoint.load()
+    logger.info(
+        f"Backfilling {len(location_codes)} locations with {workers} workers"
+        f" ({skipped} files already processed per {checkpoint_file})"
+    )
+
+    delta_encoder = None
+    if change_only:
+        delta_encoder = DeltaEncoder(data_dir / storage.DELTA_STATE_FILENAME)
+        delta_encoder.load(logger)
+
+    total_records = 0
+    total_files = 0
+    completed = 0
+    start = time.monotonic()
+    codes = iter(location_codes)
+    pending: Dict[Any, str] = {}
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_backfill_worker
+    ) as executor:
+
+        def submit(location_code: str):
+            future = executor.submit(
+                backfill_location,
+                location_code,
+                data_dir,
+                checkpoint.processed.get(location_code, set()),
+                chunk_records,
+                include_raw,
+            )
+            pending[future] = location_code
+
+        while True:
+            for location_code in codes:
+                submit(location_code)
+                if len(pending) >= workers * 2:
+                    break
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                location_code = pending.pop(future)
+                try:
+                    df, loaded_files = future.result()
+                except Exception as e:
+                    logger.error(f"Backfill of {location_code} failed: {e}")
+                    completed += 1
+                    continue
+
+                if not loaded_files:
+                    completed += 1
+                    elapsed = time.monotonic() - start
+                    eta = elapsed / completed * (len(location_codes) - completed)
+                    logger.info(
+                        f"[{completed}/{len(location_codes)}] {location_code} done"
+                        f" ({total_files / elapsed:.1f} files/s, ETA {eta:.0f}s)"
+                    )
+                    continue
+
+                if delta_encoder is not None and not df.empty:
+                    df = pd.DataFrame(delta_encoder.encode(df.to_dict("records")))
+
+                if not df.empty:
+                    writer.write(storage.sort_records(df), location_code)
+                    writer.flush()
+                    total_records += len(df)
+
+                if delta_encoder is not None:
+                    delta_encoder.save(logger)
+
+                checkpoint.record(location_code, loaded_files)
+                total_files += len(loaded_files)
+                logger.info(
+                    f"{location_code}: {len(df)} records from {len(loaded_files)} files"
+                )
+                submit(location_code)
+
+    logger.info(
+        f"Backfill complete: {total_records} records from {total_files} files"
+        f" in {time.monotonic() - start:.1f}s"
+    )
+    return total_records
 
 
 def main():
     parser = argparse.ArgumentParser(description="Parse Wash Connect JSON data to CSV")
-    parser.add_argument("location_code", help="Location code to parse")
+    parser.add_argument("location_code", nargs="?", help="Location code to parse")
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Backfill every location under --data-dir into one consolidated output",
+    )
     parser.add_argument(
         "--data-dir", default="data", help="Directory containing data files"
     )
     parser.add_argument(
-        "--output-dir", default=None, help="Directory to save CSV output"
+        "--output-dir",
+        default=None,
+        help="Directory to save CSV output (default: data/<code>, or --data-dir with --all)",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=["csv", "parquet", "sqlite"],
+        default="csv",
+        help=(
+            "Write to parsed.csv, the Parquet store in <data-dir>/store or the "
+            f"SQLite database <data-dir>/{storage.SQLITE_FILENAME}"
+        ),
+    )
+    parser.add_argument(
+        "--change-only",
+        action="store_true",
+        help="Write only machine state transitions (transitions.csv)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for --all (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--chunk-records",
+        type=int,
+        default=PARSE_CHUNK_RECORDS,
+        help="Records parsed and written per chunk (bounds peak memory)",
+    )
+    parser.add_argument(
+        "--include-raw",
+        action="store_true",
+        help="Also parse status files archived in <data-dir>/<code>/raw/ by "
+        "bulk_scraper.py --archive-raw (.json, .json.gz, .json.bz2 or .json.xz)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default=None,
+        help=f"Processed-files checkpoint for --all (default: <data-dir>/{BACKFILL_CHECKPOINT_FILENAME})",
     )
 
     args = parser.parse_args()
+    if args.all == bool(args.location_code):
+        parser.error("specify either a location code or --all")
+
     location_code = args.location_code
     data_dir = Path(args.data_dir)
-    output_dir = Path(args.output_dir if args.output_dir else f"data/{location_code}")
 
     # Setup logging
     logger = setup_logging()
 
+    if args.all:
+        writer = open_output(
+            args.storage,
+            data_dir,
+            Path(args.output_dir) if args.output_dir else data_dir,
+            args.change_only,
+        )
+        run_backfill(
+            data_dir,
+            writer,
+            args.change_only,
+            max(1, args.workers),
+            Path(args.checkpoint) if args.checkpoint else data_dir / BACKFILL_CHECKPOINT_FILENAME,
+            logger,
+            max(1, args.chunk_records),
+            args.include_raw,
+        )
+        return
+
+    output_dir = Path(args.output_dir if args.output_dir else f"data/{location_code}")
+
     logger.info(f"Starting parser for location code: {location_code}")
 
-    # Parse data
-    records = parse_location_code_data(location_code, data_dir, logger)
+    location_fields = resolve_location_fields(location_code, data_dir, logger)
+    if location_fields is None:
+        sys.exit(1)
+
+    writer = open_output(args.storage, data_dir, output_dir, args.change_only)
 
-    if not records:
+    delta_encoder = None
+    if args.change_only:
+        delta_encoder = DeltaEncoder(data_dir / storage.DELTA_STATE_FILENAME)
+        delta_encoder.load(logger)
+
+    # Parse and write in bounded chunks, oldest status files first
+    parsed_count = 0
+    written_count = 0
+    machines = set()
+    rooms = set()
+    first_time = last_time = None
+    status_counts = pd.Series(dtype="int64")
+    output_file = None
+
+    for df, _ in iter_record_chunks(
+        location_fields,
+        data_dir / location_code,
+        logger,
+        chunk_records=args.chunk_records,
+        include_raw=args.include_raw,
+    ):
+        parsed_count += len(df)
+
+        if delta_encoder is not None:
+            df = pd.DataFrame(delta_encoder.encode(df.to_dict("records")))
+            if df.empty:
+                continue
+
+        # Sort by request_time and machine_number for better organization
+        df = storage.sort_records(df)
+        output_file = writer.write(df, location_code)
+
+        written_count += len(df)
+        machines.update(df["machine_number"])
+        rooms.update(df["room_id"])
+        first_time = first_time or df["request_time"].iloc[0]
+        last_time = df["request_time"].iloc[-1]
+        status_counts = status_counts.add(df["status"].value_counts(), fill_value=0)
+
+    writer.flush()
+
+    if parsed_count == 0:
         logger.error("No records found to process")
         sys.exit(1)
 
-    # Create DataFrame
-    df = pd.DataFrame(records)
+    if delta_encoder is not None:
+        delta_encoder.save(logger)
+        logger.info(f"{written_count} of {parsed_count} records are state transitions")
 
-    # Sort by request_time and machine_number for better organization
-    df = df.sort_values(["request_time", "room_id", "machine_number"])
+    if written_count == 0:
+        logger.info("No state transitions to write")
+        return
 
-    # Save to CSV
-    output_dir.mkdir(parents=True, exist_ok=True)
-    output_file = output_dir / "parsed.csv"
-
-    # If file exists, append without header, otherwise create new with header
-    df.to_csv(output_file, index=False, mode="a", header=not output_file.exists())
-    logger.info(
-        f"CSV {'appended to' if output_file.exists() else 'saved to'}: {output_file}"
-    )
-    logger.info(f"Total records added: {len(df)}")
+    logger.info(f"Records written to: {output_file}")
+    logger.info(f"Total records added: {written_count}")
 
     # Print summary statistics
     logger.info("\nSummary:")
-    logger.info(f"Unique machines: {df['machine_number'].nunique()}")
-    logger.info(f"Unique rooms: {df['room_id'].nunique()}")
-    logger.info(f"Time range: {df['request_time'].min()} to {df['request_time'].max()}")
+    logger.info(f"Unique machines: {len(machines)}")
+    logger.info(f"Unique rooms: {len(rooms)}")
+    logger.info(f"Time range: {first_time} to {last_time}")
 
-    status_counts = df["status"].value_counts()
     logger.info("Status distribution:")
-    for status, count in status_counts.items():
-        logger.info(f"  {status}: {count}")
+    for status, count in status_counts.sort_values(ascending=False).items():
+        logger.info(f"  {status}: {int(count)}")
 
 
 if __name__ == "__main__":
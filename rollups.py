@@ -0,0 +1,410 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["pandas", "pyarrow"]
+# ///
+
+"""
+Utilization rollups of parsed machine records.
+Records are counted per time bucket, location and machine type: how many
+machine observations were available, in_use or error, and the most machines
+seen in a single poll. Counts only ever add up, so new records are merged into
+a rollup without rereading old ones, and analysis reads one row per bucket
+instead of every raw record. bulk_scraper.py --rollups merges each cycle's
+records once they are stored; rebuild recomputes everything from stored records.
+
+Rollups are kept in data/rollups.db (SQLite, WAL mode), one table per bucket size:
+
+  usage_15min / usage_hour / usage_day
+    (bucket_start, location_id, type, available, in_use, error, machines)
+
+bucket_start is the bucket's start in Unix seconds (UTC, so days are UTC days).
+
+Usage:
+  uv run rollups.py rebuild --data-dir data                     # From parsed.csv files
+  uv run rollups.py rebuild --data-dir data --storage parquet   # From the Parquet store
+  uv run rollups.py query --granularity 1h --since 2025-09-01   # Print rollup rows as CSV
+"""
+
+import argparse
+import importlib.util
+import logging
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import pandas as pd
+
+# Import storage module at global scope
+storage_path = Path(__file__).parent / "storage.py"
+if not storage_path.exists():
+    raise ImportError(f"storage.py not found at {storage_path}")
+
+spec = importlib.util.spec_from_file_location("storage", storage_path)
+storage = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(storage)
+
+ROLLUP_FILENAME = "rollups.db"
+BUCKET_FREQ = "15min"
+# Bucket size -> table; coarser tables are summed from the 15-minute rollup
+GRANULARITIES = {"15min": "usage_15min", "1h": "usage_hour", "1D": "usage_day"}
+STATUS_COUNTS = ["available", "in_use", "error"]
+ROLLUP_KEY = ["bucket_start", "location_id", "type"]
+ROLLUP_COLUMNS = ROLLUP_KEY + STATUS_COUNTS + ["machines"]
+RECORD_COLUMNS = ["location_id", "type", "request_time", "status"]
+# How rows for the same bucket combine
+ROLLUP_AGGREGATES = {"available": "sum", "in_use": "sum", "error": "sum", "machines": "max"}
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    bucket_start INTEGER NOT NULL,
+    location_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    available INTEGER NOT NULL,
+    in_use INTEGER NOT NULL,
+    error INTEGER NOT NULL,
+    machines INTEGER NOT NULL,
+    PRIMARY KEY (bucket_start, location_id, type)
+) WITHOUT ROWID;
+"""
+
+
+def setup_logging() -> logging.Logger:
+    """Setup logging configuration."""
+    logger = logging.getLogger("rollups")
+    logger.setLevel(logging.INFO)
+
+    # Remove existing handlers to avoid duplicates
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+
+    # Console handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+
+    # Formatter
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    console_handler.setFormatter(formatter)
+
+    logger.addHandler(console_handler)
+
+    return logger
+
+
+def bucket_seconds(freq: str) -> int:
+    return int(pd.Timedelta(freq).total_seconds())
+
+
+def compute_rollup(df: pd.DataFrame, freq: str = BUCKET_FREQ) -> pd.DataFrame:
+    """Count parsed records per bucket, location and machine type.
+
+    machines is the largest number of machines of that type in a single poll
+    (request_time) within the bucket.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    request_time = pd.to_datetime(df["request_time"], utc=True, format="ISO8601")
+    status = df["status"].astype(str)
+    frame = pd.DataFrame(
+        {
+            "bucket_start": request_time.dt.floor(freq),
+            "location_id": df["location_id"].astype(str),
+            "type": df["type"].astype(object).fillna("unknown").astype(str),
+            "request_time": request_time,
+            **{name: (status == name).astype("int64") for name in STATUS_COUNTS},
+        }
+    )
+
+    per_poll = frame.groupby(ROLLUP_KEY + ["request_time"], sort=False).agg(
+        available=("available", "sum"),
+        in_use=("in_use", "sum"),
+        error=("error", "sum"),
+        machines=("available", "size"),
+    )
+    rollup = per_poll.groupby(level=ROLLUP_KEY, sort=False).agg(ROLLUP_AGGREGATES)
+    return rollup.reset_index()[ROLLUP_COLUMNS]
+
+
+class RollupStore:
+    """
+    SQLite file holding the usage rollups.
+
+    add() merges a 15-minute rollup into every table in one transaction, with
+    one executemany upsert per table: counts are added to existing buckets and
+    machines keeps the larger value, so the same bucket can be extended by
+    later records. Hour and day rows are summed from the 15-minute rows first.
+    Reads filter on the primary key, so their cost is proportional to the
+    buckets returned.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=30000")
+            for table in GRANULARITIES.values():
+                connection.executescript(ROLLUP_SCHEMA.format(table=table))
+            self._connection = connection
+            self._fill_coarse_tables()
+        return self._connection
+
+    def _fill_coarse_tables(self):
+        """Derive empty hour/day tables from usage_15min (files with only that table)."""
+        connection = self._connection
+        with connection:
+            for freq, table in GRANULARITIES.items():
+                if freq == BUCKET_FREQ or connection.execute(
+                    f"SELECT 1 FROM {table} LIMIT 1"
+                ).fetchone():
+                    continue
+                step = bucket_seconds(freq)
+                connection.execute(
+                    f"""
+                    INSERT INTO {table} ({', '.join(ROLLUP_COLUMNS)})
+                    SELECT bucket_start - bucket_start % {step}, location_id, type,
+                        sum(available), sum(in_use), sum(error), max(machines)
+                    FROM {GRANULARITIES[BUCKET_FREQ]}
+                    GROUP BY 1, location_id, type
+                    """
+                )
+
+    def add(self, rollup: pd.DataFrame) -> int:
+        """Merge 15-minute rollup rows into every table; returns the 15-minute row count."""
+        if rollup.empty:
+            return 0
+
+        rows = rollup[ROLLUP_COLUMNS].copy()
+        rows["bucket_start"] = (
+            rows["bucket_start"] - pd.Timestamp(0, tz="UTC")
+        ) // pd.Timedelta(seconds=1)
+        connection = self.connect()
+        with connection:
+            for freq, table in GRANULARITIES.items():
+                if freq != BUCKET_FREQ:
+                    step = bucket_seconds(freq)
+                    coarse = rows.assign(
+                        bucket_start=rows["bucket_start"] - rows["bucket_start"] % step
+                    )
+                    table_rows = (
+                        coarse.groupby(ROLLUP_KEY, sort=False)
+                        .agg(ROLLUP_AGGREGATES)
+                        .reset_index()
+                    )
+                else:
+                    table_rows = rows
+                connection.executemany(
+                    f"""
+                    INSERT INTO {table} ({', '.join(ROLLUP_COLUMNS)})
+                    VALUES ({', '.join('?' * len(ROLLUP_COLUMNS))})
+                    ON CONFLICT (bucket_start, location_id, type) DO UPDATE SET
+                        available = available + excluded.available,
+                        in_use = in_use + excluded.in_use,
+                        error = error + excluded.error,
+                        machines = max(machines, excluded.machines)
+                    """,
+                    storage.to_sql_rows(table_rows, ROLLUP_COLUMNS),
+                )
+        return len(rows)
+
+    def read(
+        self,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None,
+        location_ids: Optional[Iterable[Any]] = None,
+        granularity: str = BUCKET_FREQ,
+    ) -> pd.DataFrame:
+        """Return rollup rows with bucket_start in [start, end) as UTC timestamps.
+
+        granularity picks the table: "15min", "1h" or "1D".
+        """
+        conditions = []
+        params = []
+        if start is not None:
+            conditions.append("bucket_start >= ?")
+            params.append(int(storage.to_utc(start).timestamp()))
+        if end is not None:
+            conditions.append("bucket_start < ?")
+            params.append(int(storage.to_utc(end).timestamp()))
+        if location_ids is not None:
+            location_ids = [str(i) for i in location_ids]
+            conditions.append(f"location_id IN ({', '.join('?' * len(location_ids))})")
+            params.extend(location_ids)
+
+        query = f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM {GRANULARITIES[granularity]}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        df = pd.read_sql_query(query, self.connect(), params=params)
+        df["bucket_start"] = pd.to_datetime(df["bucket_start"], unit="s", utc=True)
+        return df
+
+    def clear(self):
+        connection = self.connect()
+        with connection:
+            for table in GRANULARITIES.values():
+                connection.execute(f"DELETE FROM {table}")
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class RollupWriter:
+    """
+    Buffers parsed records and merges their rollup into a RollupStore.
+
+    write() only keeps the rollup columns; flush() rolls up everything
+    buffered and merges it in one transaction. The caller flushes once the
+    same records are committed to storage (every cycle, or sooner when full),
+    so the rollups never count records whose write failed. Every poll's
+    records must arrive in one write() so machines counts the whole poll.
+    """
+
+    FLUSH_ROWS = 200_000
+
+    def __init__(self, store: RollupStore):
+        self.store = store
+        self._pending: Dict[str, list] = {column: [] for column in RECORD_COLUMNS}
+        self._pending_rows = 0
+
+    def write(self, df: pd.DataFrame):
+        """Buffer records for the next flush."""
+        # Plain lists: cheaper per poll than keeping (or concatenating) frames
+        for column in RECORD_COLUMNS:
+            self._pending[column].extend(df[column].tolist())
+        self._pending_rows += len(df)
+
+    @property
+    def full(self) -> bool:
+        """Whether FLUSH_ROWS records are pending."""
+        return self._pending_rows >= self.FLUSH_ROWS
+
+    def flush(self) -> int:
+        """Merge the buffered records' rollup; returns the 15-minute row count."""
+        if not self._pending_rows:
+            return 0
+
+        rollup = compute_rollup(pd.DataFrame(self._pending))
+        self._pending = {column: [] for column in RECORD_COLUMNS}
+        self._pending_rows = 0
+        return self.store.add(rollup)
+
+    def close(self):
+        """Flush buffered records and close the store."""
+        self.flush()
+        self.store.close()
+
+
+def iter_stored_records(
+    data_dir: Path, storage_name: str, logger: logging.Logger
+) -> Iterator[pd.DataFrame]:
+    """Yield the stored snapshot records in bounded chunks (rollup columns only)."""
+    if storage_name == "parquet":
+        dataset = storage.ParquetStore(data_dir / storage.STORE_DIRNAME).dataset()
+        for batch in dataset.to_batches(columns=RECORD_COLUMNS):
+            yield batch.to_pandas()
+    elif storage_name == "sqlite":
+        store = storage.SqliteStore(data_dir / storage.SQLITE_FILENAME)
+        location_ids = pd.read_sql_query(
+            "SELECT location_id FROM locations", store.connect()
+        )["location_id"]
+        for location_id in location_ids:
+            yield store.read(location_ids=[location_id], columns=RECORD_COLUMNS)
+        store.close()
+    else:
+        for csv_file in sorted(data_dir.glob(f"*/{storage.CSV_FILENAME}")):
+            try:
+                yield from pd.read_csv(
+                    csv_file,
+                    usecols=RECORD_COLUMNS,
+                    chunksize=storage.CSV_CHUNK_SIZE,
+                    dtype={"location_id": "string"},
+                )
+            except (ValueError, pd.errors.ParserError) as e:
+                logger.error(f"Skipping {csv_file}: {e}")
+
+
+def rebuild_rollups(data_dir: Path, storage_name: str, logger: logging.Logger) -> int:
+    """Recompute data/rollups.db from every stored snapshot record.
+
+    Stop bulk_scraper.py first: records it parses during the rebuild could be
+    counted twice.
+    """
+    store = RollupStore(data_dir / ROLLUP_FILENAME)
+    store.clear()
+    records = 0
+    rows = 0
+    for chunk in iter_stored_records(data_dir, storage_name, logger):
+        records += len(chunk)
+        rows += store.add(compute_rollup(chunk))
+    store.close()
+    logger.info(f"Rolled up {records} records from {storage_name} storage into {store.path}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage usage rollups")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser(
+        "rebuild", help="Recompute rollups from all stored records"
+    )
+    rebuild_parser.add_argument(
+        "--data-dir", default="data", help="Directory containing data files"
+    )
+    rebuild_parser.add_argument(
+        "--storage",
+        choices=["csv", "parquet", "sqlite"],
+        default="csv",
+        help="Where the parsed records are stored (default: csv)",
+    )
+
+    query_parser = subparsers.add_parser(
+        "query", help="Print rollup rows as CSV, with in_use_pct per row"
+    )
+    query_parser.add_argument(
+        "--data-dir", default="data", help="Directory containing data files"
+    )
+    query_parser.add_argument(
+        "--granularity",
+        choices=list(GRANULARITIES),
+        default="1h",
+        help="Bucket size (default: 1h)",
+    )
+    query_parser.add_argument("--since", default=None, help="Only buckets from this time")
+    query_parser.add_argument("--until", default=None, help="Only buckets before this time")
+    query_parser.add_argument(
+        "--location-id", nargs="+", default=None, help="Only these location IDs"
+    )
+
+    args = parser.parse_args()
+    data_dir = Path(args.data_dir)
+
+    # Setup logging
+    logger = setup_logging()
+
+    if args.command == "rebuild":
+        rebuild_rollups(data_dir, args.storage, logger)
+    elif args.command == "query":
+        store = RollupStore(data_dir / ROLLUP_FILENAME)
+        df = store.read(args.since, args.until, args.location_id, args.granularity)
+        store.close()
+        observed = df[STATUS_COUNTS].sum(axis=1)
+        df["in_use_pct"] = (df["in_use"] / observed.where(observed > 0)).round(4)
+        df.to_csv(sys.stdout, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,828 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["pandas", "pyarrow"]
+# ///
+
+"""
+Storage backends for parsed Wash Connect records.
+Parsed machine records can be written to per-location parsed.csv files, to a
+columnar Parquet store partitioned by date and location:
+
+  data/store/date=2025-09-27/location_id=1234/part-<token>-0.parquet
+
+or to a single SQLite database (data/washconnect.db, WAL mode) with locations,
+rooms, machines and snapshots tables.
+
+Repeated string columns (location name, room name, status, ...) are dictionary
+encoded, and the reader pushes filters on request_time, location_id and status
+down to partition pruning and Parquet row-group statistics.
+
+Usage:
+  uv run storage.py migrate --data-dir data             # parsed.csv -> Parquet
+  uv run storage.py migrate --data-dir data --delete-csv
+  uv run storage.py compact --data-dir data             # merge each past day's part files
+"""
+
+import argparse
+import csv
+import json
+import logging
+import sqlite3
+import sys
+import uuid
+import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+STORE_DIRNAME = "store"
+MIGRATED_FILENAME = "_migrated.jsonl"
+CSV_FILENAME = "parsed.csv"
+TRANSITIONS_STORE_DIRNAME = "transitions"
+TRANSITIONS_CSV_FILENAME = "transitions.csv"
+DELTA_STATE_FILENAME = "delta_state.json"
+SQLITE_FILENAME = "washconnect.db"
+TIME_COLUMNS = (
+    "request_time",
+    "request_sent_time",
+    "response_received_time",
+    "previous_since",
+    "previous_last_seen",
+)
+RECORD_KEY = ["location_id", "room_id", "machine_number"]
+CSV_CHUNK_SIZE = 500_000
+
+# Location-level and low-cardinality columns repeat on every row, so they are
+# stored dictionary encoded
+DICTIONARY = pa.dictionary(pa.int32(), pa.string())
+REQUEST_TIME_TYPE = pa.timestamp("us", tz="UTC")
+
+RECORD_SCHEMA = pa.schema(
+    [
+        ("location_name", DICTIONARY),
+        ("sitecode", DICTIONARY),
+        ("uln", DICTIONARY),
+        ("state_code", DICTIONARY),
+        ("room_id", DICTIONARY),
+        ("room_name", DICTIONARY),
+        ("id", DICTIONARY),
+        ("machine_number", pa.string()),
+        ("start_time", pa.string()),
+        ("time_remaining", pa.int64()),
+        ("type", DICTIONARY),
+        ("request_time", REQUEST_TIME_TYPE),
+        ("request_sent_time", REQUEST_TIME_TYPE),
+        ("response_received_time", REQUEST_TIME_TYPE),
+        ("status_raw", DICTIONARY),
+        ("status", DICTIONARY),
+        # Only set for change-only (transition) records
+        ("previous_status", DICTIONARY),
+        ("previous_since", REQUEST_TIME_TYPE),
+        ("previous_last_seen", REQUEST_TIME_TYPE),
+    ]
+)
+
+STORE_SCHEMA = RECORD_SCHEMA.append(pa.field("date", pa.string())).append(
+    pa.field("location_id", pa.string())
+)
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("date", pa.string()), ("location_id", pa.string())]),
+    flavor="hive",
+)
+
+# Snapshot rows reference machines by their natural key; location and room
+# details are stored once in their own tables
+SNAPSHOT_COLUMNS = [
+    "location_id",
+    "room_id",
+    "machine_number",
+    "request_time",
+    "request_sent_time",
+    "response_received_time",
+    "start_time",
+    "time_remaining",
+    "status_raw",
+    "status",
+    "previous_status",
+    "previous_since",
+    "previous_last_seen",
+]
+MAPPING_COLUMNS = [
+    "location_code",
+    "location_id",
+    "original_name",
+    "state_code",
+    "formatted_address",
+    "address_components",
+    "latitude",
+    "longitude",
+    "place_id",
+    "types",
+    "location_type",
+    "search_query",
+    "geocoding_success",
+]
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS locations (
+    location_id TEXT PRIMARY KEY,
+    location_code TEXT,
+    location_name TEXT,
+    sitecode TEXT,
+    uln TEXT,
+    state_code TEXT
+);
+CREATE TABLE IF NOT EXISTS rooms (
+    location_id TEXT NOT NULL,
+    room_id TEXT NOT NULL,
+    room_name TEXT,
+    id TEXT,
+    PRIMARY KEY (location_id, room_id)
+);
+CREATE TABLE IF NOT EXISTS machines (
+    location_id TEXT NOT NULL,
+    room_id TEXT NOT NULL,
+    machine_number TEXT NOT NULL,
+    type TEXT,
+    PRIMARY KEY (location_id, room_id, machine_number)
+);
+CREATE TABLE IF NOT EXISTS {table} (
+    location_id TEXT NOT NULL,
+    room_id TEXT NOT NULL,
+    machine_number TEXT NOT NULL,
+    request_time TEXT NOT NULL,
+    request_sent_time TEXT,
+    response_received_time TEXT,
+    start_time TEXT,
+    time_remaining INTEGER,
+    status_raw TEXT,
+    status TEXT,
+    previous_status TEXT,
+    previous_since TEXT,
+    previous_last_seen TEXT
+);
+CREATE INDEX IF NOT EXISTS {table}_location_time ON {table} (location_id, request_time);
+CREATE INDEX IF NOT EXISTS {table}_status_time ON {table} (status, request_time);
+CREATE TABLE IF NOT EXISTS location_mapping (
+    location_code TEXT PRIMARY KEY,
+    location_id TEXT,
+    original_name TEXT,
+    state_code TEXT,
+    formatted_address TEXT,
+    address_components TEXT,
+    latitude REAL,
+    longitude REAL,
+    place_id TEXT,
+    types TEXT,
+    location_type TEXT,
+    search_query TEXT,
+    geocoding_success INTEGER
+);
+"""
+
+
+def setup_logging() -> logging.Logger:
+    """Setup logging configuration."""
+    logger = logging.getLogger("storage")
+    logger.setLevel(logging.INFO)
+
+    # Remove existing handlers to avoid duplicates
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+
+    # Console handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+
+    # Formatter
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    console_handler.setFormatter(formatter)
+
+    logger.addHandler(console_handler)
+
+    return logger
+
+
+def to_utc(value: Any) -> pd.Timestamp:
+    """Convert a datetime-like value to a UTC timestamp (naive means UTC)."""
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        return timestamp.tz_localize("UTC")
+    return timestamp.tz_convert("UTC")
+
+
+def sort_records(df: pd.DataFrame) -> pd.DataFrame:
+    """Sort parsed records the way every backend stores them."""
+    return df.sort_values(["request_time", "room_id", "machine_number"])
+
+
+def read_csv_header(csv_file: Path) -> Optional[List[str]]:
+    """Return the column names of an existing CSV file, if any."""
+    try:
+        with open(csv_file, "r", encoding="utf-8", newline="") as f:
+            return next(csv.reader(f), None)
+    except OSError:
+        return None
+
+
+def append_csv(
+    df: pd.DataFrame, output_file: Path, header: Optional[List[str]] = None
+) -> List[str]:
+    """Append records to a CSV, writing a header only for new files.
+
+    Files created before a column was added keep their original header, so
+    appended rows are aligned to it and extra columns are dropped. Pass the
+    header returned by a previous call to skip re-reading it. Returns the
+    file's columns.
+    """
+    if header is None:
+        header = read_csv_header(output_file)
+
+    if header is None:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(output_file, index=False)
+        return list(df.columns)
+
+    if list(df.columns) != header:
+        df = df.reindex(columns=header)
+
+    df.to_csv(output_file, index=False, mode="a", header=False)
+    return header
+
+
+class CsvWriter:
+    """Append parsed records to data/<location_code>/parsed.csv."""
+
+    def __init__(self, data_dir: Path, filename: str = CSV_FILENAME):
+        self.data_dir = data_dir
+        self.filename = filename
+        self._headers: Dict[Path, List[str]] = {}
+
+    def write(self, df: pd.DataFrame, location_code: str) -> Path:
+        """Append records for a location, writing a header for new files."""
+        output_file = self.data_dir / location_code / self.filename
+        self._headers[output_file] = append_csv(
+            df, output_file, self._headers.get(output_file)
+        )
+        return output_file
+
+    def flush(self) -> int:
+        """Records are appended as they are written; nothing is buffered."""
+        return 0
+
+
+class CsvFileWriter:
+    """Append parsed records for any number of locations to one CSV file."""
+
+    def __init__(self, output_file: Path):
+        self.output_file = output_file
+        self._header: Optional[List[str]] = None
+
+    def write(self, df: pd.DataFrame, location_code: Optional[str] = None) -> Path:
+        """Append records, writing a header if the file is new."""
+        self._header = append_csv(df, self.output_file, self._header)
+        return self.output_file
+
+    def flush(self) -> int:
+        """Records are appended as they are written; nothing is buffered."""
+        return 0
+
+
+class ParquetStore:
+    """
+    Columnar store partitioned by date and location_id.
+
+    write() only buffers records; flush() writes everything buffered as one
+    new part file per partition, and is called once per scrape cycle (or when
+    FLUSH_ROWS records are pending), so a day gets one file per location per
+    cycle rather than per poll. compact() merges a past day's part files into
+    one file per partition.
+
+    With a token, every part file the store writes is named after it, so
+    discard() can remove them all again (used to roll back a failed migration).
+    """
+
+    FLUSH_ROWS = 500_000
+
+    def __init__(self, root: Path, token: Optional[str] = None):
+        self.root = root
+        self.token = token
+        self._pending: List[pd.DataFrame] = []
+        self._pending_rows = 0
+        self._flushes = 0
+
+    def to_table(self, df: pd.DataFrame) -> pa.Table:
+        """Convert parsed records to an Arrow table with partition columns."""
+        # Older parsed.csv files lack some columns; they are stored as nulls
+        df = df.reindex(columns=[name for name in STORE_SCHEMA.names if name != "date"])
+        for column in TIME_COLUMNS:
+            df[column] = pd.to_datetime(df[column], utc=True, format="ISO8601")
+        for column in ("id", "machine_number", "location_id"):
+            df[column] = df[column].astype("string")
+        # Columns added by reindex are all-NaN float64, which Arrow can't
+        # convert to dictionary or string
+        for column in df.columns[df.isna().all()]:
+            if column not in TIME_COLUMNS:
+                df[column] = df[column].astype(object)
+        df["date"] = df["request_time"].dt.strftime("%Y-%m-%d")
+
+        return pa.Table.from_pandas(
+            df[STORE_SCHEMA.names], schema=STORE_SCHEMA, preserve_index=False
+        )
+
+    def write(self, df: pd.DataFrame, location_code: Optional[str] = None) -> Path:
+        """Buffer records for the next flush."""
+        self._pending.append(df)
+        self._pending_rows += len(df)
+        if self._pending_rows >= self.FLUSH_ROWS:
+            self.flush()
+        return self.root
+
+    def flush(self) -> int:
+        """Write all buffered records as new part files; returns the row count.
+
+        Existing parts are never rewritten.
+        """
+        if not self._pending:
+            return 0
+
+        table = self.to_table(pd.concat(self._pending, ignore_index=True))
+        if self.token:
+            token = f"{self.token}-{self._flushes}"
+            self._flushes += 1
+        else:
+            token = uuid.uuid4().hex
+
+        ds.write_dataset(
+            table,
+            self.root,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=f"part-{token}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=ds.ParquetFileFormat().make_write_options(
+                compression="zstd", use_dictionary=True
+            ),
+        )
+        self._pending = []
+        self._pending_rows = 0
+        return table.num_rows
+
+    def discard(self) -> int:
+        """Drop buffered records and delete the part files written under the token."""
+        self._pending = []
+        self._pending_rows = 0
+        if not self.token:
+            return 0
+
+        removed = 0
+        for part in self.root.glob(f"date=*/location_id=*/part-{self.token}-*.parquet"):
+            part.unlink()
+            removed += 1
+        return removed
+
+    def dataset(self) -> ds.Dataset:
+        return ds.dataset(
+            self.root,
+            schema=STORE_SCHEMA,
+            format="parquet",
+            partitioning=PARTITIONING,
+        )
+
+    def read(
+        self,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+        location_ids: Optional[Iterable[Any]] = None,
+        statuses: Optional[Iterable[str]] = None,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Read records, filtering on request_time, location_id and status.
+
+        start is inclusive and end is exclusive. Filters on date and
+        location_id prune whole partitions before any file is opened.
+        """
+        if not self.root.exists():
+            return pd.DataFrame(columns=columns or RECORD_SCHEMA.names)
+
+        expression = None
+
+        def add(condition):
+            nonlocal expression
+            expression = condition if expression is None else expression & condition
+
+        if start is not None:
+            start = to_utc(start)
+            add(ds.field("date") >= start.strftime("%Y-%m-%d"))
+            add(ds.field("request_time") >= pa.scalar(start, REQUEST_TIME_TYPE))
+        if end is not None:
+            end = to_utc(end)
+            add(ds.field("date") <= end.strftime("%Y-%m-%d"))
+            add(ds.field("request_time") < pa.scalar(end, REQUEST_TIME_TYPE))
+        if location_ids is not None:
+            add(ds.field("location_id").isin([str(i) for i in location_ids]))
+        if statuses is not None:
+            add(ds.field("status").isin(list(statuses)))
+
+        table = self.dataset().to_table(columns=columns, filter=expression)
+        return table.to_pandas()
+
+    def compact(self, logger: logging.Logger, before: Optional[str] = None) -> int:
+        """Merge the part files of each partition into a single file.
+
+        Only partitions with a date earlier than `before` (YYYY-MM-DD, default
+        today) are compacted so the scraper never races with the rewrite.
+        """
+        before = before or datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%d")
+        compacted = 0
+
+        for date_dir in sorted(self.root.glob("date=*")):
+            if date_dir.name.split("=", 1)[1] >= before:
+                continue
+
+            for partition_dir in sorted(date_dir.glob("location_id=*")):
+                parts = sorted(partition_dir.glob("part-*.parquet"))
+                if len(parts) <= 1:
+                    continue
+
+                table = pa.concat_tables(pq.read_table(part) for part in parts)
+                table = table.sort_by([("request_time", "ascending")])
+
+                # Files starting with "_" are ignored by dataset discovery, so
+                # readers never see the half-written merge
+                token = uuid.uuid4().hex[:8]
+                pending = partition_dir / f"_compacting-{token}.parquet"
+                pq.write_table(table, pending, compression="zstd", use_dictionary=True)
+
+                for part in parts:
+                    part.unlink()
+                pending.rename(partition_dir / f"part-compacted-{token}.parquet")
+
+                compacted += 1
+                logger.info(f"Compacted {len(parts)} files in {partition_dir}")
+
+        return compacted
+
+
+def to_sql_rows(df: pd.DataFrame, columns: List[str]) -> List[tuple]:
+    """Return rows of the given columns with NaN/NA as None for sqlite3."""
+    df = df.reindex(columns=columns).astype(object)
+    return list(df.where(df.notna(), None).itertuples(index=False, name=None))
+
+
+class SqliteStore:
+    """
+    Single-file SQLite store in WAL mode.
+
+    write() only buffers records; flush() inserts everything buffered in one
+    transaction with executemany, and is called once per scrape cycle (or
+    when FLUSH_ROWS records are pending). Locations, rooms and machines are
+    upserted so their latest names and types win. WAL mode lets readers query
+    the database while the scraper writes.
+
+    The connection is opened with check_same_thread=False; callers must not
+    use one store from several threads at once.
+    """
+
+    FLUSH_ROWS = 50_000
+
+    def __init__(self, path: Path, table: str = "snapshots"):
+        self.path = path
+        self.table = table
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pending: List[tuple[pd.DataFrame, Optional[str]]] = []
+        self._pending_rows = 0
+
+    def connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=30000")
+            connection.executescript(SQLITE_SCHEMA.format(table=self.table))
+            self._connection = connection
+        return self._connection
+
+    def write(self, df: pd.DataFrame, location_code: Optional[str] = None) -> Path:
+        """Buffer records for the next flush."""
+        self._pending.append((df, location_code))
+        self._pending_rows += len(df)
+        if self._pending_rows >= self.FLUSH_ROWS:
+            self.flush()
+        return self.path
+
+    def flush(self) -> int:
+        """Insert all buffered records in one transaction; returns the row count."""
+        if not self._pending:
+            return 0
+
+        frames = []
+        for df, location_code in self._pending:
+            frames.append(df.assign(location_code=location_code))
+        df = pd.concat(frames, ignore_index=True)
+        for column in ("location_id", "id", "machine_number"):
+            if column in df.columns:
+                df[column] = df[column].astype("string")
+
+        locations = df.drop_duplicates("location_id", keep="last")
+        rooms = df.drop_duplicates(["location_id", "room_id"], keep="last")
+        machines = df.drop_duplicates(RECORD_KEY, keep="last")
+
+        connection = self.connect()
+        with connection:
+            connection.executemany(
+                """
+                INSERT INTO locations
+                    (location_id, location_code, location_name, sitecode, uln, state_code)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (location_id) DO UPDATE SET
+                    location_code = coalesce(excluded.location_code, location_code),
+                    location_name = excluded.location_name,
+                    sitecode = excluded.sitecode,
+                    uln = excluded.uln,
+                    state_code = excluded.state_code
+                """,
+                to_sql_rows(
+                    locations,
+                    ["location_id", "location_code", "location_name", "sitecode", "uln", "state_code"],
+                ),
+            )
+            connection.executemany(
+                """
+                INSERT INTO rooms (location_id, room_id, room_name, id)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (location_id, room_id) DO UPDATE SET
+                    room_name = excluded.room_name, id = excluded.id
+                """,
+                to_sql_rows(rooms, ["location_id", "room_id", "room_name", "id"]),
+            )
+            connection.executemany(
+                """
+                INSERT INTO machines (location_id, room_id, machine_number, type)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (location_id, room_id, machine_number) DO UPDATE SET
+                    type = excluded.type
+                """,
+                to_sql_rows(machines, RECORD_KEY + ["type"]),
+            )
+            connection.executemany(
+                f"INSERT INTO {self.table} ({', '.join(SNAPSHOT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(SNAPSHOT_COLUMNS))})",
+                to_sql_rows(df, SNAPSHOT_COLUMNS),
+            )
+
+        self._pending = []
+        self._pending_rows = 0
+        return len(df)
+
+    def close(self):
+        """Flush buffered records and close the connection."""
+        self.flush()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def read(
+        self,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+        location_ids: Optional[Iterable[Any]] = None,
+        statuses: Optional[Iterable[str]] = None,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Read flat records (as ParquetStore.read does) joined from all tables.
+
+        start is inclusive and end is exclusive.
+        """
+        conditions = []
+        params: List[Any] = []
+
+        if start is not None:
+            conditions.append("s.request_time >= ?")
+            params.append(to_utc(start).strftime("%Y-%m-%dT%H:%M:%S.%f"))
+        if end is not None:
+            conditions.append("s.request_time < ?")
+            params.append(to_utc(end).strftime("%Y-%m-%dT%H:%M:%S.%f"))
+        if location_ids is not None:
+            location_ids = [str(i) for i in location_ids]
+            conditions.append(f"s.location_id IN ({', '.join('?' * len(location_ids))})")
+            params.extend(location_ids)
+        if statuses is not None:
+            statuses = list(statuses)
+            conditions.append(f"s.status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+
+        query = f"""
+            SELECT s.location_id, l.location_name, l.sitecode, l.uln, l.state_code,
+                   s.room_id, r.room_name, r.id, s.machine_number, s.start_time,
+                   s.time_remaining, m.type, s.request_time, s.request_sent_time,
+                   s.response_received_time, s.status_raw, s.status,
+                   s.previous_status, s.previous_since, s.previous_last_seen
+            FROM {self.table} s
+            LEFT JOIN locations l ON l.location_id = s.location_id
+            LEFT JOIN rooms r ON r.location_id = s.location_id AND r.room_id = s.room_id
+            LEFT JOIN machines m ON m.location_id = s.location_id
+                AND m.room_id = s.room_id AND m.machine_number = s.machine_number
+        """
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        df = pd.read_sql_query(query, self.connect(), params=params)
+        return df[columns] if columns else df
+
+    def write_mappings(self, records: List[Dict[str, Any]]) -> int:
+        """Upsert location_code_mapper records into location_mapping."""
+        df = pd.DataFrame(records)
+        if "address_components" in df.columns:
+            df["address_components"] = df["address_components"].map(
+                lambda value: json.dumps(value) if isinstance(value, list) else value
+            )
+
+        connection = self.connect()
+        with connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO location_mapping ({', '.join(MAPPING_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(MAPPING_COLUMNS))})",
+                to_sql_rows(df, MAPPING_COLUMNS),
+            )
+        return len(df)
+
+    def read_mappings(self) -> pd.DataFrame:
+        """Return the location_mapping table."""
+        return pd.read_sql_query("SELECT * FROM location_mapping", self.connect())
+
+
+def open_writer(storage: str, data_dir: Path, change_only: bool = False):
+    """Return the writer for a storage backend name.
+
+    Change-only (transition) records go to transitions.csv, the transitions
+    store or the transitions table instead of the full snapshots.
+    """
+    if storage == "sqlite":
+        return SqliteStore(
+            data_dir / SQLITE_FILENAME, "transitions" if change_only else "snapshots"
+        )
+    if storage == "parquet":
+        dirname = TRANSITIONS_STORE_DIRNAME if change_only else STORE_DIRNAME
+        return ParquetStore(data_dir / dirname)
+    return CsvWriter(data_dir, TRANSITIONS_CSV_FILENAME if change_only else CSV_FILENAME)
+
+
+def rebuild_snapshot(transitions: pd.DataFrame, at_time: Any) -> pd.DataFrame:
+    """Rebuild the machine snapshot at a point in time from transition records.
+
+    Every machine's state is the last transition at or before at_time, exactly
+    the row a full snapshot taken then would have carried (apart from its
+    request_time, which is when the state began).
+    """
+    request_times = pd.to_datetime(transitions["request_time"], utc=True, format="ISO8601")
+    past = transitions[request_times <= to_utc(at_time)]
+    past = past.assign(_request_time=request_times[past.index])
+
+    snapshot = past.sort_values("_request_time").groupby(RECORD_KEY, sort=False).tail(1)
+    return snapshot.drop(columns="_request_time").sort_values(
+        ["room_id", "machine_number"]
+    )
+
+
+def transition_intervals(transitions: pd.DataFrame) -> pd.DataFrame:
+    """Turn transition records into one row per state with start and end times.
+
+    start is the transition's request_time; end is the next transition of the
+    same machine, or NaT while the state is still current.
+    """
+    df = transitions.copy()
+    df["start"] = pd.to_datetime(df["request_time"], utc=True, format="ISO8601")
+    df = df.sort_values("start")
+    df["end"] = df.groupby(RECORD_KEY, sort=False)["start"].shift(-1)
+    df["duration_minutes"] = (df["end"] - df["start"]).dt.total_seconds() / 60
+    return df
+
+
+def migrate_csv_files(
+    data_dir: Path, logger: logging.Logger, delete_csv: bool = False
+) -> int:
+    """Copy every data/<code>/parsed.csv into the Parquet store.
+
+    Each file is written under its own token and its part files are deleted
+    again if it fails, so one bad file neither blocks the others nor leaves
+    partial rows behind. Migrated files are listed in the store's
+    _migrated.jsonl and skipped when the migration is run again.
+    """
+    root = data_dir / STORE_DIRNAME
+    manifest_file = root / MIGRATED_FILENAME
+    migrated = {}
+    if manifest_file.exists():
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    migrated[entry["file"]] = entry
+                except (ValueError, KeyError):
+                    # A torn last line from an interrupted append
+                    continue
+
+    csv_files = sorted(data_dir.glob(f"*/{CSV_FILENAME}"))
+    total_rows = 0
+
+    logger.info(f"Found {len(csv_files)} CSV files to migrate")
+
+    for i, csv_file in enumerate(csv_files, 1):
+        name = csv_file.relative_to(data_dir).as_posix()
+        if name in migrated:
+            if csv_file.stat().st_size != migrated[name]["size"]:
+                logger.warning(
+                    f"Skipping {csv_file}: it was migrated before and has changed since"
+                )
+            else:
+                logger.info(f"Skipping {csv_file}: already migrated")
+            continue
+
+        size = csv_file.stat().st_size
+        store = ParquetStore(root, token=uuid.uuid4().hex)
+        rows = 0
+        try:
+            for chunk in pd.read_csv(
+                csv_file,
+                chunksize=CSV_CHUNK_SIZE,
+                dtype={"id": "string", "machine_number": "string", "location_id": "string"},
+            ):
+                store.write(chunk)
+                rows += len(chunk)
+            # Written before the CSV file may be deleted
+            store.flush()
+        except BaseException as e:
+            removed = store.discard()
+            if not isinstance(e, Exception):
+                raise
+            logger.error(
+                f"Failed to migrate {csv_file}: {e} (removed {removed} partial files)"
+            )
+            continue
+
+        root.mkdir(parents=True, exist_ok=True)
+        with open(manifest_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"file": name, "size": size, "rows": rows}) + "\n")
+
+        total_rows += rows
+        logger.info(f"Migrated {i}/{len(csv_files)}: {csv_file} ({rows} rows)")
+
+        if delete_csv:
+            csv_file.unlink()
+
+    logger.info(f"Migration complete: {total_rows} rows")
+    return total_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the Parquet record store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser(
+        "migrate", help="Migrate parsed.csv files into the Parquet store"
+    )
+    migrate_parser.add_argument(
+        "--data-dir", default="data", help="Directory containing data files"
+    )
+    migrate_parser.add_argument(
+        "--delete-csv",
+        action="store_true",
+        help="Delete each parsed.csv after it has been migrated",
+    )
+
+    compact_parser = subparsers.add_parser(
+        "compact", help="Merge small part files in past date partitions"
+    )
+    compact_parser.add_argument(
+        "--data-dir", default="data", help="Directory containing data files"
+    )
+    compact_parser.add_argument(
+        "--before", default=None, help="Only compact dates before YYYY-MM-DD"
+    )
+
+    args = parser.parse_args()
+    data_dir = Path(args.data_dir)
+
+    # Setup logging
+    logger = setup_logging()
+
+    if args.command == "migrate":
+        migrate_csv_files(data_dir, logger, args.delete_csv)
+    elif args.command == "compact":
+        store = ParquetStore(data_dir / STORE_DIRNAME)
+        compacted = store.compact(logger, args.before)
+        logger.info(f"Compacted {compacted} partitions")
+
+
+if __name__ == "__main__":
+    main()